@@ -0,0 +1,177 @@
+"""
+Answer cache for Learn with AI
+Reuses generated answers for repeated questions against the same corpus
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def normalize_question(question):
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    question = re.sub(r"\s+", " ", question.strip().lower())
+    return question.rstrip("?!. ")
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else None
+
+
+class _QuestionVectors:
+    """
+    Unit question vectors of one corpus, tone and level, one row per cached key.
+
+    Rows are only ever appended: a removed key's row is blanked in keys and
+    the matrix is rebuilt into a new array once half its rows are blank. A
+    snapshot (matrix[:n], keys) therefore stays valid to score without the
+    cache lock; its keys are checked again before use.
+    """
+
+    def __init__(self, dim):
+        self.matrix = np.empty((16, dim), dtype=np.float32)
+        self.keys = []
+        self.rows = {}  # key -> row
+
+    def add(self, key, unit):
+        if len(self.keys) == len(self.matrix):
+            live = [(other, self.matrix[row]) for other, row in self.rows.items()]
+            matrix = np.empty((max(16, 2 * max(len(live), len(self.keys) // 2)), self.matrix.shape[1]),
+                              dtype=np.float32)
+            for row, (_, vector) in enumerate(live):
+                matrix[row] = vector
+            self.matrix = matrix
+            self.keys = [other for other, _ in live]
+            self.rows = {other: row for row, other in enumerate(self.keys)}
+        self.matrix[len(self.keys)] = unit
+        self.rows[key] = len(self.keys)
+        self.keys.append(key)
+
+    def remove(self, key):
+        row = self.rows.pop(key, None)
+        if row is not None:
+            self.keys[row] = None
+
+    def snapshot(self):
+        return self.matrix[:len(self.keys)], self.keys
+
+
+class AnswerCache:
+    """
+    TTL + size-bounded LRU cache of answers, with optional semantic matching.
+
+    Semantic lookups score every cached question of the same corpus, tone
+    and level with one matrix-vector product, outside the lock.
+    """
+
+    def __init__(self, max_size_mb, ttl_seconds, semantic=False, similarity_threshold=0.95):
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.ttl_seconds = ttl_seconds
+        self.semantic = semantic
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()  # key -> (answer, metadata, expires_at, size)
+        self._vectors = {}  # (corpus_version, tone, level) -> _QuestionVectors
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(corpus_version, tone, level, question):
+        return (corpus_version, tone, level, normalize_question(question))
+
+    def get(self, key, vector=None):
+        """Return (answer, metadata) or None; vector enables semantic matching"""
+        now = time.time()
+        with self._lock:
+            entry = self._live_entry(key, now)
+            if entry:
+                return self._hit(key, entry)
+            group = self._vectors.get(key[:3]) if self.semantic and vector is not None else None
+            snapshot = group.snapshot() if group else None
+
+        if snapshot:
+            for other_key in self._nearest(vector, *snapshot):
+                with self._lock:
+                    entry = self._live_entry(other_key, now)
+                    if entry:
+                        self.semantic_hits += 1
+                        return self._hit(other_key, entry)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _nearest(self, vector, matrix, keys):
+        """Keys whose question vectors pass the threshold, closest first"""
+        unit = _unit(vector)
+        if unit is None or unit.shape[0] != matrix.shape[1]:
+            return []
+        scores = matrix @ unit
+        rows = np.flatnonzero(scores >= self.similarity_threshold)
+        rows = rows[np.argsort(-scores[rows], kind="stable")]
+        return [keys[row] for row in rows if keys[row] is not None]
+
+    def _live_entry(self, key, now):
+        """The entry for key unless missing or expired (caller holds _lock)"""
+        entry = self._entries.get(key)
+        if entry and entry[2] <= now:
+            self._remove(key)
+            self.expirations += 1
+            return None
+        return entry
+
+    def _hit(self, key, entry):
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0], entry[1]
+
+    def put(self, key, answer, metadata=None, vector=None):
+        unit = _unit(vector) if vector is not None else None
+        size = len(answer.encode("utf-8")) + len(key[3]) + (unit.nbytes if unit is not None else 0)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (answer, metadata or {}, time.time() + self.ttl_seconds, size)
+            self._size += size
+            if unit is not None:
+                group = self._vectors.get(key[:3])
+                if group is None:
+                    group = self._vectors[key[:3]] = _QuestionVectors(unit.shape[0])
+                group.add(key, unit)
+            while self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._size -= entry[3]
+        group = self._vectors.get(key[:3])
+        if group is not None:
+            group.remove(key)
+            if not group.rows:
+                del self._vectors[key[:3]]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "max_size_bytes": self.max_bytes,
+            }
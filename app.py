@@ -3,12 +3,16 @@ Learn with AI - Flask Application
 A RAG-based learning assistant with multi-document support
 """
 
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, Response, stream_with_context
 from dotenv import load_dotenv
 import os
+import json
 import tempfile
 import shutil
-from datetime import datetime, timedelta
+import hashlib
+import threading
+import time
+from datetime import datetime
 
 # Load environment variables
 load_dotenv()
@@ -16,11 +20,30 @@ os.environ["GOOGLE_API_KEY"] = os.getenv("GOOGLE_API_KEY")
 os.environ["LANGCHAIN_TRACKING_V2"] = "true"
 
 # Import necessary modules
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain_google_genai import ChatGoogleGenerativeAI
 from tones import PROMPT_MAP, LEVELS
-from vectordatabase import ingest_documents
+from chains import get_chain, get_stages
+from jobs import submit_job, get_job, active_job_for_session, set_state_backend, queue_stats, QueueFullError
+from vectordatabase import (
+    ingest_documents, remove_sources, search_with_relevance, search_many_with_relevance, embed_queries,
+    commit_ingestion, open_index, close_index, embedding_cache, get_embeddings, warmup as warmup_vector_store
+)
+from answer_cache import AnswerCache
+from prefetch import PrefetchCache
+from url_fetcher import fetcher_stats
+from uploads import UploadStore, UploadError, OffsetMismatch
+from janitor import DiskJanitor, QuotaExceeded
+from loaders import parse_page_ranges, format_page_ranges, get_page_cache
+from sessions import SessionStore, create_backend
+from rate_limits import RateLimiter, ConcurrencyLimiter, AsyncConcurrencyLimiter, RateLimited
+import metrics
+from metrics import ASK_STAGE_SECONDS, BATCH_STAGE_SECONDS, CONTEXT_TOKENS, REQUESTS_REJECTED
+from context_builder import build_context, estimate_tokens
+from config import (
+    CACHE_CONFIG, SESSION_CONFIG, STARTUP_CONFIG, UPLOAD_CONFIG, VECTOR_DB_CONFIG, BATCH_CONFIG,
+    RATE_LIMITING, SECURITY_CONFIG, ASGI_CONFIG, INGESTION_CONFIG, PREFETCH_CONFIG, FEATURES
+)
+from langchain_core.runnables import RunnableLambda
+from werkzeug.utils import secure_filename
 
 app = Flask(__name__)
 app.secret_key = os.getenv("SECRET_KEY", "learn-with-ai-secret-key-2026")
@@ -28,7 +51,7 @@ app.secret_key = os.getenv("SECRET_KEY", "learn-with-ai-secret-key-2026")
 # Configuration
 UPLOAD_FOLDER = "uploads"
 ALLOWED_EXTENSIONS = {'pdf', 'txt', 'csv', 'json'}
-MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB per single-request upload; larger files use the chunked API
 
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
@@ -36,8 +59,145 @@ if not os.path.exists(UPLOAD_FOLDER):
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
 
-# Global variables for session management
-session_data = {}
+# Session metadata, with vector stores opened lazily and evicted when idle
+session_data = SessionStore(
+    create_backend(SESSION_CONFIG),
+    open_index,
+    close_index,
+    max_sessions=SESSION_CONFIG["max_sessions"],
+    timeout_hours=SESSION_CONFIG["session_timeout_hours"],
+    memory_budget_mb=SESSION_CONFIG["index_memory_budget_mb"],
+    max_open_indexes=SESSION_CONFIG["max_open_indexes"]
+)
+# `python app.py` runs the development server in debug mode, whose werkzeug reloader parent
+# serves nothing. Spawned loader processes re-import this script as __mp_main__. Neither sweeps.
+DEBUG = __name__ == "__main__"
+SERVING_PROCESS = __name__ != "__mp_main__" and not (DEBUG and os.environ.get("WERKZEUG_RUN_MAIN") != "true")
+if SERVING_PROCESS:
+    session_data.start_sweeper(SESSION_CONFIG["cleanup_interval_minutes"])
+set_state_backend(session_data.backend)
+
+# Uploaded files, hashed as they are written and linked when their content is already stored
+upload_store = UploadStore(
+    UPLOAD_FOLDER,
+    max_file_size=UPLOAD_CONFIG["max_file_size_mb"] * 1024 * 1024,
+    chunk_size=UPLOAD_CONFIG["chunk_size_mb"] * 1024 * 1024,
+    incomplete_hours=UPLOAD_CONFIG["incomplete_upload_hours"]
+)
+
+# Deletes what expired and reset sessions left on disk, and enforces the disk quotas
+janitor = DiskJanitor(
+    UPLOAD_FOLDER,
+    session_data,
+    upload_store,
+    session_quota_mb=UPLOAD_CONFIG["session_quota_mb"],
+    global_quota_mb=UPLOAD_CONFIG["global_quota_mb"],
+    grace_minutes=UPLOAD_CONFIG["orphan_grace_minutes"],
+    delete_orphans=(
+        session_data.backend.shared if UPLOAD_CONFIG["janitor_delete_orphans"] is None
+        else UPLOAD_CONFIG["janitor_delete_orphans"]
+    )
+)
+if SERVING_PROCESS:
+    janitor.start(UPLOAD_CONFIG["janitor_interval_minutes"])
+
+# Answers shared by every session asking about the same corpus
+answer_cache = None
+if CACHE_CONFIG["enable_query_cache"]:
+    answer_cache = AnswerCache(
+        CACHE_CONFIG["answer_cache_max_size_mb"],
+        CACHE_CONFIG["cache_ttl_seconds"],
+        semantic=CACHE_CONFIG["semantic_cache"],
+        similarity_threshold=CACHE_CONFIG["semantic_similarity_threshold"]
+    )
+
+# Retrieval started while a question is typed, reused when it is submitted
+prefetch_cache = None
+if FEATURES["real_time_suggestions"]:
+    prefetch_cache = PrefetchCache(
+        PREFETCH_CONFIG["ttl_seconds"],
+        PREFETCH_CONFIG["entries_per_session"],
+        PREFETCH_CONFIG["max_sessions"],
+        PREFETCH_CONFIG["match_ratio"],
+        PREFETCH_CONFIG["min_similarity"]
+    )
+
+# Admission control: request budgets per session and per worker, and a cap on LLM calls in flight
+rate_limiter = None
+if RATE_LIMITING["enabled"] or SECURITY_CONFIG["rate_limit_enabled"]:
+    rate_limiter = RateLimiter(
+        RATE_LIMITING["requests_per_minute"],
+        RATE_LIMITING["requests_per_hour"],
+        RATE_LIMITING["global_requests_per_minute"],
+        RATE_LIMITING["global_requests_per_hour"],
+        max_sessions=RATE_LIMITING["max_tracked_sessions"]
+    )
+generation_slots = ConcurrencyLimiter(
+    "generation",
+    RATE_LIMITING["max_concurrent_generations"],
+    RATE_LIMITING["max_queued_generations"],
+    RATE_LIMITING["generation_queue_timeout_seconds"]
+)
+# Taken instead by the ask route of asgi.py, where waiting for the LLM holds no thread
+async_generation_slots = AsyncConcurrencyLimiter(
+    "generation",
+    ASGI_CONFIG["max_concurrent_generations"],
+    RATE_LIMITING["max_queued_generations"],
+    RATE_LIMITING["generation_queue_timeout_seconds"]
+)
+
+# Read at scrape time so /metrics always reflects the live stores
+metrics.Gauge("learnai_sessions", "Live sessions", lambda: session_data.stats()["sessions"])
+metrics.Gauge("learnai_open_indexes", "Session indexes open in this process",
+              lambda: session_data.stats()["open_indexes"])
+metrics.Gauge("learnai_open_index_bytes", "Estimated resident size of open session indexes",
+              lambda: session_data.stats()["open_index_bytes"])
+if embedding_cache:
+    metrics.Gauge("learnai_embedding_cache_hits", "Embedding cache hits",
+                  lambda: embedding_cache.stats()["hits"])
+    metrics.Gauge("learnai_embedding_cache_misses", "Embedding cache misses",
+                  lambda: embedding_cache.stats()["misses"])
+metrics.Gauge("learnai_generations_in_flight", "LLM calls running in this process",
+              lambda: generation_slots.stats()["in_flight"] + async_generation_slots.stats()["in_flight"])
+metrics.Gauge("learnai_generation_queue_depth", "Requests waiting for a generation slot",
+              lambda: generation_slots.stats()["queue_depth"] + async_generation_slots.stats()["queue_depth"])
+metrics.Gauge("learnai_upload_folder_bytes", "Bytes stored under the upload folder (last sweep plus uploads since)",
+              janitor.global_usage)
+metrics.Gauge("learnai_ingest_jobs_queued", "Ingestion jobs waiting for a worker",
+              lambda: queue_stats()["queued"])
+metrics.Gauge("learnai_ingest_jobs_running", "Ingestion jobs running", lambda: queue_stats()["running"])
+if answer_cache:
+    metrics.Gauge("learnai_answer_cache_hits", "Answer cache hits",
+                  lambda: answer_cache.stats()["hits"])
+    metrics.Gauge("learnai_answer_cache_misses", "Answer cache misses",
+                  lambda: answer_cache.stats()["misses"])
+if prefetch_cache:
+    metrics.Gauge("learnai_prefetch_hits", "Questions answered with retrieval prefetched while typing",
+                  lambda: prefetch_cache.stats()["hits"] + prefetch_cache.stats()["near_hits"])
+    metrics.Gauge("learnai_prefetch_misses", "Questions retrieved for on submit",
+                  lambda: prefetch_cache.stats()["misses"])
+
+
+# Set once the embedding model and LLM chains are loaded
+ready = threading.Event()
+warmup_error = None
+
+
+def warmup():
+    """Load heavy models before traffic arrives; safe to call more than once"""
+    global warmup_error
+    try:
+        warmup_vector_store()
+        get_chain('default')
+        warmup_error = None
+        ready.set()
+    except Exception as e:
+        warmup_error = str(e)
+
+
+# Skipped when a spawned loader process re-imports this script as __mp_main__
+if STARTUP_CONFIG["warmup_on_start"] and __name__ != "__mp_main__":
+    threading.Thread(target=warmup, name="warmup", daemon=True).start()
 
 
 def allowed_file(filename):
@@ -45,41 +205,128 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def upload_path(session_id, filename):
+    """Where a session's uploaded file is stored"""
+    safe_name = secure_filename(filename) or f"upload.{filename.rsplit('.', 1)[-1].lower()}"
+    return os.path.join(app.config['UPLOAD_FOLDER'], f"{session_id}_{datetime.now().timestamp()}_{safe_name}")
+
+
+def file_document(name, path, sha256, pages=None):
+    """Document entry for an uploaded file; pages limits a PDF to those page ranges"""
+    document = {
+        'name': name,
+        'path': path,
+        'sha256': sha256,
+        'type': 'file',
+        'uploaded_at': datetime.now().isoformat()
+    }
+    if pages:
+        document['pages'] = pages
+    return document
+
+
+def page_selection(filename, spec):
+    """Normalized page ranges ('3-5,9') to index from a PDF, or None for the whole file"""
+    if spec is None or str(spec).strip().lower() in ('', 'all'):
+        return None
+    if not filename.lower().endswith('.pdf'):
+        raise ValueError("Page ranges only apply to PDF files")
+    return format_page_ranges(parse_page_ranges(spec))
+
+
+def select_pages(doc, pages):
+    """Add pages (None for the whole file) to the part of a PDF document to index"""
+    if pages is None:
+        doc.pop('pages', None)
+    elif doc.get('pages'):
+        doc['pages'] = format_page_ranges(parse_page_ranges(doc['pages']) + parse_page_ranges(pages))
+    elif not doc.get('indexed'):
+        # Nothing indexed yet: only these pages
+        doc['pages'] = pages
+
+
+def pdf_load_args(doc):
+    """load_pdf arguments for the pages of a PDF document not indexed yet, or None if there are none"""
+    requested = parse_page_ranges(doc['pages']) if doc.get('pages') else None
+    if not doc.get('indexed'):
+        return {"pages": requested}
+    if not doc.get('indexed_pages'):
+        return None
+    indexed = parse_page_ranges(doc['indexed_pages'])
+    if requested is None:
+        return {"pages": None, "exclude": indexed}
+    remaining = sorted(set(requested) - set(indexed))
+    return {"pages": remaining} if remaining else None
+
+
+def add_documents(session_id, new_documents):
+    """Append documents to a session; returns its document count, or None if the session is gone"""
+    with session_data.edit(session_id) as data:
+        if data is None:
+            return None
+        data['documents'].extend(new_documents)
+        data['last_activity'] = datetime.now()
+        return len(data['documents'])
+
+
+def corpus_version(documents):
+    """Fingerprint of the indexed documents' content, equal across sessions with the same files"""
+    parts = sorted(
+        (doc.get('sha256') or doc['path']) + (f"#{doc['indexed_pages']}" if doc.get('indexed_pages') else '')
+        for doc in documents if doc.get('indexed')
+    )
+    return hashlib.sha256("\n".join(parts).encode('utf-8')).hexdigest()
+
+
 def create_session():
     """Create a new user session"""
     session_id = datetime.now().strftime("%Y%m%d%H%M%S%f")
-    session_data[session_id] = {
-        "db": None,
+    session_data.create(session_id, {
         "tone": "default",
         "level": "beginner",
         "documents": [],
+        "corpus_version": None,
+        "persist_dir": os.path.join(UPLOAD_FOLDER, f"db_{session_id}"),
+        "index_ready": False,
         "created_at": datetime.now(),
         "last_activity": datetime.now()
-    }
+    })
     return session_id
 
 
-def cleanup_old_sessions():
-    """Clean up sessions older than 1 hour"""
-    cutoff_time = datetime.now() - timedelta(hours=1)
-    to_delete = []
-    for session_id, data in session_data.items():
-        if data["created_at"] < cutoff_time:
-            to_delete.append(session_id)
-    for session_id in to_delete:
-        del session_data[session_id]
+def check_rate_limit(session_id, cost=1):
+    """Charge cost requests to the session's and the worker's budgets; raises RateLimited when spent"""
+    if rate_limiter:
+        rate_limiter.check(session_id, cost)
+
+
+# Keep proxies from buffering event streams
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no'
+}
+
+
+def sse_event(event, data):
+    """Format a Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 
 @app.route('/')
 def index():
     """Main page"""
-    return render_template('index.html', tones=list(PROMPT_MAP.keys()), levels=LEVELS)
+    return render_template(
+        'index.html',
+        tones=list(PROMPT_MAP.keys()),
+        levels=LEVELS,
+        max_file_mb=UPLOAD_CONFIG["max_file_size_mb"],
+        prefetch=PREFETCH_CONFIG if prefetch_cache else None
+    )
 
 
 @app.route('/api/session/create', methods=['POST'])
 def create_session_route():
     """Create a new session"""
-    cleanup_old_sessions()
     session_id = create_session()
     session['session_id'] = session_id
     return jsonify({
@@ -106,9 +353,7 @@ def update_settings():
     if level not in LEVELS:
         return jsonify({"success": False, "error": "Invalid level"}), 400
 
-    session_data[session_id]['tone'] = tone
-    session_data[session_id]['level'] = level
-    session_data[session_id]['last_activity'] = datetime.now()
+    session_data.update(session_id, tone=tone, level=level, last_activity=datetime.now())
 
     return jsonify({
         "success": True,
@@ -124,24 +369,31 @@ def upload_documents():
     if not session_id or session_id not in session_data:
         return jsonify({"success": False, "error": "Invalid session"}), 400
 
+    try:
+        janitor.check_quota(session_id, request.content_length or 0)
+    except QuotaExceeded as e:
+        return upload_error(e)
+
     uploaded_files = []
+    new_documents = []
     errors = []
 
     # Handle file uploads
     if 'files' in request.files:
         files = request.files.getlist('files')
-        for file in files:
+        # Optional PDF page ranges, one per file in the same order ('' for the whole file)
+        page_specs = request.form.getlist('pages')
+        for index, file in enumerate(files):
             if file and allowed_file(file.filename):
-                filename = f"{session_id}_{datetime.now().timestamp()}_{file.filename}"
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                file.save(filepath)
+                try:
+                    pages = page_selection(file.filename, page_specs[index] if index < len(page_specs) else None)
+                except ValueError as e:
+                    errors.append(f"{file.filename} - {str(e)}")
+                    continue
+                filepath = upload_path(session_id, file.filename)
+                sha256, _ = upload_store.save_stream(file.stream, filepath)
                 uploaded_files.append(filepath)
-                session_data[session_id]['documents'].append({
-                    'name': file.filename,
-                    'path': filepath,
-                    'type': 'file',
-                    'uploaded_at': datetime.now().isoformat()
-                })
+                new_documents.append(file_document(file.filename, filepath, sha256, pages))
             elif file:
                 errors.append(f"{file.filename} - File type not supported")
 
@@ -149,7 +401,7 @@ def upload_documents():
     wiki_links = request.form.getlist('wiki_links')
     for link in wiki_links:
         if link.strip():
-            session_data[session_id]['documents'].append({
+            new_documents.append({
                 'name': link,
                 'path': link,
                 'type': 'wiki',
@@ -163,17 +415,163 @@ def upload_documents():
             "errors": errors
         }), 400
 
-    session_data[session_id]['last_activity'] = datetime.now()
+    total_documents = add_documents(session_id, new_documents)
+    if total_documents is None:
+        return jsonify({"success": False, "error": "Invalid session"}), 400
 
     return jsonify({
         "success": True,
         "uploaded_files": len(uploaded_files),
         "wiki_links": len(wiki_links),
-        "total_documents": len(session_data[session_id]['documents']),
+        "total_documents": total_documents,
         "errors": errors
     })
 
 
+def session_document_with(session_id, sha256):
+    """The session's document with this content, if it already has one"""
+    documents = session_data[session_id]['documents']
+    return next((doc for doc in documents if sha256 and doc.get('sha256') == sha256), None)
+
+
+def upload_error(error):
+    """JSON response for an UploadError"""
+    body = {"success": False, "error": str(error)}
+    if isinstance(error, OffsetMismatch):
+        body["offset"] = error.offset
+    return jsonify(body), error.status
+
+
+@app.route('/api/documents/uploads', methods=['POST'])
+def begin_upload():
+    """Start a chunked upload, or link the file at once if the server already holds its content"""
+    session_id = session.get('session_id')
+    if not session_id or session_id not in session_data:
+        return jsonify({"success": False, "error": "Invalid session"}), 400
+
+    data = request.json or {}
+    filename = str(data.get('filename', ''))
+    size = data.get('size')
+    sha256 = (data.get('sha256') or '').lower() or None
+    if not allowed_file(filename):
+        return jsonify({"success": False, "error": f"{filename} - File type not supported"}), 400
+    if not isinstance(size, int):
+        return jsonify({"success": False, "error": "size must be an integer"}), 400
+    try:
+        pages = page_selection(filename, data.get('pages'))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    try:
+        if sha256:
+            existing = session_document_with(session_id, sha256)
+            if existing:
+                return jsonify({"success": True, "status": "duplicate", "document": existing})
+
+        janitor.check_quota(session_id, size)
+
+        if sha256:
+            filepath = upload_path(session_id, filename)
+            if upload_store.has_content(sha256) and upload_store.link(sha256, filepath):
+                document = file_document(filename, filepath, sha256, pages)
+                total_documents = add_documents(session_id, [document])
+                if total_documents is None:
+                    os.remove(filepath)
+                    return jsonify({"success": False, "error": "Invalid session"}), 400
+                return jsonify({
+                    "success": True,
+                    "status": "linked",
+                    "document": document,
+                    "total_documents": total_documents
+                })
+
+        state = upload_store.begin(
+            session_id, filename, upload_path(session_id, filename), size, sha256,
+            fields={"pages": pages} if pages else None
+        )
+    except UploadError as e:
+        return upload_error(e)
+
+    return jsonify({
+        "success": True,
+        "status": "uploading",
+        "upload_id": state["upload_id"],
+        "offset": state["offset"],
+        "size": state["size"],
+        "chunk_size": upload_store.chunk_size
+    }), 201
+
+
+@app.route('/api/documents/uploads/<upload_id>', methods=['PUT'])
+def upload_chunk(upload_id):
+    """Append the request body at ?offset=; 409 with the stored offset if it does not line up"""
+    session_id = session.get('session_id')
+    if not session_id or session_id not in session_data:
+        return jsonify({"success": False, "error": "Invalid session"}), 400
+
+    try:
+        offset = int(request.args.get('offset', request.headers.get('Upload-Offset', '')))
+    except ValueError:
+        return jsonify({"success": False, "error": "offset is required"}), 400
+
+    try:
+        state = upload_store.append(upload_id, session_id, offset, request.stream)
+    except UploadError as e:
+        return upload_error(e)
+
+    if state["offset"] < state["size"]:
+        return jsonify({"success": True, "status": "uploading", "offset": state["offset"], "size": state["size"]})
+
+    existing = session_document_with(session_id, state["sha256"])
+    if existing:
+        os.remove(state["path"])
+        return jsonify({"success": True, "status": "duplicate", "document": existing})
+
+    document = file_document(state["name"], state["path"], state["sha256"], **(state.get("fields") or {}))
+    total_documents = add_documents(session_id, [document])
+    if total_documents is None:
+        os.remove(state["path"])
+        return jsonify({"success": False, "error": "Invalid session"}), 400
+
+    return jsonify({
+        "success": True,
+        "status": "completed",
+        "offset": state["offset"],
+        "size": state["size"],
+        "deduplicated": state["deduplicated"],
+        "document": document,
+        "total_documents": total_documents
+    })
+
+
+@app.route('/api/documents/uploads/<upload_id>', methods=['GET'])
+def upload_status(upload_id):
+    """Offset to resume a chunked upload from"""
+    session_id = session.get('session_id')
+    if not session_id or session_id not in session_data:
+        return jsonify({"success": False, "error": "Invalid session"}), 400
+
+    try:
+        state = upload_store.status(upload_id, session_id)
+    except UploadError as e:
+        return upload_error(e)
+    return jsonify({"success": True, "status": "uploading", "offset": state["offset"], "size": state["size"]})
+
+
+@app.route('/api/documents/uploads/<upload_id>', methods=['DELETE'])
+def abort_upload(upload_id):
+    """Discard an unfinished chunked upload"""
+    session_id = session.get('session_id')
+    if not session_id or session_id not in session_data:
+        return jsonify({"success": False, "error": "Invalid session"}), 400
+
+    try:
+        upload_store.abort(upload_id, session_id)
+    except UploadError as e:
+        return upload_error(e)
+    return jsonify({"success": True, "status": "aborted"})
+
+
 @app.route('/api/documents/list', methods=['GET'])
 def list_documents():
     """List uploaded documents"""
@@ -189,81 +587,562 @@ def list_documents():
     })
 
 
+@app.route('/api/documents/remove', methods=['POST'])
+def remove_document():
+    """Remove a document and its chunks from the vector database"""
+    session_id = session.get('session_id')
+    if not session_id or session_id not in session_data:
+        return jsonify({"success": False, "error": "Invalid session"}), 400
+
+    path = (request.json or {}).get('path')
+    documents = session_data[session_id]['documents']
+    doc = next((d for d in documents if d['path'] == path), None)
+    if not doc:
+        return jsonify({"success": False, "error": "Document not found"}), 404
+
+    if active_job_for_session(session_id):
+        return jsonify({
+            "success": False,
+            "error": "Documents are being ingested, try again when processing finishes"
+        }), 409
+
+    db = session_data.get_db(session_id)
+    removed_from_index = doc.get('indexed') and db is not None
+    if removed_from_index:
+        try:
+            remove_sources(db, [doc['path']])
+        except Exception as e:
+            return jsonify({
+                "success": False,
+                "error": f"Error removing document: {str(e)}"
+            }), 500
+
+    remaining = []
+
+    def drop_document(data):
+        remaining[:] = [d for d in data['documents'] if d['path'] != path]
+        data['documents'] = remaining
+        data['corpus_version'] = corpus_version(remaining)
+        data['last_activity'] = datetime.now()
+
+    if removed_from_index:
+        # Records the change to the index too, so other workers reopen their handles
+        found = session_data.set_db(session_id, db, prepare=drop_document)
+    else:
+        with session_data.edit(session_id) as data:
+            if data is not None:
+                drop_document(data)
+            found = data is not None
+    if not found:
+        return jsonify({"success": False, "error": "Invalid session"}), 400
+
+    if doc['type'] == 'file' and os.path.exists(doc['path']):
+        os.remove(doc['path'])
+
+    return jsonify({
+        "success": True,
+        "removed": doc['name'],
+        "total_documents": len(remaining)
+    })
+
+
 @app.route('/api/documents/ingest', methods=['POST'])
 def ingest_documents_route():
-    """Ingest documents into vector database"""
+    """Start ingesting documents into the vector database in the background"""
     session_id = session.get('session_id')
     if not session_id or session_id not in session_data:
         return jsonify({"success": False, "error": "Invalid session"}), 400
 
-    documents = session_data[session_id]['documents']
+    check_rate_limit(session_id)
+    # The index grows with ingestion; a session already over its quota cannot add to it
+    try:
+        janitor.check_quota(session_id, 0)
+    except QuotaExceeded as e:
+        return upload_error(e)
+
+    # Optional {"pages": {path: "3-5"}} adds page ranges of PDFs to index
+    options = request.get_json(silent=True) or {}
+    page_requests = options.get('pages') or {}
+    if not isinstance(page_requests, dict):
+        return jsonify({"success": False, "error": "pages must map document paths to page ranges"}), 400
+    in_background = options.get('remaining_in_background', INGESTION_CONFIG["pdf_remaining_pages_in_background"])
+
+    documents = list(session_data[session_id]['documents'])
     if not documents:
         return jsonify({"success": False, "error": "No documents to ingest"}), 400
 
+    # One ingestion at a time per session
+    running = active_job_for_session(session_id)
+    if running:
+        if page_requests:
+            return jsonify({
+                "success": False,
+                "error": "Documents are being ingested, try again when processing finishes"
+            }), 409
+        return jsonify({
+            "success": True,
+            "job_id": running.id,
+            "status": running.status
+        }), 202
+
+    if page_requests:
+        files = {doc['path'] for doc in documents if doc['type'] == 'file'}
+        unknown = [path for path in page_requests if path not in files]
+        if unknown:
+            return jsonify({"success": False, "error": f"Document not found: {unknown[0]}"}), 404
+        try:
+            selections = {path: page_selection(path, spec) for path, spec in page_requests.items()}
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        with session_data.edit(session_id) as data:
+            if data is None:
+                return jsonify({"success": False, "error": "Invalid session"}), 400
+            for doc in data['documents']:
+                if doc['path'] in selections:
+                    select_pages(doc, selections[doc['path']])
+            documents = list(data['documents'])
+
+    # Only documents (and PDF pages) not already in the session's index need embedding
+    pending, load_args = pending_documents(documents)
+    if not pending and session_data.has_index(session_id):
+        return jsonify({
+            "success": True,
+            "job_id": None,
+            "status": "completed",
+            "message": "All documents are already ingested",
+            "documents_count": len(documents)
+        })
+
     try:
-        # Separate file paths and wiki links
-        pdf_files = []
-        text_files = []
-        csv_files = []
-        json_files = []
-        wiki_links = []
-
-        for doc in documents:
-            if doc['type'] == 'wiki':
-                wiki_links.append(doc['path'])
-            else:
-                filepath = doc['path']
-                if filepath.endswith('.pdf'):
-                    pdf_files.append(filepath)
-                elif filepath.endswith('.txt'):
-                    text_files.append(filepath)
-                elif filepath.endswith('.csv'):
-                    csv_files.append(filepath)
-                elif filepath.endswith('.json'):
-                    json_files.append(filepath)
-
-        # Ingest documents
-        persist_dir = os.path.join(UPLOAD_FOLDER, f"db_{session_id}")
-        db = ingest_documents(
+        job = submit_ingestion(session_id, pending, load_args, in_background)
+    except QueueFullError as e:
+        raise RateLimited(str(e), e.retry_after, "ingestion")
+
+    session_data.update(session_id, last_activity=datetime.now())
+
+    return jsonify({
+        "success": True,
+        "job_id": job.id,
+        "status": job.status,
+        "documents_count": len(documents),
+        "new_documents": len(pending)
+    }), 202
+
+
+def pending_documents(documents):
+    """Documents with content not in the index yet, and load_pdf arguments for each such PDF"""
+    pending = []
+    load_args = {}
+    for doc in documents:
+        if doc['type'] == 'file' and doc['path'].endswith('.pdf'):
+            args = pdf_load_args(doc)
+            if args is None:
+                continue
+            load_args[doc['path']] = args
+        elif doc.get('indexed'):
+            continue
+        pending.append(doc)
+    return pending, load_args
+
+
+def submit_ingestion(session_id, pending, load_args, remaining_in_background=False):
+    """
+    Queue a job indexing the pending documents into the session's index.
+
+    With remaining_in_background, PDFs indexed only in part are followed by
+    a job indexing their other pages once this one completes.
+    """
+    # Separate file paths and wiki links
+    pdf_files = []
+    text_files = []
+    csv_files = []
+    json_files = []
+    wiki_links = []
+
+    for doc in pending:
+        if doc['type'] == 'wiki':
+            wiki_links.append(doc['path'])
+        else:
+            filepath = doc['path']
+            if filepath.endswith('.pdf'):
+                pdf_files.append(filepath)
+            elif filepath.endswith('.txt'):
+                text_files.append(filepath)
+            elif filepath.endswith('.csv'):
+                csv_files.append(filepath)
+            elif filepath.endswith('.json'):
+                json_files.append(filepath)
+
+    persist_dir = session_data[session_id]['persist_dir']
+
+    def work(job):
+        return ingest_documents(
             pdf_files=pdf_files,
             text_files=text_files,
             csv_files=csv_files,
             json_files=json_files,
             wiki_links=wiki_links,
-            persist_dir=persist_dir
+            persist_dir=persist_dir,
+            progress=job.report,
+            pdf_pages=load_args,
+            commit=False
+        )
+
+    ingested_paths = {doc['path'] for doc in pending}
+    partial_pdfs = {path for path, args in load_args.items() if args["pages"] is not None}
+
+    def mark_indexed(data):
+        for doc in data['documents']:
+            if doc['path'] in ingested_paths:
+                if doc['path'] in load_args:
+                    pages = load_args[doc['path']]["pages"]
+                    if pages is None:
+                        doc.pop('indexed_pages', None)
+                    else:
+                        indexed = parse_page_ranges(doc['indexed_pages']) if doc.get('indexed_pages') else []
+                        doc['indexed_pages'] = format_page_ranges(indexed + pages)
+                doc['indexed'] = True
+        data['corpus_version'] = corpus_version(data['documents'])
+        data['last_activity'] = datetime.now()
+
+    def on_complete(db):
+        # Swap the new index in only once it is fully built; its chunks become
+        # searchable together with the corpus version answers are cached under
+        def commit(data):
+            commit_ingestion(db, persist_dir)
+            mark_indexed(data)
+
+        session_data.set_db(session_id, db, prepare=commit)
+        if remaining_in_background and partial_pdfs:
+            ingest_remaining_pages(session_id, partial_pdfs)
+
+    return submit_job(session_id, work, on_complete)
+
+
+def ingest_remaining_pages(session_id, paths):
+    """Select every page of these PDFs and queue a job indexing the ones still missing"""
+    with session_data.edit(session_id) as data:
+        if data is None:
+            return
+        for doc in data['documents']:
+            if doc['path'] in paths:
+                select_pages(doc, None)
+        documents = [doc for doc in data['documents'] if doc['path'] in paths]
+
+    pending, load_args = pending_documents(documents)
+    if pending:
+        try:
+            submit_ingestion(session_id, pending, load_args)
+        except QueueFullError:
+            pass  # The pages are still selected; the next ingest request indexes them
+
+
+@app.route('/api/documents/ingest/<job_id>', methods=['GET'])
+def ingest_status(job_id):
+    """Report progress of an ingestion job"""
+    payload, status = job_status(session.get('session_id'), job_id)
+    return jsonify(payload), status
+
+
+def job_status(session_id, job_id):
+    """Progress of one of the session's ingestion jobs as (payload, HTTP status); shared with asgi.py"""
+    if not session_id or session_id not in session_data:
+        return {"success": False, "error": "Invalid session"}, 400
+
+    job = get_job(job_id)
+    if not job or job.session_id != session_id:
+        return {"success": False, "error": "Job not found"}, 404
+
+    return {"success": True, **job.to_dict()}, 200
+
+
+@app.route('/api/documents/ingest/<job_id>/cancel', methods=['POST'])
+def cancel_ingest(job_id):
+    """Cancel a queued or running ingestion job"""
+    session_id = session.get('session_id')
+    if not session_id or session_id not in session_data:
+        return jsonify({"success": False, "error": "Invalid session"}), 400
+
+    job = get_job(job_id)
+    if not job or job.session_id != session_id:
+        return jsonify({"success": False, "error": "Job not found"}), 404
+
+    if not job.cancel():
+        return jsonify({"success": False, "error": f"Job already {job.status}"}), 409
+
+    return jsonify({"success": True, **job.to_dict()})
+
+
+class QuestionError(Exception):
+    """A question that cannot be answered as asked; status is the HTTP status to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def prepare_answer(session_id, question):
+    """
+    Everything before generation, shared by this route and asgi.py: rate
+    limit, answer cache lookup, similarity search and prompt build.
+
+    Returns a dict with the answer's tone, level and sources, and either the
+    cached answer text or the generator and prompt value to run.
+    """
+    if not session_id or session_id not in session_data:
+        raise QuestionError("Invalid session")
+    check_rate_limit(session_id)
+
+    question = (question or '').strip()
+    if not question:
+        raise QuestionError("Question cannot be empty")
+
+    # Check if documents are ingested
+    db = session_data.get_db(session_id)
+    if not db:
+        raise QuestionError("Please ingest documents first")
+
+    data = session_data[session_id]
+    prepared = {
+        "session_id": session_id,
+        "started": time.perf_counter(),
+        "tone": data['tone'],
+        "level": data['level'],
+        "cache_key": None,
+        "query_vector": None,
+        "cached": None,
+        "cache_answer": True
+    }
+
+    # Retrieval done while the question was typed, if it matches closely enough
+    prefetched = None
+    if prefetch_cache:
+        prefetched = prefetch_cache.get(
+            session_id, data['corpus_version'], question, get_embeddings().embed_query
         )
+    if prefetched:
+        prepared["query_vector"] = prefetched[0]
+        # Context retrieved for a different question must not be cached as this one's answer
+        prepared["cache_answer"] = prefetched[2] or prefetched[1] is None
+
+    # Reuse an earlier answer to the same question about the same corpus
+    if answer_cache:
+        prepared["cache_key"] = AnswerCache.make_key(data['corpus_version'], data['tone'], data['level'], question)
+        if answer_cache.semantic and prepared["query_vector"] is None:
+            prepared["query_vector"] = get_embeddings().embed_query(question)
+        cached = answer_cache.get(prepared["cache_key"], prepared["query_vector"])
+        if cached:
+            session_data.update(session_id, last_activity=datetime.now())
+            response, metadata = cached
+            prepared.update(cached=response, sources=metadata["sources"])
+            return prepared
+
+    # Reuse the prebuilt prompt and model for this tone
+    prompt, generator = get_stages(data['tone'])
+
+    # Search for context, reusing the query embedding if we already have it
+    if prefetched and prefetched[1] is not None:
+        scored_docs = prefetched[1]
+    else:
+        with ASK_STAGE_SECONDS.time(stage="similarity_search"):
+            scored_docs = search_with_relevance(
+                db,
+                question,
+                VECTOR_DB_CONFIG["search_fetch_k"],
+                query_vector=prepared["query_vector"]
+            )
+
+    with ASK_STAGE_SECONDS.time(stage="prompt_build"):
+        prompt_value, context_docs = build_prompt(prompt, scored_docs, question, data['level'])
+
+    prepared.update(generator=generator, prompt_value=prompt_value, sources=len(context_docs))
+    return prepared
+
+
+def finish_answer(prepared, response):
+    """Record a generated answer: total latency, answer cache and session activity"""
+    ASK_STAGE_SECONDS.observe(time.perf_counter() - prepared["started"], stage="total")
+    if answer_cache and prepared["cache_answer"]:
+        answer_cache.put(prepared["cache_key"], response, {"sources": prepared["sources"]}, prepared["query_vector"])
+    session_data.update(prepared["session_id"], last_activity=datetime.now())
+
+
+def answer_meta(prepared):
+    """Retrieval metadata sent with an answer, or ahead of a streamed one"""
+    meta = {"tone": prepared["tone"], "level": prepared["level"], "sources": prepared["sources"]}
+    if prepared["cached"] is not None:
+        meta["cached"] = True
+    return meta
+
+
+@app.route('/api/chat/prefetch', methods=['POST'])
+def prefetch_question():
+    """
+    Retrieve context for a question still being typed, so /api/chat/ask can
+    skip the search, and return snippets of the best matching chunks
+    """
+    if not prefetch_cache:
+        return jsonify({"success": False, "error": "Suggestions are disabled"}), 404
+
+    session_id = session.get('session_id')
+    if not session_id or session_id not in session_data:
+        return jsonify({"success": False, "error": "Invalid session"}), 400
 
-        session_data[session_id]['db'] = db
-        session_data[session_id]['last_activity'] = datetime.now()
+    question = ((request.json or {}).get('question') or '').strip()
+    db = session_data.get_db(session_id)
+    if len(question) < PREFETCH_CONFIG["min_question_chars"] or not db:
+        return jsonify({"success": True, "suggestions": []})
 
+    data = session_data[session_id]
+    found = prefetch_cache.lookup(session_id, data['corpus_version'], question, near=False)
+    if found:
+        scored_docs = found[1]
+    else:
+        with ASK_STAGE_SECONDS.time(stage="prefetch"):
+            query_vector = get_embeddings().embed_query(question)
+            scored_docs = search_with_relevance(
+                db, question, VECTOR_DB_CONFIG["search_fetch_k"], query_vector=query_vector
+            )
+        prefetch_cache.put(session_id, data['corpus_version'], question, query_vector, scored_docs)
+
+    return jsonify({"success": True, "suggestions": suggestion_snippets(scored_docs, data['documents'])})
+
+
+def suggestion_snippets(scored_docs, documents):
+    """Opening words of the best candidate chunks from distinct places, with their document name"""
+    names = {doc['path']: doc['name'] for doc in documents}
+    limit = PREFETCH_CONFIG["snippet_chars"]
+    snippets = []
+    seen = set()
+    for doc, score in scored_docs:
+        if score < VECTOR_DB_CONFIG["similarity_threshold"] or len(snippets) >= PREFETCH_CONFIG["suggestions"]:
+            break
+        # One snippet per page or record; plain text has neither, so per chunk
+        source = doc.metadata.get("source")
+        place = (source, next((doc.metadata[k] for k in ("page", "row", "seq_num", "start_index")
+                               if k in doc.metadata), None))
+        if place in seen:
+            continue
+        seen.add(place)
+
+        text = " ".join(doc.page_content.split())
+        if len(text) > limit:
+            text = text[:limit].rsplit(" ", 1)[0] + "…"
+        snippet = {"text": text, "source": names.get(source, source), "score": round(score, 3)}
+        if "page" in doc.metadata:
+            snippet["page"] = doc.metadata["page"] + 1
+        snippets.append(snippet)
+    return snippets
+
+
+@app.route('/api/chat/ask', methods=['POST'])
+def ask_question():
+    """Ask a question to the AI"""
+    stream = request.args.get('stream') == '1'
+    try:
+        prepared = prepare_answer(session.get('session_id'), (request.json or {}).get('question'))
+        if prepared["cached"] is not None:
+            return cached_answer(prepared, stream)
+        # Waits briefly for a free slot, otherwise raises RateLimited (answered with 429)
+        release_slot = generation_slots.acquire()
+    except QuestionError as e:
+        return jsonify({"success": False, "error": str(e)}), e.status
+    except RateLimited:
+        raise
+    except Exception as e:
         return jsonify({
-            "success": True,
-            "message": "Documents ingested successfully",
-            "documents_count": len(documents)
-        })
+            "success": False,
+            "error": f"Error processing question: {str(e)}"
+        }), 500
 
+    generator = prepared["generator"]
+
+    if stream:
+        def generate():
+            # Retrieval metadata goes out before the first token
+            yield sse_event("meta", answer_meta(prepared))
+            tokens = []
+            llm_started = time.perf_counter()
+            try:
+                for token in generator.stream(prepared["prompt_value"]):
+                    if token:
+                        if not tokens:
+                            ASK_STAGE_SECONDS.observe(time.perf_counter() - llm_started, stage="llm_first_token")
+                        tokens.append(token)
+                        yield sse_event("token", {"text": token})
+            except Exception as e:
+                yield sse_event("error", {"error": f"Error processing question: {str(e)}"})
+                return
+            finally:
+                release_slot()
+            ASK_STAGE_SECONDS.observe(time.perf_counter() - llm_started, stage="llm")
+            finish_answer(prepared, "".join(tokens))
+            yield sse_event("done", {"success": True})
+
+        response = Response(stream_with_context(generate()), mimetype='text/event-stream', headers=SSE_HEADERS)
+        # Also frees the slot if the client leaves before the stream starts
+        response.call_on_close(release_slot)
+        return response
+
+    # Generate response
+    try:
+        with ASK_STAGE_SECONDS.time(stage="llm"):
+            response = generator.invoke(prepared["prompt_value"])
     except Exception as e:
         return jsonify({
             "success": False,
-            "error": f"Error ingesting documents: {str(e)}"
+            "error": f"Error processing question: {str(e)}"
         }), 500
+    finally:
+        release_slot()
+    finish_answer(prepared, response)
+
+    return jsonify({"success": True, "response": response, **answer_meta(prepared)})
+
+
+def build_prompt(prompt, scored_docs, question, level):
+    """Fill the tone's prompt with budgeted context; returns (prompt value, context documents)"""
+    # Drop weak matches, merge overlapping chunks and stop at the token budget
+    context, context_docs = build_context(
+        scored_docs,
+        token_budget=VECTOR_DB_CONFIG["context_token_budget"],
+        threshold=VECTOR_DB_CONFIG["similarity_threshold"],
+        max_overlap=VECTOR_DB_CONFIG["chunk_overlap"],
+        k=VECTOR_DB_CONFIG["search_k"]
+    )
+    CONTEXT_TOKENS.observe(estimate_tokens(context))
+    prompt_value = prompt.invoke({
+        "context": context,
+        "question": question,
+        "level": level
+    })
+    return prompt_value, context_docs
 
 
-@app.route('/api/chat/ask', methods=['POST'])
-def ask_question():
-    """Ask a question to the AI"""
+@app.route('/api/chat/batch', methods=['POST'])
+def ask_batch():
+    """Answer many questions: one batched embedding and search, then concurrent generation"""
     session_id = session.get('session_id')
     if not session_id or session_id not in session_data:
         return jsonify({"success": False, "error": "Invalid session"}), 400
 
-    data = request.json
-    question = data.get('question', '').strip()
-
-    if not question:
+    questions = (request.json or {}).get('questions')
+    if not isinstance(questions, list) or not questions:
+        return jsonify({"success": False, "error": "questions must be a non-empty list"}), 400
+    if len(questions) > BATCH_CONFIG["max_questions"]:
+        return jsonify({
+            "success": False,
+            "error": f"At most {BATCH_CONFIG['max_questions']} questions per batch"
+        }), 400
+    questions = [str(q).strip() for q in questions]
+    if not all(questions):
         return jsonify({"success": False, "error": "Question cannot be empty"}), 400
 
-    # Check if documents are ingested
-    db = session_data[session_id].get('db')
+    # Every question counts against the session's budget; a full generation queue fails fast
+    check_rate_limit(session_id, cost=len(questions))
+    generation_slots.check()
+
+    db = session_data.get_db(session_id)
     if not db:
         return jsonify({
             "success": False,
@@ -271,49 +1150,120 @@ def ask_question():
         }), 400
 
     try:
-        tone = session_data[session_id]['tone']
-        level = session_data[session_id]['level']
-
-        # Get prompt template
-        prompt_template = PROMPT_MAP.get(tone, PROMPT_MAP['default'])
-        prompt = PromptTemplate.from_template(prompt_template)
-
-        # Initialize LLM
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            temperature=0.4
-        )
-
-        # Create chain
-        output_parser = StrOutputParser()
-        chain = prompt | llm | output_parser
+        started = time.perf_counter()
+        data = session_data[session_id]
+        tone = data['tone']
+        level = data['level']
+        prompt, generator = get_stages(tone)
+
+        with BATCH_STAGE_SECONDS.time(stage="embed"):
+            vectors = embed_queries(questions)
+
+        # Cached answers go out first; only the rest are searched and generated
+        cache_keys = [None] * len(questions)
+        cached = {}
+        if answer_cache:
+            for index, question in enumerate(questions):
+                cache_keys[index] = AnswerCache.make_key(data['corpus_version'], tone, level, question)
+                hit = answer_cache.get(cache_keys[index], vectors[index] if answer_cache.semantic else None)
+                if hit:
+                    cached[index] = hit
+        pending = [index for index in range(len(questions)) if index not in cached]
+
+        with BATCH_STAGE_SECONDS.time(stage="similarity_search"):
+            results = search_many_with_relevance(
+                db,
+                [vectors[index] for index in pending],
+                VECTOR_DB_CONFIG["search_fetch_k"]
+            )
+        with BATCH_STAGE_SECONDS.time(stage="prompt_build"):
+            prompts = [
+                build_prompt(prompt, scored_docs, questions[index], level)
+                for index, scored_docs in zip(pending, results)
+            ]
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Error processing questions: {str(e)}"
+        }), 500
 
-        # Search for context
-        context_docs = db.similarity_search(question, k=4)
-        context = "\n".join([doc.page_content for doc in context_docs])
+    def generate_one(prompt_value):
+        release_slot = generation_slots.acquire()
+        try:
+            return generator.invoke(prompt_value)
+        finally:
+            release_slot()
 
-        # Generate response
-        response = chain.invoke({
-            "context": context,
-            "question": question,
-            "level": level
+    def generate():
+        yield sse_event("meta", {
+            "tone": tone,
+            "level": level,
+            "questions": len(questions),
+            "cached": len(cached)
         })
+        for index, (response, metadata) in cached.items():
+            yield sse_event("answer", {
+                "index": index,
+                "question": questions[index],
+                "response": response,
+                "sources": metadata["sources"],
+                "cached": True
+            })
 
-        session_data[session_id]['last_activity'] = datetime.now()
+        # Answers stream back in completion order, at most max_concurrency in flight,
+        # each taking a generation slot shared with /api/chat/ask
+        failed = 0
+        completed = RunnableLambda(generate_one).batch_as_completed(
+            [prompt_value for prompt_value, _ in prompts],
+            config={"max_concurrency": BATCH_CONFIG["max_concurrency"]},
+            return_exceptions=True
+        )
+        for position, response in completed:
+            index = pending[position]
+            sources = len(prompts[position][1])
+            if isinstance(response, Exception):
+                failed += 1
+                yield sse_event("error", {
+                    "index": index,
+                    "question": questions[index],
+                    "error": f"Error processing question: {str(response)}"
+                })
+                continue
+            if answer_cache:
+                answer_cache.put(
+                    cache_keys[index], response, {"sources": sources},
+                    vectors[index] if answer_cache.semantic else None
+                )
+            yield sse_event("answer", {
+                "index": index,
+                "question": questions[index],
+                "response": response,
+                "sources": sources,
+                "cached": False
+            })
 
-        return jsonify({
+        BATCH_STAGE_SECONDS.observe(time.perf_counter() - started, stage="total")
+        session_data.update(session_id, last_activity=datetime.now())
+        yield sse_event("done", {
             "success": True,
-            "response": response,
-            "tone": tone,
-            "level": level,
-            "sources": len(context_docs)
+            "answered": len(questions) - failed,
+            "failed": failed
         })
 
-    except Exception as e:
-        return jsonify({
-            "success": False,
-            "error": f"Error processing question: {str(e)}"
-        }), 500
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+
+def cached_answer(prepared, stream):
+    """Serve a cached answer in the same shape as a freshly generated one"""
+    if not stream:
+        return jsonify({"success": True, "response": prepared["cached"], **answer_meta(prepared)})
+
+    events = (
+        sse_event("meta", answer_meta(prepared))
+        + sse_event("token", {"text": prepared["cached"]})
+        + sse_event("done", {"success": True})
+    )
+    return Response(events, mimetype='text/event-stream', headers=SSE_HEADERS)
 
 
 @app.route('/api/session/info', methods=['GET'])
@@ -330,7 +1280,7 @@ def session_info():
         "tone": data['tone'],
         "level": data['level'],
         "documents_count": len(data['documents']),
-        "db_initialized": data['db'] is not None,
+        "db_initialized": session_data.has_index(session_id),
         "created_at": data['created_at'].isoformat(),
         "last_activity": data['last_activity'].isoformat()
     })
@@ -343,15 +1293,18 @@ def reset_session():
     if not session_id or session_id not in session_data:
         return jsonify({"success": False, "error": "Invalid session"}), 400
 
-    # Clean up uploaded files
-    persist_dir = os.path.join(UPLOAD_FOLDER, f"db_{session_id}")
-    if os.path.exists(persist_dir):
-        shutil.rmtree(persist_dir)
+    persist_dir = session_data[session_id]['persist_dir']
 
-    # Delete session
+    # Delete session, closing its vector store
     del session_data[session_id]
+    if prefetch_cache:
+        prefetch_cache.forget(session_id)
     session.pop('session_id', None)
 
+    # Clean up uploaded files
+    if os.path.exists(persist_dir):
+        shutil.rmtree(persist_dir)
+
     # Create new session
     new_session_id = create_session()
     session['session_id'] = new_session_id
@@ -362,6 +1315,52 @@ def reset_session():
     })
 
 
+@app.route('/api/health/live', methods=['GET'])
+def liveness():
+    """The process is up"""
+    return jsonify({"success": True, "status": "alive"})
+
+
+@app.route('/api/health/ready', methods=['GET'])
+def readiness():
+    """Route traffic here only once models are loaded"""
+    if ready.is_set():
+        return jsonify({"success": True, "status": "ready"})
+    return jsonify({
+        "success": False,
+        "status": "failed" if warmup_error else "warming_up",
+        "error": warmup_error
+    }), 503
+
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Report cache hit, miss and size counters"""
+    return jsonify({
+        "success": True,
+        "embeddings": embedding_cache.stats() if embedding_cache else None,
+        "answers": answer_cache.stats() if answer_cache else None,
+        "http": fetcher_stats(),
+        "pdf_pages": get_page_cache().stats() if get_page_cache() else None,
+        "prefetch": prefetch_cache.stats() if prefetch_cache else None,
+        "uploads": upload_store.stats(),
+        "disk": janitor.stats(),
+        "sessions": session_data.stats(),
+        "admission": {
+            "rate_limits": rate_limiter.stats() if rate_limiter else None,
+            "generation": generation_slots.stats(),
+            "async_generation": async_generation_slots.stats(),
+            "ingestion": queue_stats()
+        }
+    })
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Stage latencies, ingestion counters and memory gauges in Prometheus text format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
 @app.errorhandler(413)
 def request_entity_too_large(error):
     """Handle file too large error"""
@@ -371,6 +1370,24 @@ def request_entity_too_large(error):
     }), 413
 
 
+@app.errorhandler(RateLimited)
+def too_many_requests(error):
+    """Turn a request over a limit away at once instead of queueing it"""
+    response = jsonify(rejection(error))
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 429
+
+
+def rejection(error):
+    """Count a RateLimited rejection and describe it for the client; shared with asgi.py"""
+    REQUESTS_REJECTED.inc(reason=error.reason)
+    return {
+        "success": False,
+        "error": f"{error}, please retry in {error.retry_after}s",
+        "retry_after": error.retry_after
+    }
+
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors"""
@@ -384,4 +1401,4 @@ def internal_error(error):
 
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.run(debug=DEBUG, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,289 @@
+"""
+ASGI entry point for Learn with AI
+Answers /api/chat/ask and ingestion status on an asyncio event loop, so a
+question waiting on the LLM holds no thread; every other route is the Flask
+app, run on a thread pool.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+Run one event loop per process (uvicorn --workers N or gunicorn -k
+uvicorn.workers.UvicornWorker) and use the sqlite session backend with
+several workers, as for the WSGI server.
+"""
+
+import asyncio
+import json
+import re
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+import app as flask_module
+from app import (
+    QuestionError, prepare_answer, finish_answer, answer_meta, job_status, rejection,
+    sse_event, async_generation_slots, SSE_HEADERS
+)
+from config import ASGI_CONFIG
+from metrics import ASK_STAGE_SECONDS
+from rate_limits import RateLimited
+
+flask_app = flask_module.app
+
+# Request bodies larger than this go to a temporary file instead of memory
+SPOOL_BYTES = 1024 * 1024
+
+_executor = ThreadPoolExecutor(max_workers=ASGI_CONFIG["executor_threads"], thread_name_prefix="asgi")
+
+
+async def run_sync(function, *args):
+    """Run blocking work (vector search, session store, Flask) off the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(_executor, function, *args)
+
+
+# ----- ASGI <-> WSGI -----
+
+async def read_body(scope, receive):
+    """The whole request body in a rewound file; nothing is read if it is over the Flask limit"""
+    body = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+    declared = next((int(v) for k, v in scope["headers"] if k == b"content-length"), None)
+    limit = flask_app.config["MAX_CONTENT_LENGTH"]
+    if declared is not None and limit and declared > limit:
+        return body  # Flask answers 413 from the Content-Length alone
+
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        body.write(message.get("body", b""))
+        more_body = message.get("more_body", False)
+    body.seek(0)
+    return body
+
+
+def wsgi_environ(scope, body):
+    script_name = scope.get("root_path", "").encode("utf8").decode("latin1")
+    path_info = scope["path"].encode("utf8").decode("latin1")
+    if path_info.startswith(script_name):
+        path_info = path_info[len(script_name):]
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": script_name,
+        "PATH_INFO": path_info,
+        "QUERY_STRING": scope["query_string"].decode("latin1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+    for name, value in scope["headers"]:
+        name = name.decode("latin1").upper().replace("-", "_")
+        key = name if name in ("CONTENT_TYPE", "CONTENT_LENGTH") else "HTTP_" + name
+        value = value.decode("latin1")
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+async def call_flask(environ, send):
+    """
+    Run the Flask app for one request on the thread pool and relay its response.
+
+    The app and its response iterable run in one thread, as under a WSGI
+    server, so streamed responses keep their request context; chunks are
+    handed to the event loop as they are produced. If the client goes away
+    the iterable is closed at the next chunk.
+    """
+    loop = asyncio.get_running_loop()
+    messages = asyncio.Queue()
+    disconnected = False
+
+    def put(message):
+        loop.call_soon_threadsafe(messages.put_nowait, message)
+
+    def start_response(status, headers, exc_info=None):
+        put({
+            "type": "http.response.start",
+            "status": int(status.split(" ", 1)[0]),
+            "headers": [(k.lower().encode("latin1"), v.encode("latin1")) for k, v in headers],
+        })
+        return lambda data: put({"type": "http.response.body", "body": data, "more_body": True})
+
+    def run():
+        try:
+            iterable = flask_app(environ, start_response)
+            try:
+                for chunk in iterable:
+                    if disconnected:
+                        break
+                    if chunk:
+                        put({"type": "http.response.body", "body": chunk, "more_body": True})
+            finally:
+                if hasattr(iterable, "close"):
+                    iterable.close()
+        finally:
+            put(None)
+
+    worker = loop.run_in_executor(_executor, run)
+    try:
+        while (message := await messages.get()) is not None:
+            await send(message)
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+    finally:
+        disconnected = True
+        await worker
+
+
+# ----- async routes -----
+
+def flask_session(environ):
+    """The Flask session cookie, decoded the way Flask itself does"""
+    return flask_app.session_interface.open_session(flask_app, flask_app.request_class(environ)) or {}
+
+
+async def send_json(send, payload, status=200, headers=()):
+    body = json.dumps(payload).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                    *headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def send_event(send, event, data):
+    await send({"type": "http.response.body", "body": sse_event(event, data).encode(), "more_body": True})
+
+
+async def ask(environ, body, send):
+    """/api/chat/ask: search in the thread pool, then await the LLM on the event loop"""
+    stream = parse_qs(environ["QUERY_STRING"]).get("stream") == ["1"]
+    try:
+        question = json.loads(body.read() or b"{}").get("question")
+    except (ValueError, AttributeError):
+        return await send_json(send, {"success": False, "error": "Invalid JSON body"}, 400)
+
+    try:
+        prepared = await run_sync(prepare_answer, flask_session(environ).get("session_id"), question)
+        if prepared["cached"] is not None:
+            release_slot = None
+        else:
+            # Waits on the event loop for a free slot, otherwise raises RateLimited
+            release_slot = await async_generation_slots.acquire()
+    except QuestionError as e:
+        return await send_json(send, {"success": False, "error": str(e)}, e.status)
+    except RateLimited as e:
+        return await send_json(send, rejection(e), 429, [(b"retry-after", str(e.retry_after).encode())])
+    except Exception as e:
+        return await send_json(send, {"success": False, "error": f"Error processing question: {str(e)}"}, 500)
+
+    # The slot is released even if the disconnect watcher cancels this task
+    # during one of the sends below; releasing twice is harmless
+    try:
+        if not stream:
+            if release_slot is None:
+                return await send_json(send, {"success": True, "response": prepared["cached"],
+                                              **answer_meta(prepared)})
+            try:
+                with ASK_STAGE_SECONDS.time(stage="llm"):
+                    response = await prepared["generator"].ainvoke(prepared["prompt_value"])
+            except Exception as e:
+                return await send_json(send, {"success": False, "error": f"Error processing question: {str(e)}"}, 500)
+            finally:
+                release_slot()
+            await run_sync(finish_answer, prepared, response)
+            return await send_json(send, {"success": True, "response": response, **answer_meta(prepared)})
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/event-stream; charset=utf-8")]
+                       + [(k.lower().encode(), v.encode()) for k, v in SSE_HEADERS.items()],
+        })
+        # Retrieval metadata goes out before the first token
+        await send_event(send, "meta", answer_meta(prepared))
+        if release_slot is None:
+            await send_event(send, "token", {"text": prepared["cached"]})
+        else:
+            tokens = []
+            llm_started = asyncio.get_running_loop().time()
+            try:
+                async for token in prepared["generator"].astream(prepared["prompt_value"]):
+                    if token:
+                        if not tokens:
+                            ASK_STAGE_SECONDS.observe(asyncio.get_running_loop().time() - llm_started,
+                                                      stage="llm_first_token")
+                        tokens.append(token)
+                        await send_event(send, "token", {"text": token})
+            except Exception as e:
+                await send_event(send, "error", {"error": f"Error processing question: {str(e)}"})
+                return await send({"type": "http.response.body", "body": b""})
+            finally:
+                release_slot()
+            ASK_STAGE_SECONDS.observe(asyncio.get_running_loop().time() - llm_started, stage="llm")
+            await run_sync(finish_answer, prepared, "".join(tokens))
+        await send_event(send, "done", {"success": True})
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        if release_slot is not None:
+            release_slot()
+
+
+async def ingest_status(environ, body, send, job_id):
+    """/api/documents/ingest/<job_id>, polled every second by the page"""
+    payload, status = await run_sync(job_status, flask_session(environ).get("session_id"), job_id)
+    await send_json(send, payload, status)
+
+
+ROUTES = [
+    ("POST", re.compile(r"/api/chat/ask"), ask),
+    ("GET", re.compile(r"/api/documents/ingest/(?P<job_id>[^/]+)"), ingest_status),
+]
+
+
+async def until_disconnected(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                _executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+
+    body = await read_body(scope, receive)
+    environ = wsgi_environ(scope, body)
+    for method, pattern, handler in ROUTES:
+        match = pattern.fullmatch(environ["PATH_INFO"])
+        if match and scope["method"] == method:
+            # A client that goes away cancels its request, freeing the generation slot
+            handling = asyncio.ensure_future(handler(environ, body, send, **match.groupdict()))
+            watching = asyncio.ensure_future(until_disconnected(receive))
+            try:
+                done, _ = await asyncio.wait([handling, watching], return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                watching.cancel()
+            if handling in done:
+                return handling.result()
+            handling.cancel()
+            await asyncio.gather(handling, return_exceptions=True)
+            return
+    await call_flask(environ, send)
@@ -0,0 +1,180 @@
+"""
+Concurrent /api/chat/ask load against the Flask app on a fixed pool of WSGI
+threads (like gunicorn --threads N) and against asgi.py under uvicorn, with
+a stub LLM that takes `latency` seconds per answer.
+
+Under WSGI at most `threads` questions wait on the LLM at once; under ASGI
+the peak follows the number of clients:
+
+    python benchmarks/async_serving.py [clients] [llm_latency_seconds] [wsgi_threads]
+"""
+
+import asyncio
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import uvicorn
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from suite import corpus, latency_summary, prepare_session
+from fixtures import FakeEmbeddings, StubChatModel, questions
+
+_lock = threading.Lock()
+_in_flight = 0
+_peak = 0
+
+
+def _enter():
+    global _in_flight, _peak
+    with _lock:
+        _in_flight += 1
+        _peak = max(_peak, _in_flight)
+
+
+def _leave():
+    global _in_flight
+    with _lock:
+        _in_flight -= 1
+
+
+class CountingChatModel(StubChatModel):
+    """StubChatModel that records how many answers are being generated at once"""
+
+    def _call(self, *args, **kwargs):
+        _enter()
+        try:
+            return super()._call(*args, **kwargs)
+        finally:
+            _leave()
+
+    async def _agenerate(self, *args, **kwargs):
+        _enter()
+        try:
+            return await super()._agenerate(*args, **kwargs)
+        finally:
+            _leave()
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug's server with a fixed number of request threads"""
+
+    def __init__(self, host, port, app, threads):
+        super().__init__(host, port, app, handler=QuietHandler)
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def post_json(port, path, cookie, payload):
+    """
+    One HTTP/1.1 request on a fresh connection; returns the status code.
+
+    Plain asyncio streams rather than an HTTP client library, so the load
+    generator itself stays cheap next to the server it shares a process with.
+    """
+    body = json.dumps(payload).encode()
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\nCookie: session={cookie}\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+        + body
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return int(response.split(b" ", 2)[1])
+
+
+async def load(port, cookie, batch):
+    """Send every question at once; returns (latencies of 200s, other status codes, wall seconds)"""
+    async def one(question):
+        start = time.perf_counter()
+        status = await post_json(port, "/api/chat/ask", cookie, {"question": question})
+        return status, time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(question) for question in batch))
+    wall = time.perf_counter() - start
+    return [s for code, s in results if code == 200], [code for code, _ in results if code != 200], wall
+
+
+def report(label, ok, failed, wall):
+    global _peak
+    summary = latency_summary(ok) if ok else {"p50_ms": 0, "p99_ms": 0}
+    print(f"{label:<22} {len(ok):4d} answered  {len(failed):3d} failed  wall {wall:6.2f} s  "
+          f"p50 {summary['p50_ms'] / 1000:6.2f} s  p99 {summary['p99_ms'] / 1000:6.2f} s  "
+          f"peak LLM calls in flight {_peak}")
+    _peak = 0
+
+
+if __name__ == "__main__":
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+    threads = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+
+    workdir = tempfile.mkdtemp(prefix="learnai-asgi-")
+    os.chdir(workdir)
+    import config
+    config.CACHE_CONFIG["enable_query_cache"] = False
+
+    import vectordatabase
+    vectordatabase._embeddings = vectordatabase.TimedEmbeddings(FakeEmbeddings())
+    import chains
+    chains.set_llm(CountingChatModel(latency=latency))
+
+    import asgi
+    from rate_limits import ConcurrencyLimiter
+    app_module = asgi.flask_module
+    app_module.ready.wait(600)
+    # Only the server's threads should bound the WSGI run
+    app_module.generation_slots = ConcurrencyLimiter("generation", clients, 0, 0)
+
+    owner = app_module.app.test_client()
+    prepare_session(owner, corpus(workdir, 100 * 1024))
+    cookie = owner.get_cookie("session").value
+    print(f"{clients} concurrent questions, stub latency {latency}s")
+
+    port = free_port()
+    wsgi_server = PooledWSGIServer("127.0.0.1", port, app_module.app, threads)
+    threading.Thread(target=wsgi_server.serve_forever, daemon=True).start()
+    report(f"WSGI, {threads} threads",
+           *asyncio.run(load(port, cookie, questions(clients, seed=11))))
+    wsgi_server.shutdown()
+
+    port = free_port()
+    asgi_server = uvicorn.Server(uvicorn.Config(asgi.app, host="127.0.0.1", port=port, log_level="warning",
+                                                backlog=4096))
+    threading.Thread(target=asgi_server.run, daemon=True).start()
+    while not asgi_server.started:
+        time.sleep(0.05)
+    report("ASGI (uvicorn)",
+           *asyncio.run(load(port, cookie, questions(clients, seed=12))))
+    asgi_server.should_exit = True
@@ -0,0 +1,66 @@
+"""
+/api/chat/batch vs. one /api/chat/ask round trip per question, with a stub
+LLM of fixed latency, through the Flask test client:
+
+    python benchmarks/batch_questions.py [questions] [llm_latency_seconds] [max_concurrency]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from suite import corpus, prepare_session
+from fixtures import FakeEmbeddings, StubChatModel, questions
+
+
+def read_events(body):
+    for block in body.decode().strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        yield lines["event"], json.loads(lines["data"])
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+
+    workdir = tempfile.mkdtemp(prefix="learnai-batch-")
+    os.chdir(workdir)
+    import config
+    config.CACHE_CONFIG["enable_query_cache"] = False
+    if len(sys.argv) > 3:
+        config.BATCH_CONFIG["max_concurrency"] = int(sys.argv[3])
+
+    import vectordatabase
+    vectordatabase._embeddings = vectordatabase.TimedEmbeddings(FakeEmbeddings())
+    import chains
+    chains.set_llm(StubChatModel(latency=latency))
+
+    import app as app_module
+    app_module.ready.wait(600)
+    client = app_module.app.test_client()
+    prepare_session(client, corpus(workdir, 200 * 1024))
+    batch = questions(count, seed=5)
+
+    start = time.perf_counter()
+    for question in batch:
+        assert client.post("/api/chat/ask", json={"question": question}).status_code == 200
+    one_by_one = time.perf_counter() - start
+
+    start = time.perf_counter()
+    response = client.post("/api/chat/batch", json={"questions": batch})
+    answers = 0
+    for event, data in read_events(response.get_data()):
+        if event == "answer":
+            answers += 1
+    batched = time.perf_counter() - start
+    assert answers == count, answers
+
+    cap = config.BATCH_CONFIG["max_concurrency"]
+    print(f"{count} questions, stub latency {latency}s, max_concurrency {cap}")
+    print(f"one /ask per question: {one_by_one:7.2f} s")
+    print(f"one /batch request:    {batched:7.2f} s  "
+          f"(lower bound {-(-count // cap) * latency:.2f} s at this cap)")
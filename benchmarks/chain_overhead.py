@@ -0,0 +1,63 @@
+"""
+Microbenchmark: per-request chain construction vs. the prebuilt chain registry
+
+The model is replaced by a local stub so only client setup and chain
+composition are measured. Run from the project root:
+
+    python benchmarks/chain_overhead.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-key")
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.prompts import PromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+import chains
+from tones import PROMPT_MAP
+
+ITERATIONS = 200
+INPUTS = {"context": "Photosynthesis converts light into chemical energy.",
+          "question": "What is photosynthesis?",
+          "level": "beginner"}
+
+
+def stub_llm():
+    return FakeListChatModel(responses=["Photosynthesis is how plants make food."])
+
+
+def per_request(tone):
+    """What ask_question used to do on every call"""
+    prompt = PromptTemplate.from_template(PROMPT_MAP[tone])
+    # Client setup only; the stub answers so no network call is made
+    ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.4)
+    chain = prompt | stub_llm() | StrOutputParser()
+    return chain.invoke(INPUTS)
+
+
+def registry(tone):
+    return chains.get_chain(tone).invoke(INPUTS)
+
+
+def measure(fn):
+    tones = list(PROMPT_MAP)
+    fn(tones[0])  # warm imports and caches
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        fn(tones[i % len(tones)])
+    return (time.perf_counter() - start) / ITERATIONS * 1e6
+
+
+if __name__ == "__main__":
+    chains.set_llm(stub_llm())
+    before = measure(per_request)
+    after = measure(registry)
+    print(f"per-request construction: {before:9.1f} us/request")
+    print(f"prebuilt registry:        {after:9.1f} us/request")
+    print(f"overhead removed:         {before - after:9.1f} us/request ({before / after:.1f}x)")
@@ -0,0 +1,81 @@
+"""
+Prompt context size: the old fixed k=4 newline join vs. the token-budgeted
+builder (relevance threshold, overlap merging, token budget).
+
+Indexes a sample corpus of topical articles with the flat backend and asks
+one question per article. The default embedder is a bag-of-words hashing
+fake, which runs offline but scores on a different scale from MiniLM, so
+the threshold is also reported disabled; pass --embedder minilm for real
+scores (the model must be in the local HF cache):
+
+    python benchmarks/context_size.py [--articles 40] [--embedder minilm]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import HashingEmbeddings, write_articles
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=40)
+    parser.add_argument("--embedder", choices=("hashing", "minilm"), default="hashing")
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="learnai-context-"))
+    import config
+    config.VECTOR_DB_CONFIG["backend"] = "flat"
+    config.CACHE_CONFIG["enable_embedding_cache"] = False
+
+    import vectordatabase
+    if args.embedder == "hashing":
+        vectordatabase._embeddings = HashingEmbeddings()
+    from context_builder import build_context, estimate_tokens
+    from vectordatabase import ingest_documents, search_with_relevance
+
+    topics = write_articles("articles.txt", args.articles)
+    db = ingest_documents(text_files=["articles.txt"], persist_dir="db")
+
+    settings = config.VECTOR_DB_CONFIG
+    variants = {
+        "k=4 join (before)": None,
+        "merge + budget": dict(threshold=None),
+        "threshold + merge + budget": dict(threshold=settings["similarity_threshold"]),
+    }
+    totals = {name: [0, 0] for name in variants}  # tokens, chunks
+
+    for topic in topics:
+        question = f"Explain how {topic[0]}, {topic[1]} and {topic[2]} are related"
+        scored = search_with_relevance(db, question, settings["search_fetch_k"])
+        for name, options in variants.items():
+            if options is None:
+                docs = [doc for doc, _ in scored[:4]]
+                context = "\n".join(doc.page_content for doc in docs)
+            else:
+                context, docs = build_context(
+                    scored,
+                    token_budget=settings["context_token_budget"],
+                    max_overlap=settings["chunk_overlap"],
+                    **options
+                )
+            totals[name][0] += estimate_tokens(context)
+            totals[name][1] += len(docs)
+
+    baseline = totals["k=4 join (before)"][0] / len(topics)
+    print(f"{len(topics)} questions, budget {settings['context_token_budget']} tokens, "
+          f"threshold {settings['similarity_threshold']}, embedder {args.embedder}")
+    for name, (tokens, chunks) in totals.items():
+        average = tokens / len(topics)
+        print(f"{name:<28} {average:7.1f} tokens/question  {chunks / len(topics):4.1f} chunks  "
+              f"{100 * (1 - average / baseline):5.1f}% smaller")
+
+
+if __name__ == "__main__":
+    main()
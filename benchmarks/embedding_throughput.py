@@ -0,0 +1,89 @@
+"""
+Embedding throughput on CPU: chunks/second for several batch sizes,
+single-process vs. multi-process encoding, including the Chroma index write.
+
+Pass --fake to run offline: a FakeEncoder (benchmarks/fixtures.py) with a
+model-shaped CPU cost replaces MiniLM. Its absolute rates mean nothing for
+the real model; the comparison between modes and batch sizes does, on the
+same host.
+
+    python benchmarks/embedding_throughput.py [num_chunks] [--fake]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.documents import Document
+from langchain_community.vectorstores import Chroma
+
+from config import VECTOR_DB_CONFIG
+from vectordatabase import MultiProcessEmbeddings
+
+WORDS = ("cell energy light plant water carbon oxygen glucose membrane enzyme "
+         "protein reaction gradient molecule chlorophyll photon electron").split()
+
+
+def make_chunks(count, size=1000, seed=7):
+    rng = random.Random(seed)
+    chunks = []
+    for i in range(count):
+        text = []
+        while sum(len(w) + 1 for w in text) < size:
+            text.append(rng.choice(WORDS))
+        chunks.append(Document(page_content=" ".join(text), metadata={"source": f"chunk-{i}"}))
+    return chunks
+
+
+def run(embeddings, chunks, index_batch_size):
+    persist_dir = tempfile.mkdtemp(prefix="bench_db_")
+    try:
+        db = Chroma(embedding_function=embeddings, persist_directory=persist_dir)
+        start = time.perf_counter()
+        for i in range(0, len(chunks), index_batch_size):
+            db.add_documents(chunks[i:i + index_batch_size])
+        return len(chunks) / (time.perf_counter() - start)
+    finally:
+        shutil.rmtree(persist_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("num_chunks", type=int, nargs="?", default=3000)
+    parser.add_argument("--fake", action="store_true", help="use FakeEncoder instead of MiniLM")
+    args = parser.parse_args()
+
+    if args.fake:
+        from fixtures import FakeEncoderEmbeddings
+
+        def make_embeddings(batch_size=32):
+            return FakeEncoderEmbeddings(batch_size)
+    else:
+        from langchain_huggingface import HuggingFaceEmbeddings
+
+        def make_embeddings(batch_size=32):
+            return HuggingFaceEmbeddings(
+                model_name=VECTOR_DB_CONFIG["embedding_model"], encode_kwargs={"batch_size": batch_size}
+            )
+
+    chunks = make_chunks(args.num_chunks)
+    index_batch_size = VECTOR_DB_CONFIG["index_batch_size"]
+
+    print(f"{args.num_chunks} chunks of ~1000 chars, {os.cpu_count()} CPU cores, index batch {index_batch_size}"
+          + (", fake encoder" if args.fake else ""))
+    for batch_size in (16, 32, 64, 128):
+        rate = run(make_embeddings(batch_size), chunks, index_batch_size)
+        print(f"single-process  batch={batch_size:<4} {rate:8.1f} chunks/s")
+
+    for batch_size in (32, 64):
+        pooled = MultiProcessEmbeddings(make_embeddings(), batch_size)
+        pooled.embed_documents(["warmup"])  # exclude pool startup
+        rate = run(pooled, chunks, index_batch_size)
+        print(f"multi-process   batch={batch_size:<4} {rate:8.1f} chunks/s")
@@ -0,0 +1,312 @@
+"""
+Offline stand-ins shared by the benchmark scripts
+
+- Deterministic PDF, TXT, CSV and JSON fixtures of a requested size
+- FakeEmbeddings: hash-seeded unit vectors in place of MiniLM
+- HashingEmbeddings: bag-of-words vectors, for benchmarks where relevance must mean something
+- FakeEncoderEmbeddings: a model-shaped CPU cost per forward pass, with a process pool like
+  sentence-transformers', for throughput benchmarks
+- StubChatModel: a local stand-in for ChatGoogleGenerativeAI with fixed latency
+"""
+
+import asyncio
+import csv
+import hashlib
+import json
+import math
+import random
+import re
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from langchain_core.language_models.chat_models import SimpleChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+DIM = 384
+
+WORDS = (
+    "cell membrane protein energy enzyme nucleus gene photosynthesis light "
+    "chlorophyll glucose oxygen carbon water molecule atom bond reaction "
+    "respiration mitochondria ribosome structure function process system "
+    "organism plant animal species evolution selection population habitat "
+    "climate temperature pressure force motion velocity mass gravity orbit "
+    "planet star galaxy theory model experiment data result evidence"
+).split()
+
+FORMATS = ("pdf", "txt", "csv", "json")
+
+
+class FakeEmbeddings:
+    """Hash-seeded random unit vectors: same text, same vector"""
+
+    def _vector(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+class HashingEmbeddings:
+    """Bag-of-words feature hashing: texts sharing words get similar unit vectors"""
+
+    def _vector(self, text):
+        vector = np.zeros(DIM, dtype=np.float32)
+        for word in re.findall(r"[a-z]+", text.lower()):
+            bucket = int.from_bytes(hashlib.md5(word.encode()).digest()[:4], "little")
+            vector[bucket % DIM] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+class FakeEncoder:
+    """
+    Stands in for the SentenceTransformer client of HuggingFaceEmbeddings.
+    Each forward pass pads its batch to the longest text and runs it through
+    dense layers, so the cost grows with tokens and padding like a small
+    transformer's. start_multi_process_pool() starts a real process pool and
+    encode(pool=...) splits the texts across it the way sentence-transformers
+    does.
+    """
+
+    LAYERS = 6
+    MAX_TOKENS = 256
+    POOL_PROCESSES = 4  # sentence-transformers' default on CPU
+
+    def __init__(self):
+        rng = np.random.default_rng(0)
+        self.layers = [rng.standard_normal((DIM, DIM)).astype(np.float32) / np.sqrt(DIM)
+                       for _ in range(self.LAYERS)]
+
+    def _forward(self, texts):
+        tokens = [text.split()[:self.MAX_TOKENS] for text in texts]
+        width = max(len(t) for t in tokens) or 1
+        x = np.zeros((len(texts), width, DIM), dtype=np.float32)
+        for row, words in enumerate(tokens):
+            for column, word in enumerate(words):
+                x[row, column, zlib.crc32(word.encode()) % DIM] = 1.0
+        for weights in self.layers:
+            x = np.tanh(x @ weights)
+        pooled = x.mean(axis=1)
+        return pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-9)
+
+    def encode(self, texts, batch_size=32, pool=None):
+        if pool is not None:
+            chunk = max(1, min(math.ceil(len(texts) / self.POOL_PROCESSES / 10), 5000))
+            parts = [texts[i:i + chunk] for i in range(0, len(texts), chunk)]
+            return np.vstack(list(pool.map(_encode_in_worker, parts, [batch_size] * len(parts))))
+        return np.vstack([self._forward(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)])
+
+    def start_multi_process_pool(self):
+        pool = ProcessPoolExecutor(max_workers=self.POOL_PROCESSES)
+        list(pool.map(_encode_in_worker, [["warmup"]] * self.POOL_PROCESSES, [1] * self.POOL_PROCESSES))
+        return pool
+
+
+_worker_encoder = None
+
+
+def _encode_in_worker(texts, batch_size):
+    global _worker_encoder
+    if _worker_encoder is None:
+        _worker_encoder = FakeEncoder()
+    return _worker_encoder.encode(texts, batch_size)
+
+
+class FakeEncoderEmbeddings:
+    """HuggingFaceEmbeddings over a FakeEncoder; MultiProcessEmbeddings can wrap it"""
+
+    def __init__(self, batch_size=32):
+        self._client = FakeEncoder()
+        self.batch_size = batch_size
+
+    def embed_documents(self, texts):
+        return self._client.encode(texts, self.batch_size).tolist()
+
+    def embed_query(self, text):
+        return self._client.encode([text], 1)[0].tolist()
+
+
+class StubChatModel(SimpleChatModel):
+    """
+    Answers every prompt with a canned reply after `latency` seconds.
+
+    Streaming waits `latency` before the first token, then yields one word
+    every `token_delay` seconds, roughly like a hosted model. The async
+    methods sleep on the event loop, as a network client would.
+    """
+
+    latency: float = 0.25
+    token_delay: float = 0.0
+    response: str = "Photosynthesis is how plants turn light, water and carbon dioxide into glucose."
+
+    @property
+    def _llm_type(self):
+        return "stub-chat-model"
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        return self.response
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        for index, word in enumerate(self.response.split(" ")):
+            if index and self.token_delay:
+                time.sleep(self.token_delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word if not index else " " + word))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        for index, word in enumerate(self.response.split(" ")):
+            if index and self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word if not index else " " + word))
+
+
+def sentences(seed):
+    """Endless deterministic pseudo-English sentences"""
+    rng = random.Random(seed)
+    while True:
+        words = rng.choices(WORDS, k=rng.randint(8, 20))
+        yield " ".join(words).capitalize() + "."
+
+
+def _lines(size_bytes, seed, width=90):
+    """Lines of at most `width` characters totalling about size_bytes"""
+    written = 0
+    line = ""
+    for sentence in sentences(seed):
+        for word in sentence.split(" "):
+            if len(line) + len(word) + 1 > width:
+                yield line
+                written += len(line) + 1
+                if written >= size_bytes:
+                    return
+                line = word
+            else:
+                line = f"{line} {word}" if line else word
+
+
+def write_txt(path, size_bytes, seed=0):
+    with open(path, "w", encoding="utf-8") as f:
+        for line in _lines(size_bytes, seed):
+            f.write(line + "\n")
+
+
+def write_csv(path, size_bytes, seed=0):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "topic", "description"])
+        text = sentences(seed)
+        row = 0
+        while f.tell() < size_bytes:
+            description = " ".join(next(text) for _ in range(3))
+            writer.writerow([row, description.split(" ", 1)[0], description])
+            row += 1
+
+
+def write_json(path, size_bytes, seed=0):
+    text = sentences(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        row = 0
+        while f.tell() < size_bytes:
+            record = {"id": row, "title": next(text), "body": " ".join(next(text) for _ in range(4))}
+            f.write(("," if row else "") + json.dumps(record))
+            row += 1
+        f.write("]")
+
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path, size_bytes, seed=0, lines_per_page=60):
+    """A minimal text-only PDF (Helvetica, one content stream per page) that PyPDFLoader can read"""
+    lines = list(_lines(size_bytes, seed))
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    # 1 catalog, 2 page tree, 3 font, then a page and its content stream per page
+    page_ids = [4 + 2 * i for i in range(len(pages))]
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{pid} 0 R' for pid in page_ids)}] /Count {len(pages)} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for page_id, page_lines in zip(page_ids, pages):
+        content = "BT /F1 9 Tf 11 TL 40 800 Td " + " ".join(f"({_pdf_escape(line)}) Tj T*" for line in page_lines) + " ET"
+        content = content.encode("latin-1")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+
+
+WRITERS = {"pdf": write_pdf, "txt": write_txt, "csv": write_csv, "json": write_json}
+
+
+def make_fixture(directory, fmt, size_bytes, seed=0):
+    """Write one fixture and return its path"""
+    path = f"{directory}/fixture-{size_bytes}.{fmt}"
+    WRITERS[fmt](path, size_bytes, seed)
+    return path
+
+
+def write_articles(path, articles, seed=0, article_chars=4000):
+    """
+    Short articles each centred on three topic words; returns the topics.
+
+    Neighbouring chunks of one article match the same questions, as in real
+    documents, so retrieval returns runs of overlapping chunks.
+    """
+    rng = random.Random(seed)
+    topics = []
+    with open(path, "w", encoding="utf-8") as f:
+        for _ in range(articles):
+            topic = rng.sample(WORDS, 3)
+            topics.append(topic)
+            written = 0
+            while written < article_chars:
+                words = [rng.choice(topic) if rng.random() < 0.4 else rng.choice(WORDS)
+                         for _ in range(rng.randint(8, 20))]
+                sentence = " ".join(words).capitalize() + ". "
+                f.write(sentence)
+                written += len(sentence)
+            f.write("\n\n")
+    return topics
+
+
+def questions(count, seed=1):
+    """Short questions over the fixture vocabulary"""
+    rng = random.Random(seed)
+    return [f"What is the role of {' and '.join(rng.sample(WORDS, 2))}?" for _ in range(count)]
@@ -0,0 +1,104 @@
+"""
+Flat NumPy index vs. Chroma: build time, query latency, resident memory and
+disk footprint at 1k, 10k and 100k chunks of 384-d vectors.
+
+A deterministic fake embedder stands in for MiniLM so only the index is
+measured. Run each size in a fresh process for clean RSS numbers:
+
+    python benchmarks/flat_vs_chroma.py [sizes...]
+"""
+
+import hashlib
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DIM = 384
+QUERIES = 200
+
+
+class FakeEmbeddings:
+    """Hash-seeded random unit vectors: same text, same vector"""
+
+    def _vector(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def dir_mb(path):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path) for name in files
+    ) / 2**20
+
+
+def open_store(backend, persist_dir, embeddings):
+    if backend == "chroma":
+        from langchain_community.vectorstores import Chroma
+        return Chroma(embedding_function=embeddings, persist_directory=persist_dir)
+    from flat_index import FlatVectorStore
+    return FlatVectorStore(embeddings, persist_dir, dtype=backend.split("-")[1])
+
+
+def run(backend, size):
+    embeddings = FakeEmbeddings()
+    persist_dir = tempfile.mkdtemp(prefix=f"bench_{backend}_")
+    texts = [f"chunk {i} " + "lorem ipsum " * 40 for i in range(size)]
+    metadatas = [{"source": f"doc-{i % 20}"} for i in range(size)]
+    try:
+        base = rss_mb()
+        store = open_store(backend, persist_dir, embeddings)
+        start = time.perf_counter()
+        for i in range(0, size, 512):
+            store.add_texts(texts[i:i + 512], metadatas[i:i + 512])
+        if hasattr(store, "save"):
+            store.save()
+        build = time.perf_counter() - start
+        del store
+
+        # Reopen from disk as a lazily reloaded session would
+        store = open_store(backend, persist_dir, embeddings)
+        latencies = []
+        for q in range(QUERIES):
+            vector = embeddings.embed_query(f"question {q}")
+            start = time.perf_counter()
+            store.similarity_search_by_vector(vector, k=4)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        print(f"{backend:<13} {size:>7}  build {build:7.2f} s  "
+              f"p50 {statistics.median(latencies):7.2f} ms  p99 {latencies[int(0.99 * len(latencies))]:7.2f} ms  "
+              f"rss +{rss_mb() - base:7.1f} MB  disk {dir_mb(persist_dir):7.1f} MB", flush=True)
+    finally:
+        shutil.rmtree(persist_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and not sys.argv[1].isdigit():
+        run(sys.argv[1], int(sys.argv[2]))
+        sys.exit(0)
+
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    for size in sizes:
+        for backend in ("chroma", "flat-float32", "flat-float16"):
+            subprocess.run([sys.executable, __file__, backend, str(size)], check=False)
@@ -0,0 +1,134 @@
+"""
+Sessions across worker processes: throughput comparison
+
+Starts N app worker processes on separate ports (standing in for gunicorn
+workers behind a load balancer) and sends session route requests
+round-robin across them: 1 worker (memory backend) vs. 4 workers (SQLite).
+Cross-worker correctness is checked by tests/test_multiworker.py.
+
+    python benchmarks/multiworker_sessions.py
+"""
+
+import http.cookiejar
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-key")
+
+BASE_PORT = 5600
+CLIENTS = 16
+REQUESTS_PER_CLIENT = 100
+
+
+def serve(port, backend, sqlite_path):
+    # Uploads, indexes and caches go next to the session database, not into the repo
+    os.chdir(os.path.dirname(sqlite_path))
+    import config
+    config.SESSION_CONFIG["backend"] = backend
+    config.SESSION_CONFIG["sqlite_path"] = sqlite_path
+    config.STARTUP_CONFIG["warmup_on_start"] = False
+
+    from werkzeug.serving import make_server
+    from app import app
+    make_server("127.0.0.1", port, app, threaded=True).serve_forever()
+
+
+def start_workers(count, backend, sqlite_path):
+    ctx = multiprocessing.get_context("spawn")
+    workers = []
+    for i in range(count):
+        process = ctx.Process(target=serve, args=(BASE_PORT + i, backend, sqlite_path),
+                              daemon=True)
+        process.start()
+        workers.append(process)
+
+    # Wait until every worker accepts connections
+    for i in range(count):
+        deadline = time.time() + 300
+        while True:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{BASE_PORT + i}/api/cache/stats", timeout=1)
+                break
+            except Exception:
+                if time.time() > deadline:
+                    raise RuntimeError(f"worker {i} did not start")
+                time.sleep(0.5)
+    return workers
+
+
+class Client:
+    """One browser: a cookie jar, requests spread round-robin over workers"""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.turn = 0
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+
+    def call(self, method, path, body=None):
+        port = BASE_PORT + self.turn % self.workers
+        self.turn += 1
+        data, headers = None, {}
+        if body is not None:
+            data, headers = json.dumps(body).encode(), {"Content-Type": "application/json"}
+        request = urllib.request.Request(f"http://127.0.0.1:{port}{path}", data=data,
+                                         headers=headers, method=method)
+        try:
+            with self.opener.open(request) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return json.loads(e.read())
+
+
+def throughput(workers):
+    errors = []
+
+    def run():
+        client = Client(workers)
+        client.call("POST", "/api/session/create")
+        for i in range(REQUESTS_PER_CLIENT):
+            if i % 2:
+                result = client.call("GET", "/api/session/info")
+            else:
+                result = client.call("POST", "/api/settings/update", {"tone": "default", "level": "beginner"})
+            if not result.get("success"):
+                errors.append(result)
+
+    threads = [threading.Thread(target=run) for _ in range(CLIENTS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    total = CLIENTS * (REQUESTS_PER_CLIENT + 1)
+    return total / elapsed, len(errors)
+
+
+def run_setup(count, backend):
+    tmp = tempfile.mkdtemp(prefix="sessions_")
+    workers = start_workers(count, backend, os.path.join(tmp, "sessions.sqlite3"))
+    try:
+        rate, errors = throughput(count)
+        print(f"{count} worker(s), {backend:<6} backend: {rate:8.1f} req/s, {errors} errors")
+    finally:
+        for process in workers:
+            process.terminate()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    run_setup(1, "memory")
+    run_setup(4, "sqlite")
@@ -0,0 +1,106 @@
+"""
+/api/chat/ask under overload, with and without a generation slot limit.
+
+The stub LLM serves at most `capacity` calls at once, like a provider quota
+or a local model on one GPU, so extra concurrent requests queue inside it.
+Without admission control every request waits its turn and p99 grows with
+the number of clients; with it, requests beyond the slots and the short wait
+queue get an immediate 429 and admitted requests keep their latency:
+
+    python benchmarks/overload.py [clients] [requests_per_client] [llm_latency_seconds] [capacity]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from suite import corpus, latency_summary, prepare_session
+from fixtures import FakeEmbeddings, StubChatModel, questions
+from rate_limits import ConcurrencyLimiter
+
+_serving = None
+
+
+class CapacityLimitedChatModel(StubChatModel):
+    """StubChatModel that answers at most `capacity` prompts at a time"""
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs):
+        with _serving:
+            return super()._call(messages, stop, run_manager, **kwargs)
+
+
+def run(app_module, session_id, clients, requests_per_client, pool):
+    admitted = []
+    rejected = []
+    lock = threading.Lock()
+
+    def client_loop(client_index):
+        client = app_module.app.test_client()
+        with client.session_transaction() as flask_session:
+            flask_session["session_id"] = session_id
+        for i in range(requests_per_client):
+            question = pool[(client_index * requests_per_client + i) % len(pool)]
+            start = time.perf_counter()
+            response = client.post("/api/chat/ask", json={"question": question})
+            elapsed = time.perf_counter() - start
+            with lock:
+                if response.status_code == 200:
+                    admitted.append(elapsed)
+                elif response.status_code == 429:
+                    rejected.append(elapsed)
+                else:
+                    raise RuntimeError(response.get_json())
+
+    threads = [threading.Thread(target=client_loop, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return admitted, rejected, time.perf_counter() - start
+
+
+def report(label, admitted, rejected, wall):
+    summary = latency_summary(admitted)
+    rejected_p99 = latency_summary(rejected)["p99_ms"] if rejected else 0.0
+    print(f"{label:<24} admitted {summary['count']:4d}  p50 {summary['p50_ms']:8.1f} ms  "
+          f"p99 {summary['p99_ms']:8.1f} ms  | 429s {len(rejected):4d}  p99 {rejected_p99:6.1f} ms  "
+          f"| {len(admitted) / wall:5.1f} answers/s")
+
+
+if __name__ == "__main__":
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    requests_per_client = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    latency = float(sys.argv[3]) if len(sys.argv) > 3 else 0.5
+    capacity = int(sys.argv[4]) if len(sys.argv) > 4 else 4
+    _serving = threading.BoundedSemaphore(capacity)
+
+    workdir = tempfile.mkdtemp(prefix="learnai-overload-")
+    os.chdir(workdir)
+    import config
+    config.CACHE_CONFIG["enable_query_cache"] = False
+
+    import vectordatabase
+    vectordatabase._embeddings = vectordatabase.TimedEmbeddings(FakeEmbeddings())
+    import chains
+    chains.set_llm(CapacityLimitedChatModel(latency=latency))
+
+    import app as app_module
+    app_module.ready.wait(600)
+    session_id = prepare_session(app_module.app.test_client(), corpus(workdir, 100 * 1024))
+    pool = questions(1000, seed=7)
+
+    print(f"{clients} clients x {requests_per_client} requests, stub latency {latency}s, "
+          f"model capacity {capacity}")
+
+    app_module.generation_slots = ConcurrencyLimiter("generation", clients * requests_per_client, 0, 0)
+    report("no admission control", *run(app_module, session_id, clients, requests_per_client, pool))
+
+    # Slots match what the model can serve; a short queue absorbs bursts
+    app_module.generation_slots = ConcurrencyLimiter("generation", capacity, capacity, 2 * latency)
+    report(f"{capacity} slots, {capacity} queued", *run(app_module, session_id, clients, requests_per_client, pool))
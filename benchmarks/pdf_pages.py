@@ -0,0 +1,50 @@
+"""
+PDF loading time for a generated multi-hundred-page PDF: PyPDFLoader on the
+whole file, load_pdf on a page range, and load_pdf again once the page text
+cache holds the file (as when another session uploads the same textbook).
+
+    python benchmarks/pdf_pages.py [pages] [range]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixtures import write_pdf
+
+LINES_PER_PAGE = 60
+BYTES_PER_LINE = 80
+
+
+def timed(label, load):
+    start = time.perf_counter()
+    docs = load()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<36} {len(docs):5d} pages  {elapsed * 1000:9.1f} ms")
+    return docs
+
+
+if __name__ == "__main__":
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 900
+    page_range = sys.argv[2] if len(sys.argv) > 2 else "120-200"
+
+    workdir = tempfile.mkdtemp(prefix="learnai-pdf-pages-")
+    os.chdir(workdir)  # the page cache lives under ./cache
+    from langchain_community.document_loaders import PyPDFLoader
+    from loaders import load_pdf, parse_page_ranges
+
+    path = os.path.join(workdir, "textbook.pdf")
+    write_pdf(path, pages * LINES_PER_PAGE * BYTES_PER_LINE, seed=5, lines_per_page=LINES_PER_PAGE)
+    selected = parse_page_ranges(page_range)
+    print(f"{os.path.getsize(path) / (1024 * 1024):.1f} MB PDF, pages {page_range}")
+
+    full = timed("PyPDFLoader, whole file", lambda: PyPDFLoader(path).load())
+    timed(f"load_pdf pages {page_range}, cold cache", lambda: load_pdf(path, pages=selected))
+    timed(f"load_pdf pages {page_range}, cached", lambda: load_pdf(path, pages=selected))
+    timed("load_pdf rest of the file", lambda: load_pdf(path, exclude=selected))
+    cached = timed("load_pdf whole file, cached", lambda: load_pdf(path))
+    assert [doc.page_content for doc in cached] == [doc.page_content for doc in full]
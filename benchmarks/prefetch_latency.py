@@ -0,0 +1,79 @@
+"""
+/api/chat/ask latency with and without retrieval prefetched while typing.
+
+Each question is "typed" first: the page sends /api/chat/prefetch when
+typing pauses, here once for the question minus its last word and once for
+the whole question, then submits it. The stub embedder takes `embed_ms` per
+query, about what MiniLM needs on one CPU core, and the stub LLM answers
+at once so the numbers are the work before generation:
+
+    python benchmarks/prefetch_latency.py [questions] [embed_ms] [corpus_mb]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from suite import corpus, latency_summary, prepare_session
+from fixtures import FakeEmbeddings, StubChatModel, questions
+
+
+class SlowQueryEmbeddings(FakeEmbeddings):
+    """FakeEmbeddings with a fixed cost per query, like a CPU-bound model"""
+
+    def __init__(self, query_seconds):
+        self.query_seconds = query_seconds
+
+    def embed_query(self, text):
+        time.sleep(self.query_seconds)
+        return super().embed_query(text)
+
+
+def ask_all(client, pool, prefetch):
+    latencies = []
+    prefetch_seconds = 0.0
+    for question in pool:
+        if prefetch:
+            start = time.perf_counter()
+            for typed in (question.rsplit(" ", 1)[0], question):
+                client.post("/api/chat/prefetch", json={"question": typed})
+            prefetch_seconds += time.perf_counter() - start
+        start = time.perf_counter()
+        response = client.post("/api/chat/ask", json={"question": question})
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise RuntimeError(response.get_json())
+    return latencies, prefetch_seconds
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    embed_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 15.0
+    corpus_mb = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+
+    workdir = tempfile.mkdtemp(prefix="learnai-prefetch-")
+    os.chdir(workdir)
+    import config
+    config.CACHE_CONFIG["enable_query_cache"] = False
+    config.FEATURES["real_time_suggestions"] = True
+
+    import vectordatabase
+    vectordatabase._embeddings = vectordatabase.TimedEmbeddings(SlowQueryEmbeddings(embed_ms / 1000))
+    import chains
+    chains.set_llm(StubChatModel(latency=0.0))
+
+    import app as app_module
+    app_module.ready.wait(600)
+    client = app_module.app.test_client()
+    prepare_session(client, corpus(workdir, int(corpus_mb * 1024 * 1024)))
+    print(f"{count} questions, query embedding {embed_ms:.0f} ms, {corpus_mb:g} MB corpus")
+
+    for label, prefetch, seed in (("no prefetch", False, 21), ("prefetched while typing", True, 22)):
+        latencies, prefetch_seconds = ask_all(client, questions(count, seed=seed), prefetch)
+        summary = latency_summary(latencies)
+        print(f"{label:<26} ask p50 {summary['p50_ms']:7.1f} ms  p99 {summary['p99_ms']:7.1f} ms"
+              + (f"  | prefetch {prefetch_seconds * 1000 / count:6.1f} ms per question" if prefetch else ""))
+    print("prefetch cache:", app_module.prefetch_cache.stats())
@@ -0,0 +1,102 @@
+"""
+Flat index storage modes on a reference corpus: float32 (exact), float16,
+int8, and int8 with float32 re-ranking, plus Chroma for comparison.
+
+Reports disk footprint, resident memory after reopening the index and
+querying it, query latency, and recall@4 against exact float32 search.
+Chunks come from the articles fixture split as ingestion splits them and
+embedded with bag-of-words hashing, so neighbours are topical rather than
+random. Each mode runs in a fresh process for clean RSS numbers:
+
+    python benchmarks/quantized_index.py [chunks] [rerank_candidates]
+"""
+
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixtures import HashingEmbeddings, questions, write_articles
+from flat_vs_chroma import dir_mb, rss_mb
+
+MODES = ("chroma", "float32", "float16", "int8", "int8+rerank")
+QUERIES = 300
+K = 4
+
+
+def reference_chunks(chunks, workdir):
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    path = os.path.join(workdir, "articles.txt")
+    write_articles(path, articles=chunks // 4 + 1, seed=3)
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    return splitter.split_text(text)[:chunks]
+
+
+def open_store(mode, persist_dir, embeddings, rerank_candidates):
+    if mode == "chroma":
+        from langchain_community.vectorstores import Chroma
+        return Chroma(embedding_function=embeddings, persist_directory=persist_dir)
+    from flat_index import FlatVectorStore
+    dtype, _, rerank = mode.partition("+")
+    return FlatVectorStore(embeddings, persist_dir, dtype=dtype,
+                           rerank_candidates=rerank_candidates if rerank else 0)
+
+
+def run(mode, chunks, rerank_candidates):
+    workdir = tempfile.mkdtemp(prefix=f"bench_quant_{mode}_")
+    persist_dir = os.path.join(workdir, "db")
+    embeddings = HashingEmbeddings()
+    try:
+        texts = reference_chunks(chunks, workdir)
+        position = {text: i for i, text in enumerate(texts)}
+        vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+        queries = np.asarray(embeddings.embed_documents(questions(QUERIES, seed=9)), dtype=np.float32)
+
+        # Ground truth: exact cosine ranking over float32 vectors
+        truth = np.argsort(-(vectors @ queries.T), axis=0)[:K].T
+
+        store = open_store(mode, persist_dir, embeddings, rerank_candidates)
+        for start in range(0, len(texts), 512):
+            store.add_texts(texts[start:start + 512])
+        if hasattr(store, "save"):
+            store.save()
+        del store
+
+        # Reopen from disk as a lazily reloaded session would
+        base = rss_mb()
+        store = open_store(mode, persist_dir, embeddings, rerank_candidates)
+        latencies = []
+        hits = 0
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            found = store.similarity_search_by_vector(query.tolist(), k=K)
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += len({position[doc.page_content] for doc in found} & set(expected.tolist()))
+        latencies.sort()
+        print(f"{mode:<12} {len(texts):>7} chunks  disk {dir_mb(persist_dir):7.1f} MB  "
+              f"rss +{rss_mb() - base:6.1f} MB  p50 {statistics.median(latencies):6.2f} ms  "
+              f"recall@{K} {hits / (K * len(queries)):.4f}", flush=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] in MODES:
+        run(sys.argv[1], int(sys.argv[2]), int(sys.argv[3]))
+        sys.exit(0)
+
+    chunks = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rerank_candidates = int(sys.argv[2]) if len(sys.argv) > 2 else 48
+    for mode in MODES:
+        subprocess.run([sys.executable, __file__, mode, str(chunks), str(rerank_candidates)], check=False)
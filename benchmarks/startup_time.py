@@ -0,0 +1,68 @@
+"""
+Startup benchmark: import time of app.py, time until /api/health/ready, and
+time to the first answer in a fresh process (Gemini replaced by a stub).
+
+    python benchmarks/startup_time.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r'''
+import json, os, sys, tempfile, time
+start = time.perf_counter()
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-key")
+
+import app
+imported = time.perf_counter() - start
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+import chains
+chains.set_llm(FakeListChatModel(responses=["stub answer"]))
+
+client = app.app.test_client()
+while client.get("/api/health/ready").status_code != 200:
+    if app.warmup_error:
+        raise SystemExit(app.warmup_error)
+    time.sleep(0.05)
+ready = time.perf_counter() - start
+
+client.post("/api/session/create")
+with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+    f.write("Photosynthesis converts light energy into chemical energy. " * 50)
+with open(f.name, "rb") as fh:
+    client.post("/api/documents/upload", data={"files": (fh, "notes.txt")},
+                content_type="multipart/form-data")
+job = client.post("/api/documents/ingest").get_json()
+while job.get("job_id") and job["status"] not in ("completed", "failed", "cancelled"):
+    time.sleep(0.05)
+    job = client.get(f"/api/documents/ingest/{job['job_id']}").get_json()
+answer = client.post("/api/chat/ask", json={"question": "What is photosynthesis?"}).get_json()
+assert answer["success"], answer
+first_answer = time.perf_counter() - start
+
+client.post("/api/session/reset")
+os.unlink(f.name)
+print(json.dumps({"import_s": imported, "ready_s": ready, "first_answer_s": first_answer}))
+'''
+
+
+def run_once():
+    out = subprocess.run(
+        [sys.executable, "-c", f"ROOT = {ROOT!r}\n" + PROBE],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    runs = [run_once() for _ in range(3)]
+    for key in ("import_s", "ready_s", "first_answer_s"):
+        values = sorted(run[key] for run in runs)
+        print(f"{key:<16} median {values[1]:6.2f} s  (min {values[0]:.2f}, max {values[-1]:.2f})")
@@ -0,0 +1,95 @@
+"""
+Peak memory and time for loading + splitting a generated 50 MB CSV and JSON
+file: the previous whole-file loaders vs. the streaming loaders.
+
+    python benchmarks/streaming_loaders.py [size_mb]
+"""
+
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_community.document_loaders import CSVLoader, JSONLoader
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from config import VECTOR_DB_CONFIG
+from loaders import stream_csv, stream_json
+
+WORDS = "alpha beta gamma delta epsilon zeta eta theta iota kappa lambda".split()
+
+
+def make_csv(path, size_bytes, rng):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "body"])
+        i = 0
+        while f.tell() < size_bytes:
+            writer.writerow([i, " ".join(rng.choices(WORDS, k=4)), " ".join(rng.choices(WORDS, k=60))])
+            i += 1
+
+
+def make_json(path, size_bytes, rng):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        i = 0
+        while f.tell() < size_bytes:
+            if i:
+                f.write(",")
+            json.dump({"id": i, "title": " ".join(rng.choices(WORDS, k=4)),
+                       "body": " ".join(rng.choices(WORDS, k=60))}, f)
+            i += 1
+        f.write("]")
+
+
+def old_csv(path):
+    return CSVLoader(path).load()
+
+
+def old_json(path):
+    with open(path, encoding="utf-8") as f:
+        json.load(f)
+    # The old loader's ".[]" fallback; text_content=False so object records load at all
+    return JSONLoader(path, jq_schema=".[]", text_content=False).load()
+
+
+def measure(name, load, path, splitter, streaming):
+    tracemalloc.start()
+    start = time.perf_counter()
+    chunks = 0
+    if streaming:
+        for record in load(path):
+            chunks += len(splitter.split_documents([record]))
+    else:
+        chunks = len(splitter.split_documents(load(path)))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<16} {elapsed:7.2f} s  peak {peak / 2**20:8.1f} MB  {chunks} chunks")
+
+
+if __name__ == "__main__":
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rng = random.Random(42)
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=VECTOR_DB_CONFIG["chunk_size"],
+        chunk_overlap=VECTOR_DB_CONFIG["chunk_overlap"]
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "data.csv")
+        json_path = os.path.join(tmp, "data.json")
+        make_csv(csv_path, size_mb * 2**20, rng)
+        make_json(json_path, size_mb * 2**20, rng)
+        print(f"CSV {os.path.getsize(csv_path) / 2**20:.1f} MB, JSON {os.path.getsize(json_path) / 2**20:.1f} MB")
+
+        measure("csv (CSVLoader)", old_csv, csv_path, splitter, streaming=False)
+        measure("csv (streaming)", stream_csv, csv_path, splitter, streaming=True)
+        measure("json (JSONLoader)", old_json, json_path, splitter, streaming=False)
+        measure("json (streaming)", stream_json, json_path, splitter, streaming=True)
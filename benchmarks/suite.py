@@ -0,0 +1,268 @@
+"""
+Offline benchmark suite: ingestion throughput, retrieval latency and
+end-to-end /api/chat/ask latency under concurrent clients.
+
+Everything runs locally: fixtures are generated, the LLM is a stub with a
+fixed latency and the embedder is a deterministic fake unless --embedder
+minilm is given (the model must already be in the local HF cache).
+Results are written as JSON so runs can be compared over time:
+
+    python benchmarks/suite.py
+    python benchmarks/suite.py --sizes-mb 0.1,1,5 --clients 1,8,32 --embedder minilm
+    python benchmarks/suite.py --backend flat --output /tmp/flat.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-key")
+
+from fixtures import FORMATS, FakeEmbeddings, StubChatModel, make_fixture, questions
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def latency_summary(seconds):
+    return {
+        "count": len(seconds),
+        "mean_ms": sum(seconds) / len(seconds) * 1000,
+        "p50_ms": percentile(seconds, 50) * 1000,
+        "p99_ms": percentile(seconds, 99) * 1000,
+        "max_ms": max(seconds) * 1000,
+    }
+
+
+def configure(args):
+    """Apply benchmark settings before the app modules read their config"""
+    import config
+    config.VECTOR_DB_CONFIG["backend"] = args.backend
+    # Measure real work on every run, not cache hits from the previous one
+    config.CACHE_CONFIG["enable_embedding_cache"] = False
+    config.CACHE_CONFIG["enable_query_cache"] = False
+    config.SESSION_CONFIG["backend"] = "memory"
+
+    import vectordatabase
+    if args.embedder == "fake":
+        vectordatabase._embeddings = vectordatabase.TimedEmbeddings(FakeEmbeddings())
+
+    import chains
+    chains.set_llm(StubChatModel(latency=args.llm_latency))
+
+
+def bench_ingestion(fixtures_dir, sizes):
+    """Ingest each fixture into a fresh index and report throughput"""
+    from vectordatabase import ingest_documents
+
+    argument = {"pdf": "pdf_files", "txt": "text_files", "csv": "csv_files", "json": "json_files"}
+    # Pay one-off imports and client start-up before timing anything
+    for fmt in FORMATS:
+        ingest_documents(
+            **{argument[fmt]: [make_fixture(fixtures_dir, fmt, 4096)]},
+            persist_dir=tempfile.mkdtemp(prefix="db-warmup-", dir=fixtures_dir)
+        )
+
+    results = []
+    for size in sizes:
+        for fmt in FORMATS:
+            path = make_fixture(fixtures_dir, fmt, size)
+            size_bytes = os.path.getsize(path)
+            chunks = []
+
+            def progress(stage, done, total):
+                if stage == "chunks_embedded":
+                    chunks.append(done)
+
+            start = time.perf_counter()
+            ingest_documents(
+                **{argument[fmt]: [path]},
+                persist_dir=tempfile.mkdtemp(prefix=f"db-{fmt}-", dir=fixtures_dir),
+                progress=progress
+            )
+            seconds = time.perf_counter() - start
+            result = {
+                "format": fmt,
+                "bytes": size_bytes,
+                "chunks": chunks[-1],
+                "seconds": seconds,
+                "mb_per_second": size_bytes / 2**20 / seconds,
+                "chunks_per_second": chunks[-1] / seconds,
+            }
+            print(f"  ingest {fmt:>4} {size_bytes / 2**20:7.2f} MB  {result['chunks']:6d} chunks  "
+                  f"{result['mb_per_second']:7.2f} MB/s  {result['chunks_per_second']:8.1f} chunks/s")
+            results.append(result)
+    return results
+
+
+def corpus(fixtures_dir, size):
+    """One fixture of every format at the given size"""
+    return {fmt: make_fixture(fixtures_dir, fmt, size, seed=7) for fmt in FORMATS}
+
+
+def bench_retrieval(fixtures_dir, size, query_count):
+    """similarity_search latency over an index of all four formats"""
+    from vectordatabase import ingest_documents
+
+    files = corpus(fixtures_dir, size)
+    db = ingest_documents(
+        pdf_files=[files["pdf"]], text_files=[files["txt"]],
+        csv_files=[files["csv"]], json_files=[files["json"]],
+        persist_dir=tempfile.mkdtemp(prefix="db-retrieval-", dir=fixtures_dir)
+    )
+    queries = questions(query_count)
+    for query in queries[:10]:
+        db.similarity_search(query, k=4)  # warm up
+
+    seconds = []
+    for query in queries:
+        start = time.perf_counter()
+        db.similarity_search(query, k=4)
+        seconds.append(time.perf_counter() - start)
+    summary = latency_summary(seconds)
+    print(f"  retrieval p50 {summary['p50_ms']:.2f} ms  p99 {summary['p99_ms']:.2f} ms")
+    return summary
+
+
+def prepare_session(client, files):
+    """Create a session, upload the corpus and wait for its ingest job"""
+    client.post("/api/session/create")
+    for path in files.values():
+        with open(path, "rb") as f:
+            client.post("/api/documents/upload", data={"files": (f, os.path.basename(path))},
+                        content_type="multipart/form-data")
+    job = client.post("/api/documents/ingest").get_json()
+    while job.get("job_id") and job["status"] not in ("completed", "failed", "cancelled"):
+        time.sleep(0.05)
+        job = client.get(f"/api/documents/ingest/{job['job_id']}").get_json()
+    if job["status"] != "completed":
+        raise RuntimeError(f"ingestion failed: {job.get('error')}")
+    with client.session_transaction() as flask_session:
+        return flask_session["session_id"]
+
+
+def bench_end_to_end(fixtures_dir, size, concurrency_levels, requests_per_client):
+    """/api/chat/ask latency through the Flask test client with N concurrent clients"""
+    import app as app_module
+
+    app_module.ready.wait(600)
+    owner = app_module.app.test_client()
+    session_id = prepare_session(owner, corpus(fixtures_dir, size))
+    pool = questions(1000, seed=3)
+
+    results = []
+    for clients in concurrency_levels:
+        seconds = []
+        errors = []
+        lock = threading.Lock()
+
+        def run(client_index):
+            client = app_module.app.test_client()
+            with client.session_transaction() as flask_session:
+                flask_session["session_id"] = session_id
+            for i in range(requests_per_client):
+                question = pool[(client_index * requests_per_client + i) % len(pool)]
+                start = time.perf_counter()
+                response = client.post("/api/chat/ask", json={"question": question})
+                elapsed = time.perf_counter() - start
+                with lock:
+                    if response.status_code == 200:
+                        seconds.append(elapsed)
+                    else:
+                        errors.append(response.status_code)
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(clients)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+
+        result = {"clients": clients, "requests": len(seconds) + len(errors), "errors": len(errors),
+                  "requests_per_second": (len(seconds) + len(errors)) / wall}
+        result.update(latency_summary(seconds) if seconds else {})
+        print(f"  e2e {clients:3d} clients  p50 {result.get('p50_ms', 0):8.1f} ms  "
+              f"p99 {result.get('p99_ms', 0):8.1f} ms  {result['requests_per_second']:7.1f} req/s  "
+              f"{len(errors)} errors")
+        results.append(result)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", default="0.1,1", help="fixture sizes for the ingestion benchmark")
+    parser.add_argument("--corpus-mb", type=float, default=0.5,
+                        help="size of each fixture in the retrieval and end-to-end corpus")
+    parser.add_argument("--embedder", choices=("fake", "minilm"), default="fake")
+    parser.add_argument("--backend", choices=("chroma", "flat"), default="chroma")
+    parser.add_argument("--llm-latency", type=float, default=0.25, help="stub LLM latency in seconds")
+    parser.add_argument("--queries", type=int, default=500, help="retrieval queries to time")
+    parser.add_argument("--clients", default="1,8", help="concurrency levels for the end-to-end benchmark")
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    parser.add_argument("--output", help="results file (default benchmarks/results/suite-<time>.json)")
+    args = parser.parse_args()
+
+    sizes = [int(float(mb) * 2**20) for mb in args.sizes_mb.split(",")]
+    concurrency_levels = [int(n) for n in args.clients.split(",")]
+    started = datetime.now()
+    output = args.output or os.path.join(
+        ROOT, "benchmarks", "results", f"suite-{started:%Y%m%d-%H%M%S}.json"
+    )
+
+    # uploads/, session indexes and fixtures all live in a scratch directory
+    workdir = tempfile.mkdtemp(prefix="learnai-bench-")
+    os.chdir(workdir)
+    configure(args)
+
+    print("ingestion")
+    ingestion = bench_ingestion(workdir, sizes)
+    print("retrieval")
+    retrieval = bench_retrieval(workdir, int(args.corpus_mb * 2**20), args.queries)
+    print("end to end")
+    end_to_end = bench_end_to_end(workdir, int(args.corpus_mb * 2**20), concurrency_levels, args.requests)
+
+    results = {
+        "meta": {
+            "started_at": started.isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "arguments": vars(args),
+        },
+        "ingestion": ingestion,
+        "retrieval": retrieval,
+        "end_to_end": end_to_end,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Wiki/URL fetching against a local stand-in server: sequential per-link
+sessions (what load_wiki used to do) vs. the pooled, cached UrlFetcher.
+
+The server adds a fixed delay per request, honours If-None-Match and records
+the peak number of concurrent requests per host, so the run also checks the
+per-host limit and that a warm cache is revalidated with 304s:
+
+    python benchmarks/url_fetching.py [links] [delay_seconds]
+"""
+
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from url_fetcher import UrlFetcher
+
+PAGE = ("<html lang='en'><head><title>Stand-in page</title></head><body>"
+        + "<p>Cells are the basic unit of life.</p>" * 2000 + "</body></html>").encode()
+
+
+class Handler(BaseHTTPRequestHandler):
+    delay = 0.2
+    lock = threading.Lock()
+    in_flight = {}
+    peak = {}
+    full_responses = 0
+    not_modified = 0
+
+    def do_GET(self):
+        host = self.headers["Host"]
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight[host] = cls.in_flight.get(host, 0) + 1
+            cls.peak[host] = max(cls.peak.get(host, 0), cls.in_flight[host])
+        try:
+            time.sleep(self.delay)
+            body = PAGE + self.path.encode()
+            etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+            if self.headers.get("If-None-Match") == etag:
+                with cls.lock:
+                    cls.not_modified += 1
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            with cls.lock:
+                cls.full_responses += 1
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with cls.lock:
+                cls.in_flight[host] -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+def reset_counters():
+    Handler.peak.clear()
+    Handler.full_responses = Handler.not_modified = 0
+
+
+def sequential(urls):
+    """One new session per link, one link at a time"""
+    for url in urls:
+        with requests.Session() as session:
+            session.get(url, timeout=15).raise_for_status()
+
+
+def pooled(fetcher, urls, threads=8):
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(fetcher.fetch, urls))
+
+
+def report(label, seconds):
+    print(f"{label:<28} {seconds:6.2f} s   200s: {Handler.full_responses:3d}   "
+          f"304s: {Handler.not_modified:3d}   peak per host: {dict(Handler.peak)}")
+    reset_counters()
+
+
+if __name__ == "__main__":
+    links = int(sys.argv[1]) if len(sys.argv) > 1 else 15
+    Handler.delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    # Two host names for the same server so the per-host limit is visible
+    urls = [f"http://{'127.0.0.1' if i % 2 else 'localhost'}:{port}/wiki/Page_{i}" for i in range(links)]
+
+    start = time.perf_counter()
+    sequential(urls)
+    report("sequential, no cache", time.perf_counter() - start)
+
+    fetcher = UrlFetcher(cache_dir=tempfile.mkdtemp(prefix="http-cache-"), per_host_limit=4)
+    start = time.perf_counter()
+    pooled(fetcher, urls)
+    report("pooled, cold cache", time.perf_counter() - start)
+
+    start = time.perf_counter()
+    pooled(fetcher, urls)
+    report("pooled, warm cache", time.perf_counter() - start)
+
+    print(f"fetcher stats: {fetcher.stats()}")
+    server.shutdown()
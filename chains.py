@@ -0,0 +1,75 @@
+"""
+Prompt chain registry for Learn with AI
+Builds one chain per tone at first use and reuses it for every request
+"""
+
+import threading
+
+from langchain_core.prompts import PromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from config import LLM_CONFIG
+from tones import PROMPT_MAP
+
+# Process-wide registry: tone -> prompt | llm | output_parser
+_chains = {}
+# Prompt per tone and the shared llm | output_parser half, for callers timing each stage
+_prompts = {}
+_generator = None
+_lock = threading.Lock()
+
+
+def create_llm():
+    """Create the Gemini client from LLM_CONFIG"""
+    # Imported here so the app starts without loading the Gemini SDK
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    # One client per process keeps its HTTP connection pool warm across requests
+    return ChatGoogleGenerativeAI(
+        model=LLM_CONFIG["model"],
+        temperature=LLM_CONFIG["temperature"],
+        top_p=LLM_CONFIG["top_p"],
+        max_output_tokens=LLM_CONFIG["max_output_tokens"],
+    )
+
+
+def build_chains(llm=None):
+    """Build a chain for every tone in PROMPT_MAP sharing one LLM client"""
+    llm = llm or create_llm()
+    output_parser = StrOutputParser()
+    return {
+        tone: PromptTemplate.from_template(template) | llm | output_parser
+        for tone, template in PROMPT_MAP.items()
+    }
+
+
+def _install(chains):
+    """Replace the registry contents; caller holds _lock"""
+    global _generator
+    _chains.clear()
+    _chains.update(chains)
+    _prompts.clear()
+    _prompts.update({tone: chain.first for tone, chain in chains.items()})
+    default = chains["default"]
+    _generator = default.middle[0] | default.last
+
+
+def set_llm(llm):
+    """Rebuild the registry around a given model (e.g. a local stub)"""
+    chains = build_chains(llm)
+    with _lock:
+        _install(chains)
+
+
+def get_chain(tone):
+    """Return the prebuilt chain for a tone, falling back to the default tone"""
+    if not _chains:
+        with _lock:
+            if not _chains:
+                _install(build_chains())
+    return _chains.get(tone, _chains["default"])
+
+
+def get_stages(tone):
+    """Return (prompt, llm | output_parser) for a tone so each half can be timed separately"""
+    get_chain(tone)
+    return _prompts.get(tone, _prompts["default"]), _generator
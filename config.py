@@ -18,11 +18,19 @@ LLM_CONFIG = {
 # ===========================
 
 VECTOR_DB_CONFIG = {
+    "backend": "chroma",  # 'chroma' or 'flat' (in-process NumPy index, see flat_index.py)
+    "flat_dtype": "float32",  # 'float32', 'float16' or 'int8' (scalar quantized) storage for the flat backend
+    "flat_rerank_candidates": 0,  # float16/int8: rescore this many (> search_fetch_k) against float32 copies on disk
     "embedding_model": "sentence-transformers/all-MiniLM-L6-v2",
     "chunk_size": 1000,
     "chunk_overlap": 200,
-    "search_k": 4,  # Number of relevant chunks to retrieve
-    "similarity_threshold": 0.3,
+    "search_k": 4,  # Chunks in the context when context_token_budget is None
+    "search_fetch_k": 12,  # Candidates scored before the threshold and budget are applied
+    "similarity_threshold": 0.3,  # Cosine similarity below which a chunk is left out of the context
+    "context_token_budget": 1000,  # Estimated prompt tokens of context; None uses a fixed search_k
+    "embedding_batch_size": 64,  # Chunks per forward pass of the embedding model
+    "embedding_multi_process": False,  # Encode on a pool of processes, one per CPU core
+    "index_batch_size": 512,  # Chunks embedded and written to the index at a time
 }
 
 # ===========================
@@ -36,14 +44,62 @@ DOCUMENT_CONFIG = {
     "enable_ocr": False,  # Set to True for scanned PDFs
 }
 
+# ===========================
+# Startup
+# ===========================
+
+STARTUP_CONFIG = {
+    # Load models in the background at startup; /api/health/ready reports when done.
+    # If False, call app.warmup() yourself (e.g. from a gunicorn post_worker_init hook)
+    "warmup_on_start": True,
+}
+
+# ===========================
+# Ingestion Jobs
+# ===========================
+
+INGESTION_CONFIG = {
+    "max_workers": 2,  # Concurrent background ingestion jobs
+    "max_queued_jobs": 16,  # New jobs are rejected beyond this
+    "job_retention_minutes": 60,  # Finished jobs stay queryable this long
+    "job_heartbeat_seconds": 10,  # Workers refresh the shared state of their unfinished jobs this often
+    "job_stale_seconds": 60,  # Another worker's unfinished job not refreshed for this long has failed
+    "loader_processes": None,  # File parsing processes; None uses every CPU core
+    "wiki_threads": 8,  # Concurrent wiki/URL fetches
+    "url_per_host_limit": 4,  # Concurrent fetches against any one host
+    "url_timeout_seconds": 15,
+    "pdf_remaining_pages_in_background": False,  # After a page-range ingestion, index the rest of the PDF in a follow-up job
+}
+
+# ===========================
+# Uploads
+# ===========================
+
+UPLOAD_CONFIG = {
+    "max_file_size_mb": 500,  # Chunked uploads; single-request uploads stay capped at 50MB
+    "chunk_size_mb": 8,  # Largest chunk accepted per request
+    "incomplete_upload_hours": 24,  # Unfinished chunked uploads are discarded after this
+    "session_quota_mb": 2048,  # Uploaded files plus index per session; None for no limit
+    "global_quota_mb": 20480,  # Everything under the upload folder on this host; None for no limit
+    "janitor_interval_minutes": 15,  # Delete files and indexes of expired or reset sessions this often
+    "orphan_grace_minutes": 10,  # Files younger than this are never deleted
+    # Delete files and indexes of sessions this process does not know. None: only with the sqlite
+    # session backend; True is safe with the memory backend only if a single process serves the app
+    "janitor_delete_orphans": None,
+}
+
 # ===========================
 # Session Management
 # ===========================
 
 SESSION_CONFIG = {
+    "backend": "memory",  # 'sqlite' shares sessions between worker processes (e.g. gunicorn -w 4)
+    "sqlite_path": "uploads/sessions.sqlite3",
     "session_timeout_hours": 1,
     "max_sessions": 100,
     "cleanup_interval_minutes": 30,
+    "index_memory_budget_mb": 1024,  # Open vector stores beyond this are closed, least recently used first
+    "max_open_indexes": 50,
 }
 
 # ===========================
@@ -54,19 +110,50 @@ FEATURES = {
     "export_chat_history": True,
     "download_document_summary": False,
     "multi_user_collaboration": False,
-    "real_time_suggestions": False,
+    "real_time_suggestions": False,  # Retrieve while a question is typed and show matching snippets (PREFETCH_CONFIG)
     "voice_input": False,
     "advanced_analytics": False,
 }
 
+# ===========================
+# Retrieval Prefetch (FEATURES["real_time_suggestions"])
+# ===========================
+
+PREFETCH_CONFIG = {
+    "debounce_ms": 400,  # The page prefetches once typing pauses this long
+    "min_question_chars": 12,
+    "ttl_seconds": 60,  # Prefetched retrievals are reused for this long
+    "entries_per_session": 8,
+    "max_sessions": 1000,
+    "match_ratio": 0.9,  # Text similarity (0-1) at which a submitted question may reuse a prefetched one
+    "min_similarity": 0.95,  # ...if the cosine similarity of their embeddings is also at least this
+    "suggestions": 3,  # Snippets of the best candidate chunks returned to the page
+    "snippet_chars": 160,
+}
+
 # ===========================
 # Rate Limiting
 # ===========================
 
 RATE_LIMITING = {
-    "enabled": False,
-    "requests_per_minute": 30,
+    "enabled": False,  # Token buckets below; SECURITY_CONFIG["rate_limit_enabled"] also turns them on
+    "requests_per_minute": 30,  # Per session, counting ask, ingest and each question of a batch
     "requests_per_hour": 500,
+    "global_requests_per_minute": 600,  # All sessions on one worker process
+    "global_requests_per_hour": 20000,
+    "max_tracked_sessions": 10000,
+    "max_concurrent_generations": 16,  # LLM calls in flight per worker; always enforced
+    "max_queued_generations": 32,  # Requests allowed to wait for a generation slot before a 429
+    "generation_queue_timeout_seconds": 10,
+}
+
+# ===========================
+# ASGI Serving (uvicorn asgi:app)
+# ===========================
+
+ASGI_CONFIG = {
+    "executor_threads": 32,  # Vector search, session store and every route still served by Flask
+    "max_concurrent_generations": 512,  # Awaited LLM calls hold no thread, so this can be far above the WSGI cap
 }
 
 # ===========================
@@ -80,6 +167,15 @@ QA_CONFIG = {
     "confidence_threshold": 0.5,
 }
 
+# ===========================
+# Batch Questions
+# ===========================
+
+BATCH_CONFIG = {
+    "max_questions": 100,  # Per /api/chat/batch request
+    "max_concurrency": 8,  # Answers generated at once per batch
+}
+
 # ===========================
 # Analytics
 # ===========================
@@ -87,7 +183,7 @@ QA_CONFIG = {
 ANALYTICS_CONFIG = {
     "track_user_interactions": False,
     "log_queries": False,
-    "performance_monitoring": True,
+    "performance_monitoring": True,  # Per-stage latency histograms at /metrics
 }
 
 # ===========================
@@ -109,5 +205,16 @@ SECURITY_CONFIG = {
 CACHE_CONFIG = {
     "enable_query_cache": False,
     "cache_ttl_seconds": 3600,
-    "cache_max_size_mb": 100,
+    "cache_max_size_mb": 100,  # Embedding cache
+    "answer_cache_max_size_mb": 100,
+    "semantic_cache": False,  # Also reuse answers to near-identical questions
+    "semantic_similarity_threshold": 0.95,  # Cosine similarity of question embeddings
+    "enable_embedding_cache": True,  # Reuse chunk vectors across sessions
+    "embedding_cache_path": "cache/embeddings.sqlite3",
+    "enable_http_cache": True,  # Revalidate fetched wiki/URL pages instead of downloading them again
+    "http_cache_path": "cache/http",
+    "http_cache_max_size_mb": 200,
+    "enable_pdf_page_cache": True,  # Reuse text extracted from PDF pages, keyed by file hash and page number
+    "pdf_page_cache_path": "cache/pdf_pages.sqlite3",
+    "pdf_page_cache_max_size_mb": 500,
 }
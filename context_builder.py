@@ -0,0 +1,130 @@
+"""
+Prompt context assembly for Learn with AI
+Drops weak matches, stitches overlapping chunks of the same document back
+together and fills a token budget instead of taking a fixed number of chunks
+"""
+
+from itertools import permutations
+
+# Gemini does not ship a local tokenizer; ~4 characters per token holds for English prose
+CHARS_PER_TOKEN = 4
+# Shortest shared text treated as a real overlap when chunks carry no start_index
+MIN_TEXT_OVERLAP = 20
+SEPARATOR = "\n"
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _document_key(doc):
+    """Chunks split from the same loaded document share all metadata but start_index"""
+    return tuple(sorted(
+        (key, str(value)) for key, value in doc.metadata.items() if key != "start_index"
+    ))
+
+
+def _span(doc, score):
+    start = doc.metadata.get("start_index")
+    return {
+        "key": _document_key(doc),
+        "start": start if isinstance(start, int) and start >= 0 else None,
+        "text": doc.page_content,
+        "score": score,
+    }
+
+
+def _join(left, right, overlap):
+    return {
+        "key": left["key"],
+        "start": left["start"],
+        "text": left["text"] + right["text"][overlap:],
+        "score": max(left["score"], right["score"]),
+    }
+
+
+def _text_overlap(left, right, max_overlap):
+    """Length of the longest suffix of left that starts right, or None"""
+    for size in range(min(len(left), len(right), max_overlap), MIN_TEXT_OVERLAP - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return None
+
+
+def _merge_by_text(spans, max_overlap):
+    """Stitch spans whose text overlaps, for chunks indexed before start_index was recorded"""
+    spans = [dict(span) for span in spans]
+    changed = True
+    while changed:
+        changed = False
+        for i, j in permutations(range(len(spans)), 2):
+            left, right = spans[i], spans[j]
+            if right["text"] in left["text"]:
+                overlap = len(right["text"])
+            else:
+                overlap = _text_overlap(left["text"], right["text"], max_overlap)
+                if overlap is None:
+                    continue
+            spans[i] = _join(left, right, overlap)
+            del spans[j]
+            changed = True
+            break
+    return spans
+
+
+def _merge(spans, max_overlap):
+    """Stitch overlapping or adjacent spans of the same document; best scoring passage first"""
+    groups = {}
+    for span in spans:
+        groups.setdefault(span["key"], []).append(span)
+
+    merged = []
+    for group in groups.values():
+        stitched = []
+        for span in sorted((s for s in group if s["start"] is not None), key=lambda s: s["start"]):
+            last = stitched[-1] if stitched else None
+            end = last["start"] + len(last["text"]) if last else None
+            if last and span["start"] <= end:
+                stitched[-1] = _join(last, span, end - span["start"])
+            else:
+                stitched.append(span)
+        merged.extend(stitched)
+        merged.extend(_merge_by_text((s for s in group if s["start"] is None), max_overlap))
+
+    merged.sort(key=lambda span: -span["score"])
+    return merged
+
+
+def _size(spans):
+    return sum(estimate_tokens(span["text"]) for span in spans) + max(0, len(spans) - 1)
+
+
+def build_context(scored_docs, token_budget=None, threshold=None, max_overlap=200, k=4):
+    """
+    Turn [(Document, relevance)], best first, into the prompt context.
+
+    Matches scoring below threshold are dropped. Chunks are then taken in
+    relevance order while the merged context stays within token_budget;
+    with no budget the first k are used. Returns (context, documents used).
+    """
+    candidates = [
+        (doc, score) for doc, score in scored_docs
+        if threshold is None or score >= threshold
+    ]
+    if token_budget is None:
+        candidates = candidates[:k]
+
+    selected = []
+    spans = []
+    for doc, score in candidates:
+        span = _span(doc, score)
+        if token_budget is not None and spans and _size(_merge(spans + [span], max_overlap)) > token_budget:
+            continue  # A shorter or overlapping later chunk may still fit
+        selected.append(doc)
+        spans.append(span)
+
+    merged = _merge(spans, max_overlap)
+    if token_budget is not None and merged and _size(merged) > token_budget:
+        # Only the best chunk was taken and it alone is over budget
+        merged = [dict(merged[0], text=merged[0]["text"][:token_budget * CHARS_PER_TOKEN])]
+    return SEPARATOR.join(span["text"] for span in merged), selected
@@ -0,0 +1,348 @@
+"""
+In-process flat vector index for Learn with AI
+A NumPy alternative to Chroma for sessions with up to a few hundred thousand chunks
+"""
+
+import json
+import os
+import threading
+import uuid
+from collections import namedtuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+VECTORS_FILE = "flat_vectors.npy"
+DOCUMENTS_FILE = "flat_documents.json"
+# Per-row scales of int8 vectors
+SCALES_FILE = "flat_scales.npy"
+# float32 copies of quantized vectors, read only to re-rank search candidates
+EXACT_FILE = "flat_vectors_exact.npy"
+# Names the files of the current version, e.g. flat_vectors.<version>.npy; replaced last by save()
+MANIFEST_FILE = "flat_manifest.json"
+
+# Rows scored per step when stored vectors are float16 or int8
+SCORE_BLOCK_ROWS = 4096
+
+# What one search scores and reads its results from
+_Snapshot = namedtuple("_Snapshot", "matrix scales exact ids texts metadatas")
+
+
+def _matches(metadata, where):
+    """Evaluate a Chroma-style {"field": value | {"$in": [...]}} filter"""
+    for field, condition in where.items():
+        value = metadata.get(field)
+        if isinstance(condition, dict) and "$in" in condition:
+            if value not in condition["$in"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+def _quantize(vectors):
+    """Symmetric int8 per row: vectors ~= rows * scales[:, None]"""
+    scales = np.abs(vectors).max(axis=1) / 127
+    scales[scales == 0] = 1.0
+    rows = np.rint(vectors / scales[:, None]).astype(np.int8)
+    return rows, scales.astype(np.float32)
+
+
+def _versioned(name, version):
+    stem, extension = os.path.splitext(name)
+    return f"{stem}.{version}{extension}"
+
+
+def _grow(array, count, needed, row_shape, dtype):
+    """array with room for needed rows and its first count rows kept; new or unwritable arrays are copied"""
+    if array is not None and needed <= len(array) and array.flags.writeable:
+        return array
+    capacity = max(needed, 2 * (len(array) if array is not None else 0), 256)
+    grown = np.empty((capacity,) + row_shape, dtype=dtype)
+    if count:
+        grown[:count] = array[:count]
+    return grown
+
+
+class FlatVectorStore(VectorStore):
+    """
+    Exact cosine search over a contiguous matrix of normalized vectors.
+
+    Scoring is one matrix-vector product plus argpartition. The matrix is
+    saved with np.save and reloaded memory-mapped, so an idle index costs
+    page cache rather than heap.
+
+    With dtype "float16" or "int8" (one float32 scale per row) the matrix is
+    half or a quarter the size and scores are approximate. If
+    rerank_candidates exceeds k, float32 copies of the vectors are kept in a
+    separate memory-mapped file and that many candidates are rescored
+    exactly; a search only touches the pages of those rows.
+
+    Searches score a snapshot taken under the lock and build their results
+    from that snapshot alone. Appends only write past the rows of every
+    snapshot, and delete() swaps in new arrays and lists rather than
+    rewriting them, so a snapshot never changes while a search reads it.
+    """
+
+    def __init__(self, embedding_function, persist_directory, dtype="float32", rerank_candidates=0):
+        self._embedding = embedding_function
+        self.persist_directory = persist_directory
+        self.dtype = np.dtype(dtype)
+        self.rerank_candidates = rerank_candidates if self.dtype != np.float32 else 0
+        self._lock = threading.Lock()
+        self._matrix = None  # rows beyond self._count are spare capacity
+        self._scales = None  # int8 only
+        self._exact = None  # only when re-ranking
+        self._count = 0
+        self._ids = []
+        self._texts = []
+        self._metadatas = []
+        self._load()
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    def __len__(self):
+        return self._count
+
+    def _stored_files(self):
+        """{file name: name on disk} of the saved index, or None if there is none"""
+        try:
+            with open(os.path.join(self.persist_directory, MANIFEST_FILE), encoding="utf-8") as f:
+                return json.load(f)["files"]
+        except FileNotFoundError:
+            pass
+        # Saved before manifests: the files themselves, replaced one at a time
+        names = [VECTORS_FILE, DOCUMENTS_FILE, SCALES_FILE, EXACT_FILE]
+        files = {name: name for name in names if os.path.exists(os.path.join(self.persist_directory, name))}
+        return files if VECTORS_FILE in files and DOCUMENTS_FILE in files else None
+
+    def _load(self):
+        # A save in another process may delete the files a manifest names once its own
+        # manifest is in place; read the new one then
+        for attempt in range(3):
+            files = self._stored_files()
+            if files is None:
+                return
+            try:
+                self._load_files(files)
+                return
+            except FileNotFoundError:
+                if attempt == 2:
+                    raise
+
+    def _load_files(self, files):
+        def path(name):
+            return os.path.join(self.persist_directory, files[name])
+
+        with open(path(DOCUMENTS_FILE), encoding="utf-8") as f:
+            stored = json.load(f)
+        matrix = np.load(path(VECTORS_FILE), mmap_mode="r")
+        scales = np.load(path(SCALES_FILE), mmap_mode="r") if matrix.dtype == np.int8 else None
+        exact = None
+        if self.rerank_candidates and matrix.dtype != np.float32 and EXACT_FILE in files:
+            exact = np.load(path(EXACT_FILE), mmap_mode="r")
+
+        self._ids = stored["ids"]
+        self._texts = stored["texts"]
+        self._metadatas = stored["metadatas"]
+        self._matrix = matrix
+        self._scales = scales
+        self._exact = exact
+        self._count = len(self._ids)
+        # An index keeps the storage it was built with when the configured dtype changes
+        self.dtype = matrix.dtype
+        if exact is None:
+            # Built without exact copies, or stored exactly: search the stored vectors alone
+            self.rerank_candidates = 0
+
+    def save(self):
+        """
+        Write the index to persist_directory atomically.
+
+        Every save writes a new version of each file and then replaces the
+        manifest naming them, so a process opening the index meanwhile reads
+        either the old version or the new one, never a mix. The previous
+        version's files are deleted after the swap.
+        """
+        os.makedirs(self.persist_directory, exist_ok=True)
+        with self._lock:
+            arrays = {VECTORS_FILE: self._rows()}
+            if self._scales is not None:
+                arrays[SCALES_FILE] = self._scales[:self._count]
+            if self._exact is not None:
+                arrays[EXACT_FILE] = self._exact[:self._count]
+            stored = {"ids": self._ids, "texts": self._texts, "metadatas": self._metadatas}
+
+            version = uuid.uuid4().hex
+            files = {name: _versioned(name, version) for name in list(arrays) + [DOCUMENTS_FILE]}
+            for name, array in arrays.items():
+                with open(os.path.join(self.persist_directory, files[name]), "wb") as f:
+                    np.save(f, np.ascontiguousarray(array))
+            with open(os.path.join(self.persist_directory, files[DOCUMENTS_FILE]), "w", encoding="utf-8") as f:
+                json.dump(stored, f)
+
+            previous = self._stored_files() or {}
+            manifest_path = os.path.join(self.persist_directory, MANIFEST_FILE)
+            with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump({"version": version, "files": files}, f)
+            os.replace(manifest_path + ".tmp", manifest_path)
+
+            # Only what the replaced manifest named: a concurrent save's new files are left alone
+            for name in set(previous.values()) | {VECTORS_FILE, DOCUMENTS_FILE, SCALES_FILE, EXACT_FILE}:
+                try:
+                    os.remove(os.path.join(self.persist_directory, name))
+                except FileNotFoundError:
+                    pass
+
+    def _rows(self):
+        if self._matrix is None:
+            return np.empty((0, 0), dtype=self.dtype)
+        return self._matrix[:self._count]
+
+    def _normalize(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _append(self, vectors):
+        """Append normalized float32 rows, growing capacity geometrically (caller holds _lock)"""
+        needed = self._count + len(vectors)
+        self._matrix = _grow(self._matrix, self._count, needed, vectors.shape[1:], self.dtype)
+        if self.dtype == np.int8:
+            rows, scales = _quantize(vectors)
+            self._matrix[self._count:needed] = rows
+            self._scales = _grow(self._scales, self._count, needed, (), np.float32)
+            self._scales[self._count:needed] = scales
+        else:
+            self._matrix[self._count:needed] = vectors
+        if self.rerank_candidates:
+            self._exact = _grow(self._exact, self._count, needed, vectors.shape[1:], np.float32)
+            self._exact[self._count:needed] = vectors
+        self._count = needed
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = list(metadatas) if metadatas else [{} for _ in texts]
+        ids = list(ids) if ids else [uuid.uuid4().hex for _ in texts]
+        vectors = self._normalize(self._embedding.embed_documents(texts))
+
+        with self._lock:
+            self._append(vectors)
+            self._ids.extend(ids)
+            self._texts.extend(texts)
+            self._metadatas.extend(dict(m) for m in metadatas)
+        return ids
+
+    def delete(self, ids=None, where=None, **kwargs):
+        """Delete rows by id and/or Chroma-style metadata filter, then save"""
+        id_set = set(ids or [])
+        with self._lock:
+            keep = [
+                i for i in range(self._count)
+                if self._ids[i] not in id_set and not (where and _matches(self._metadatas[i], where))
+            ]
+            if len(keep) == self._count:
+                return True
+            self._matrix = np.array(self._rows()[keep], dtype=self.dtype)
+            if self._scales is not None:
+                self._scales = np.array(self._scales[keep], dtype=np.float32)
+            if self._exact is not None:
+                self._exact = np.array(self._exact[keep], dtype=np.float32)
+            self._count = len(keep)
+            self._ids = [self._ids[i] for i in keep]
+            self._texts = [self._texts[i] for i in keep]
+            self._metadatas = [self._metadatas[i] for i in keep]
+        self.save()
+        return True
+
+    def _snapshot(self):
+        """Stored rows, their int8 scales, exact copies and documents as of one moment"""
+        with self._lock:
+            return _Snapshot(
+                self._rows(),
+                self._scales[:self._count] if self._scales is not None else None,
+                self._exact[:self._count] if self._exact is not None else None,
+                self._ids,
+                self._texts,
+                self._metadatas
+            )
+
+    @staticmethod
+    def _scores(query, matrix, scales):
+        """Cosine similarity of every row to one normalized query (rows,) or to several (rows, queries)"""
+        if matrix.dtype == np.float32:
+            return matrix @ query.T
+        # No BLAS for half precision or int8: widen one block at a time
+        scores = np.empty((len(matrix),) + query.shape[:-1], dtype=np.float32)
+        for start in range(0, len(matrix), SCORE_BLOCK_ROWS):
+            block = matrix[start:start + SCORE_BLOCK_ROWS].astype(np.float32)
+            scores[start:start + len(block)] = block @ query.T
+        if scales is not None:
+            scores *= scales.reshape((-1,) + (1,) * (scores.ndim - 1))
+        return scores
+
+    def similarity_search_by_vector_with_relevance_scores(self, embedding, k=4, **kwargs):
+        """[(Document, cosine similarity)] for the k nearest rows; same name as Chroma's raw-score search"""
+        if not self._count:
+            return []
+        query = self._normalize(embedding)
+        snapshot = self._snapshot()
+        return self._top(self._scores(query, snapshot.matrix, snapshot.scales), query, k, snapshot)
+
+    def similarity_search_by_vectors_with_relevance_scores(self, embeddings, k=4):
+        """One [(Document, cosine similarity)] list per query vector, scored in a single matrix product"""
+        if not self._count or not len(embeddings):
+            return [[] for _ in embeddings]
+        queries = self._normalize(embeddings)
+        snapshot = self._snapshot()
+        scores = self._scores(queries, snapshot.matrix, snapshot.scales)
+        return [self._top(scores[:, column], queries[column], k, snapshot) for column in range(scores.shape[1])]
+
+    def _top(self, scores, query, k, snapshot):
+        """The k best rows by score, after rescoring the best rerank_candidates exactly if kept"""
+        if snapshot.exact is None or self.rerank_candidates <= k:
+            return [self._result(snapshot, i, scores[i]) for i in self._best(scores, k)]
+
+        candidates = self._best(scores, self.rerank_candidates)
+        exact_scores = snapshot.exact[candidates] @ query
+        return [self._result(snapshot, candidates[i], exact_scores[i]) for i in self._best(exact_scores, k)]
+
+    @staticmethod
+    def _best(scores, k):
+        """Indices of the k highest scores, best first"""
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])]
+
+    @staticmethod
+    def _result(snapshot, i, score):
+        return (
+            Document(page_content=snapshot.texts[i], metadata=dict(snapshot.metadatas[i]), id=snapshot.ids[i]),
+            float(score)
+        )
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_relevance_scores(embedding, k)]
+
+    def similarity_search_with_score(self, query, k=4, **kwargs):
+        return self.similarity_search_by_vector_with_relevance_scores(self._embedding.embed_query(query), k)
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        # Cosine similarity is already a relevance score; clamp float rounding
+        return lambda score: max(0.0, min(1.0, score))
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, persist_directory=None, **kwargs):
+        store = cls(embedding, persist_directory, **kwargs)
+        store.add_texts(texts, metadatas)
+        store.save()
+        return store
@@ -0,0 +1,224 @@
+"""
+Disk janitor for Learn with AI
+Deletes uploaded files and persisted indexes that no live session owns, and
+enforces per-session and global disk quotas on the upload folder
+"""
+
+import os
+import shutil
+import threading
+import time
+
+from metrics import DISK_RECLAIMED_BYTES, QUOTA_REJECTIONS
+from sessions import dir_size
+from uploads import UploadError
+
+
+class QuotaExceeded(UploadError):
+    """Storing more would pass a disk quota; quota is 'session' or 'global'"""
+    status = 413
+
+    def __init__(self, message, quota):
+        super().__init__(message)
+        self.quota = quota
+
+
+class DiskJanitor:
+    """
+    Everything a session stores under root is named after it: uploaded
+    files are <session_id>_<timestamp>_<name> and its index is
+    db_<session_id>. A sweep deletes those whose session has expired or
+    been reset, and files a live session no longer lists among its
+    documents. Anything younger than grace_minutes is left alone, so files
+    still being written are never taken. The upload store's expired partial
+    uploads and unreferenced blobs go in the same pass.
+
+    Orphans are only deleted when delete_orphans is set: with sessions held
+    in process memory, another worker's live session looks unknown here.
+    Without it a sweep only reclaims expired partial uploads and blobs and
+    re-measures usage.
+
+    Session usage is measured when a quota is checked. Global usage is
+    measured by each sweep, plus what this process admitted since.
+    """
+
+    def __init__(self, root, session_store, upload_store, session_quota_mb=None, global_quota_mb=None,
+                 grace_minutes=10, delete_orphans=True):
+        self.root = root
+        self.session_store = session_store
+        self.upload_store = upload_store
+        self.session_quota = int(session_quota_mb * 1024 * 1024) if session_quota_mb else None
+        self.global_quota = int(global_quota_mb * 1024 * 1024) if global_quota_mb else None
+        self.grace_seconds = grace_minutes * 60
+        self.delete_orphans = delete_orphans
+        self.sweeps = 0
+        self.last_sweep = None
+        self.reclaimed = {"session_files": 0, "indexes": 0, "blobs": 0, "partial_uploads": 0}
+        self.rejected = {"session": 0, "global": 0}
+        self._usage = None
+        self._admitted = 0
+        self._lock = threading.Lock()
+        self._sweep_lock = threading.Lock()
+        self._thread = None
+
+    @staticmethod
+    def _owner(name):
+        """Id of the session a file or index directory under root belongs to, or None"""
+        session_id = name[3:] if name.startswith("db_") else name.split("_", 1)[0] if "_" in name else ""
+        return session_id if session_id.isdigit() else None
+
+    def _live_sessions(self):
+        """{session_id: absolute paths of its documents and index}"""
+        backend = self.session_store.backend
+        live = {}
+        for session_id in backend.last_activity():
+            data = backend.load(session_id)
+            if data is None:
+                continue
+            paths = {os.path.abspath(doc["path"]) for doc in data["documents"] if doc.get("type") == "file"}
+            paths.add(os.path.abspath(data["persist_dir"]))
+            live[session_id] = paths
+        return live
+
+    def sweep(self):
+        """Delete what no live session owns and re-measure usage; returns bytes reclaimed by kind"""
+        with self._sweep_lock:
+            # Expired sessions are dropped first so their data goes in this pass
+            self.session_store.cleanup_expired()
+            reclaimed = dict.fromkeys(self.reclaimed, 0)
+            reclaimed["partial_uploads"] = self.upload_store.cleanup_expired()
+            if self.delete_orphans:
+                self._delete_orphans(reclaimed)
+
+            # Only once session files are gone do their blobs lose the last link
+            reclaimed["blobs"] = self.upload_store.remove_orphaned_blobs()
+            usage = self.measure()
+
+            with self._lock:
+                self._usage = usage
+                self._admitted = 0
+                self.sweeps += 1
+                self.last_sweep = time.time()
+                for kind, size in reclaimed.items():
+                    self.reclaimed[kind] += size
+            for kind, size in reclaimed.items():
+                if size:
+                    DISK_RECLAIMED_BYTES.inc(size, kind=kind)
+            return reclaimed
+
+    def _delete_orphans(self, reclaimed):
+        """Delete session files and indexes no live session owns, adding their sizes to reclaimed"""
+        live = self._live_sessions()
+        uploading = self.upload_store.active_part_paths()
+        cutoff = time.time() - self.grace_seconds
+
+        for entry in os.scandir(self.root):
+            owner = self._owner(entry.name)
+            path = os.path.abspath(entry.path)
+            if owner is None or path in uploading or path in live.get(owner, ()):
+                continue
+            try:
+                if entry.stat(follow_symlinks=False).st_mtime > cutoff:
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    size = dir_size(entry.path)
+                    shutil.rmtree(entry.path)
+                    reclaimed["indexes"] += size
+                else:
+                    size = entry.stat(follow_symlinks=False).st_size
+                    os.remove(entry.path)
+                    reclaimed["session_files"] += size
+            except OSError:
+                pass
+
+    def measure(self):
+        """Bytes stored under root, counting hard-linked content once"""
+        seen = set()
+        total = 0
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                try:
+                    stat = os.stat(os.path.join(directory, name), follow_symlinks=False)
+                except OSError:
+                    continue
+                if (stat.st_dev, stat.st_ino) not in seen:
+                    seen.add((stat.st_dev, stat.st_ino))
+                    total += stat.st_size
+        return total
+
+    def session_usage(self, session_id):
+        """Bytes of the session's uploaded files, finished or not, and of its index"""
+        prefix = f"{session_id}_"
+        total = 0
+        for entry in os.scandir(self.root):
+            if entry.name.startswith(prefix) and entry.is_file(follow_symlinks=False):
+                try:
+                    total += entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    pass
+        return total + dir_size(os.path.join(self.root, f"db_{session_id}"))
+
+    def global_usage(self):
+        """Usage at the last sweep plus what this process has admitted since"""
+        if self._usage is None:
+            usage = self.measure()
+            with self._lock:
+                if self._usage is None:
+                    self._usage = usage
+        with self._lock:
+            return self._usage + self._admitted
+
+    def check_quota(self, session_id, size):
+        """Admit size more bytes for the session or raise QuotaExceeded"""
+        if self.session_quota is not None:
+            used = self.session_usage(session_id)
+            if used + size > self.session_quota:
+                self._reject("session")
+                raise QuotaExceeded(
+                    f"Storage quota exceeded: {used / (1024 * 1024):.0f}MB of "
+                    f"{self.session_quota / (1024 * 1024):.0f}MB used by this session",
+                    "session"
+                )
+        if self.global_quota is not None:
+            self.global_usage()  # measured once before the first sweep
+            with self._lock:
+                admitted = self._usage + self._admitted + size <= self.global_quota
+                if admitted:
+                    self._admitted += size
+            if not admitted:
+                self._reject("global")
+                raise QuotaExceeded("Server storage is full, try again later", "global")
+
+    def _reject(self, quota):
+        with self._lock:
+            self.rejected[quota] += 1
+        QUOTA_REJECTIONS.inc(quota=quota)
+
+    def start(self, interval_minutes):
+        """Sweep every interval_minutes on a daemon thread"""
+        if self._thread:
+            return
+        stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval_minutes * 60):
+                try:
+                    self.sweep()
+                except Exception:
+                    pass
+
+        self._thread = threading.Thread(target=run, name="disk-janitor", daemon=True)
+        self._thread.start()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "usage_bytes": self._usage + self._admitted if self._usage is not None else None,
+                "global_quota_bytes": self.global_quota,
+                "session_quota_bytes": self.session_quota,
+                "deletes_orphans": self.delete_orphans,
+                "reclaimed_bytes": dict(self.reclaimed),
+                "quota_rejections": dict(self.rejected),
+                "sweeps": self.sweeps,
+                "last_sweep": self.last_sweep,
+            }
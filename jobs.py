@@ -0,0 +1,299 @@
+"""
+Background ingestion jobs for Learn with AI
+Runs ingestion on a bounded worker pool and tracks per-stage progress
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from config import INGESTION_CONFIG
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = {COMPLETED, FAILED, CANCELLED}
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when a client has asked to cancel it"""
+
+
+class QueueFullError(Exception):
+    """Raised when the ingestion queue has no room for another job; retry_after is in seconds"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class IngestJob:
+    """State and progress of one ingestion run"""
+
+    def __init__(self, session_id):
+        self.id = uuid.uuid4().hex
+        self._status = QUEUED
+        self.session_id = session_id
+        self.error = None
+        self.progress = {
+            "files_loaded": 0,
+            "files_total": 0,
+            "chunks_split": 0,
+            "chunks_embedded": 0,
+            "chunks_total": 0,
+            "chunks_per_second": None,
+        }
+        self._embed_started = None
+        self._published_at = 0.0
+        self.created_at = datetime.now()
+        self.finished_at = None
+        self._cancel_event = threading.Event()
+        # The heartbeat thread publishes too; each write must carry the state as of that write
+        self._publish_lock = threading.Lock()
+
+    @property
+    def status(self):
+        return self._status
+
+    @status.setter
+    def status(self, value):
+        self._status = value
+        self.publish(force=True)
+
+    def publish(self, force=False):
+        """Share this job's state with other workers, at most every PUBLISH_INTERVAL"""
+        if _state_backend is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._published_at < PUBLISH_INTERVAL:
+            return
+        self._published_at = now
+        with self._publish_lock:
+            _state_backend.save_job(self.id, self.session_id, self.to_dict())
+        # A cancel may have been requested through another worker
+        record = _state_backend.load_job(self.id)
+        if record and record["cancel"]:
+            self._cancel_event.set()
+
+    def report(self, stage, done, total):
+        """Progress callback for ingest_documents; aborts if cancelled"""
+        self.publish()
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+        self.progress[stage] = done
+        if stage == "files_loaded":
+            self.progress["files_total"] = total
+        elif stage == "chunks_embedded":
+            self.progress["chunks_total"] = total
+            now = time.perf_counter()
+            if self._embed_started is None:
+                self._embed_started = now
+            elif now > self._embed_started:
+                self.progress["chunks_per_second"] = round(done / (now - self._embed_started), 1)
+
+    def cancel(self):
+        """Ask the job to stop at its next progress checkpoint"""
+        if self.status in FINISHED_STATES:
+            return False
+        self._cancel_event.set()
+        if _state_backend is not None:
+            _state_backend.request_cancel(self.id)
+        return True
+
+    @property
+    def cancel_requested(self):
+        return self._cancel_event.is_set()
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "progress": dict(self.progress),
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "updated_at": datetime.now().isoformat(),
+        }
+
+
+class RemoteJob:
+    """Read-only view of a job owned by another worker process"""
+
+    def __init__(self, job_id, record):
+        self.id = job_id
+        self.session_id = record["session_id"]
+        self._state = record["state"]
+        self.status = self._state["status"]
+
+        # The owning worker refreshes updated_at every job_heartbeat_seconds, even while a
+        # stage makes no progress; one that died mid-job stops
+        updated_at = datetime.fromisoformat(self._state["updated_at"])
+        stale_after = timedelta(seconds=INGESTION_CONFIG["job_stale_seconds"])
+        if self.status not in FINISHED_STATES and datetime.now() - updated_at > stale_after:
+            self.status = FAILED
+            self._state = dict(self._state, status=FAILED, error="Ingestion worker stopped responding")
+
+    def cancel(self):
+        if self.status in FINISHED_STATES:
+            return False
+        _state_backend.request_cancel(self.id)
+        return True
+
+    def to_dict(self):
+        return dict(self._state)
+
+
+_executor = ThreadPoolExecutor(
+    max_workers=INGESTION_CONFIG["max_workers"],
+    thread_name_prefix="ingest"
+)
+_jobs = {}
+_lock = threading.Lock()
+_rejected = 0
+# Smoothed job run time, for the Retry-After sent when the queue is full
+_average_run_seconds = 30.0
+
+# Optional store shared by worker processes (see sessions.py backends)
+_state_backend = None
+
+# Seconds between progress writes to the shared store
+PUBLISH_INTERVAL = 0.5
+
+_heartbeat = None
+
+
+def set_state_backend(backend):
+    """Publish job states to a backend so any worker can report or cancel them"""
+    global _state_backend
+    _state_backend = backend
+
+
+def _start_heartbeat():
+    """Republish this process's unfinished jobs every job_heartbeat_seconds (caller holds _lock)"""
+    global _heartbeat
+    if _heartbeat is not None or _state_backend is None:
+        return
+
+    def run():
+        while True:
+            time.sleep(INGESTION_CONFIG["job_heartbeat_seconds"])
+            with _lock:
+                unfinished = [job for job in _jobs.values() if job.status not in FINISHED_STATES]
+            for job in unfinished:
+                try:
+                    job.publish(force=True)
+                except Exception:
+                    pass
+
+    _heartbeat = threading.Thread(target=run, name="job-heartbeat", daemon=True)
+    _heartbeat.start()
+
+
+def _prune_finished_jobs():
+    """Forget finished jobs past their retention window (caller holds _lock)"""
+    cutoff = datetime.now() - timedelta(minutes=INGESTION_CONFIG["job_retention_minutes"])
+    expired = [
+        job_id for job_id, job in _jobs.items()
+        if job.finished_at and job.finished_at < cutoff
+    ]
+    for job_id in expired:
+        del _jobs[job_id]
+    if expired and _state_backend is not None:
+        _state_backend.delete_jobs(expired)
+
+
+def _finish(job, status, error=None):
+    job.error = error
+    job.finished_at = datetime.now()
+    job.status = status
+
+
+def _run(job, work, on_complete):
+    global _average_run_seconds
+    if job.cancel_requested:
+        _finish(job, CANCELLED)
+        return
+
+    job.status = RUNNING
+    started = time.monotonic()
+    try:
+        result = work(job)
+        if job.cancel_requested:
+            raise JobCancelled()
+        on_complete(result)
+        _finish(job, COMPLETED)
+    except JobCancelled:
+        _finish(job, CANCELLED)
+    except Exception as e:
+        _finish(job, FAILED, str(e))
+    finally:
+        with _lock:
+            _average_run_seconds = 0.8 * _average_run_seconds + 0.2 * (time.monotonic() - started)
+
+
+def submit_job(session_id, work, on_complete):
+    """
+    Queue work(job) on the ingestion pool and return the job.
+
+    on_complete(result) runs on the worker thread only if the job finishes
+    without error or cancellation.
+    """
+    global _rejected
+    with _lock:
+        _prune_finished_jobs()
+        active = [job for job in _jobs.values() if job.status not in FINISHED_STATES]
+        if len(active) >= INGESTION_CONFIG["max_queued_jobs"]:
+            _rejected += 1
+            # Roughly when the first queued job will have started
+            waves = max(1, (len(active) - INGESTION_CONFIG["max_workers"]) // INGESTION_CONFIG["max_workers"] + 1)
+            raise QueueFullError("Ingestion queue is full", _average_run_seconds * waves)
+        job = IngestJob(session_id)
+        _jobs[job.id] = job
+        _start_heartbeat()
+
+    job.publish(force=True)
+    _executor.submit(_run, job, work, on_complete)
+    return job
+
+
+def get_job(job_id):
+    """Look up a job by id, in this process or in the shared store"""
+    with _lock:
+        job = _jobs.get(job_id)
+    if job is None and _state_backend is not None:
+        record = _state_backend.load_job(job_id)
+        if record:
+            job = RemoteJob(job_id, record)
+    return job
+
+
+def active_job_for_session(session_id):
+    """Return the session's queued or running job, if any"""
+    with _lock:
+        for job in _jobs.values():
+            if job.session_id == session_id and job.status not in FINISHED_STATES:
+                return job
+    if _state_backend is not None:
+        for job_id, record in _state_backend.jobs_for_session(session_id):
+            job = RemoteJob(job_id, record)
+            if job.status not in FINISHED_STATES:
+                return job
+    return None
+
+
+def queue_stats():
+    """Jobs of this process waiting and running, and submissions turned away"""
+    with _lock:
+        statuses = [job.status for job in _jobs.values()]
+        return {
+            "queued": statuses.count(QUEUED),
+            "running": statuses.count(RUNNING),
+            "max_workers": INGESTION_CONFIG["max_workers"],
+            "max_queued_jobs": INGESTION_CONFIG["max_queued_jobs"],
+            "rejected": _rejected,
+        }
@@ -0,0 +1,302 @@
+"""
+Document loaders for Learn with AI
+Kept free of embedding and vector store imports so loader worker processes start quickly
+"""
+
+import csv
+import hashlib
+import json
+import threading
+import time
+
+from langchain_core.documents import Document
+from langchain_community.document_loaders import TextLoader
+
+from config import CACHE_CONFIG
+
+# Characters read per step when streaming JSON
+JSON_READ_SIZE = 1 << 16
+
+# Bytes read per step when hashing a file
+HASH_BLOCK = 1 << 20
+
+# Largest page number accepted in a page range
+MAX_PAGE = 100000
+
+# from bs4 import SoupStrainer
+
+
+
+def timed_load(loader, source):
+    """Run a loader and return (seconds spent, documents); picklable for worker processes"""
+    start = time.perf_counter()
+    docs = loader(source)
+    return time.perf_counter() - start, docs
+
+
+# file should be uploaded to the server before calling these functions
+# 
+
+def load_pdf(file_path, pages=None, exclude=()):
+    """
+    One Document per page, as PyPDFLoader splits them.
+
+    pages are 1-based page numbers to load (None for every page) and exclude
+    page numbers to leave out; pages past the end are ignored. Page text is
+    cached by file hash, so only pages never extracted before are parsed.
+    """
+    cache = get_page_cache()
+    file_hash = file_sha256(file_path)
+    total = cache.total_pages(file_hash) if cache else None
+
+    reader = None
+    if total is None:
+        reader = _pdf_reader(file_path)
+        total = len(reader.pages)
+
+    skip = set(exclude)
+    wanted = [
+        page - 1 for page in (range(1, total + 1) if pages is None else pages)
+        if 1 <= page <= total and page not in skip
+    ]
+    extracted = cache.get_pages(file_hash, wanted) if cache else {}
+
+    missing = [page for page in wanted if page not in extracted]
+    if missing:
+        reader = reader or _pdf_reader(file_path)
+        new_pages = {}
+        for page in missing:
+            # Same extraction as PyPDFLoader's default parser
+            text = reader.pages[page].extract_text(extraction_mode="plain").strip()
+            new_pages[page] = (reader.page_labels[page], text)
+        if cache:
+            cache.put_pages(file_hash, total, new_pages)
+        extracted.update(new_pages)
+
+    return [
+        Document(
+            page_content=extracted[page][1],
+            metadata={
+                "source": file_path,
+                "source_type": "pdf",
+                "page": page,
+                "page_label": extracted[page][0],
+                "total_pages": total,
+            }
+        )
+        for page in wanted
+    ]
+
+
+def _pdf_reader(file_path):
+    import pypdf
+    return pypdf.PdfReader(file_path)
+
+
+def file_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+_page_cache = None
+_page_cache_lock = threading.Lock()
+
+
+def get_page_cache():
+    """The process-wide PDF page text cache, or None if disabled"""
+    global _page_cache
+    if _page_cache is None and CACHE_CONFIG["enable_pdf_page_cache"]:
+        with _page_cache_lock:
+            if _page_cache is None:
+                from page_cache import PageTextCache
+                _page_cache = PageTextCache(
+                    CACHE_CONFIG["pdf_page_cache_path"],
+                    CACHE_CONFIG["pdf_page_cache_max_size_mb"]
+                )
+    return _page_cache
+
+
+def parse_page_ranges(spec):
+    """'1-3,7' -> [1, 2, 3, 7]; page numbers are 1-based, as PDF viewers show them"""
+    pages = set()
+    for part in str(spec).replace(" ", "").split(","):
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        try:
+            first, last = int(first), int(last or first)
+        except ValueError:
+            raise ValueError(f"Invalid page range '{part}'")
+        if not 1 <= first <= last <= MAX_PAGE:
+            raise ValueError(f"Invalid page range '{part}'")
+        pages.update(range(first, last + 1))
+    if not pages:
+        raise ValueError("No pages given")
+    return sorted(pages)
+
+
+def format_page_ranges(pages):
+    """[1, 2, 3, 7] -> '1-3,7'"""
+    ranges = []
+    for page in sorted(set(pages)):
+        if ranges and page == ranges[-1][1] + 1:
+            ranges[-1][1] = page
+        else:
+            ranges.append([page, page])
+    return ",".join(str(a) if a == b else f"{a}-{b}" for a, b in ranges)
+
+
+def load_text(file_path):
+    loader = TextLoader(file_path)
+    docs = loader.load()
+
+    for doc in docs:
+        doc.metadata["source"] = file_path
+        doc.metadata["source_type"] = "text"
+
+    return docs
+
+
+def stream_csv(file_path):
+    """Yield one Document per CSV row without reading the whole file"""
+    with open(file_path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        for row_number, row in enumerate(reader):
+            # Same "column: value" layout as CSVLoader
+            content = "\n".join(
+                f"{(key or '').strip()}: {_csv_value(value)}"
+                for key, value in row.items()
+            )
+            yield Document(
+                page_content=content,
+                metadata={"source": file_path, "source_type": "csv", "row": row_number}
+            )
+
+
+def _csv_value(value):
+    if isinstance(value, list):
+        return ",".join(v.strip() for v in value)
+    return (value or "").strip()
+
+
+def load_csv(file_path):
+    return list(stream_csv(file_path))
+
+
+def stream_json(file_path, read_size=JSON_READ_SIZE):
+    """
+    Yield Documents from a JSON file, validating it in the same pass.
+
+    A top-level array is read one element at a time and yields one Document
+    per element. Any other top-level value yields a single Document.
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r', encoding='utf-8') as f:
+        buffer = f.read(read_size).lstrip()
+        while not buffer:
+            chunk = f.read(read_size)
+            if not chunk:
+                break
+            buffer = chunk.lstrip()
+        if not buffer.startswith('['):
+            # Not an array: there is only one record to hold anyway
+            try:
+                value = json.loads(buffer + f.read())
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON file {file_path}: {str(e)}")
+            yield _json_document(value, file_path, 0)
+            return
+
+        pos = 1
+        eof = False
+        seq_num = 0
+        expect_value = True
+        while True:
+            # Make sure the next significant character is buffered
+            while True:
+                while pos < len(buffer) and buffer[pos].isspace():
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    break
+                chunk = f.read(read_size)
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+
+            if pos >= len(buffer):
+                raise ValueError(f"Invalid JSON file {file_path}: unterminated array")
+
+            if buffer[pos] == ']':
+                if expect_value and seq_num:
+                    raise ValueError(f"Invalid JSON file {file_path}: trailing comma")
+                rest = buffer[pos + 1:]
+                while not rest.strip():
+                    rest = f.read(read_size)
+                    if not rest:
+                        return
+                raise ValueError(f"Invalid JSON file {file_path}: extra data after array")
+
+            if not expect_value:
+                if buffer[pos] != ',':
+                    raise ValueError(f"Invalid JSON file {file_path}: expected ',' at offset {pos}")
+                pos += 1
+                expect_value = True
+                continue
+
+            # Decode one element; if it may run past the buffer, read more and retry
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                    # A number cut at the buffer edge still decodes: "12." as 12,
+                    # "1e+" as 1. Up to two characters of it may be left over.
+                    truncated = end + 2 >= len(buffer) if _is_number(value) else end == len(buffer)
+                    if not truncated or eof:
+                        break
+                except json.JSONDecodeError as e:
+                    if eof:
+                        raise ValueError(f"Invalid JSON file {file_path}: {str(e)}")
+                chunk = f.read(max(read_size, len(buffer) - pos))
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+
+            yield _json_document(value, file_path, seq_num)
+            seq_num += 1
+            expect_value = False
+            pos = end
+            if pos > read_size:
+                buffer, pos = buffer[pos:], 0
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _json_document(value, file_path, seq_num):
+    content = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+    return Document(
+        page_content=content,
+        metadata={"source": file_path, "source_type": "json", "seq_num": seq_num}
+    )
+
+
+def load_json(file_path):
+    return list(stream_json(file_path))
+
+
+def load_wiki(wiki_url):
+    # Same parsing as WebBaseLoader, but fetched through the shared pooled, cached session
+    from bs4 import BeautifulSoup
+    from langchain_community.document_loaders.web_base import _build_metadata
+    from url_fetcher import get_fetcher
+
+    body, encoding = get_fetcher().fetch(wiki_url)
+    soup = BeautifulSoup(body.decode(encoding or "utf-8", errors="replace"), "html.parser")
+    docs = [Document(page_content=soup.get_text(), metadata=_build_metadata(soup, wiki_url))]
+
+    for doc in docs:
+        doc.metadata["source"] = wiki_url
+        doc.metadata["source_type"] = "wiki"
+
+    return docs
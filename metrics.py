@@ -0,0 +1,214 @@
+"""
+Performance metrics for Learn with AI
+Minimal Prometheus-style counters, gauges and histograms rendered in text exposition format
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from config import ANALYTICS_CONFIG
+
+ENABLED = ANALYTICS_CONFIG["performance_monitoring"]
+
+# Seconds; spans a fast retrieval through a long generation or ingestion
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_registry = []
+
+
+def _label_key(labelnames, labels):
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _format_labels(labelnames, key, extra=None):
+    pairs = list(zip(labelnames, key)) + (extra or [])
+    if not pairs:
+        return ""
+    escaped = (
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        if not ENABLED:
+            return
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    """A value read from a callback at scrape time"""
+
+    def __init__(self, name, documentation, function):
+        self.name = name
+        self.documentation = documentation
+        self.function = function
+        _registry.append(self)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        try:
+            value = self.function()
+        except Exception:
+            value = None
+        if value is not None:
+            lines.append(f"{self.name} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        if not ENABLED:
+            return
+        key = _label_key(self.labelnames, labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series_items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in series_items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+def render():
+    """All registered metrics in Prometheus text format"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def resident_memory_bytes():
+    """Process RSS from /proc, or None where unavailable"""
+    try:
+        import os
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+# ===========================
+# Metrics shared across modules
+# ===========================
+
+ASK_STAGE_SECONDS = Histogram(
+    "learnai_ask_stage_seconds",
+    "Time spent in each stage of /api/chat/ask",
+    labelnames=("stage",)
+)
+
+INGEST_STAGE_SECONDS = Histogram(
+    "learnai_ingest_stage_seconds",
+    "Time spent in each stage of ingest_documents, per call or per index batch",
+    labelnames=("stage",)
+)
+
+LOADER_PARSE_SECONDS = Histogram(
+    "learnai_loader_parse_seconds",
+    "Time spent parsing one source, by loader",
+    labelnames=("loader",)
+)
+
+BATCH_STAGE_SECONDS = Histogram(
+    "learnai_batch_stage_seconds",
+    "Time spent in each stage of /api/chat/batch",
+    labelnames=("stage",)
+)
+
+CONTEXT_TOKENS = Histogram(
+    "learnai_context_tokens",
+    "Estimated tokens of retrieved context sent with each question",
+    buckets=(50, 100, 250, 500, 750, 1000, 1500, 2000, 3000, 5000)
+)
+
+CHUNKS_INGESTED = Counter(
+    "learnai_chunks_ingested_total",
+    "Chunks embedded and written to a session index"
+)
+
+BYTES_INGESTED = Counter(
+    "learnai_bytes_ingested_total",
+    "Bytes of source documents ingested",
+    labelnames=("loader",)
+)
+
+REQUESTS_REJECTED = Counter(
+    "learnai_requests_rejected_total",
+    "Requests answered with 429, by the limit that turned them away",
+    labelnames=("reason",)
+)
+
+DISK_RECLAIMED_BYTES = Counter(
+    "learnai_disk_reclaimed_bytes_total",
+    "Bytes deleted by the disk janitor, by what they were",
+    labelnames=("kind",)
+)
+
+QUOTA_REJECTIONS = Counter(
+    "learnai_quota_rejections_total",
+    "Uploads and ingestions refused because a disk quota would be exceeded",
+    labelnames=("quota",)
+)
+
+Gauge("learnai_process_resident_memory_bytes", "Resident memory of this process", resident_memory_bytes)
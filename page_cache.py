@@ -0,0 +1,122 @@
+"""
+PDF page text cache for Learn with AI
+Stores the text extracted from each PDF page keyed by the file's content hash
+and the page number, so a file is never parsed twice, whichever session uploads it
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+
+class PageTextCache:
+    """
+    SQLite-backed page text with a size cap; least recently used files are
+    evicted whole. Loader worker processes each open their own connection
+    to the same database file.
+    """
+
+    def __init__(self, path, max_size_mb):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        # Several processes may write at once; wait for the lock instead of failing
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " file_hash TEXT PRIMARY KEY,"
+            " total_pages INTEGER NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " file_hash TEXT NOT NULL,"
+            " page INTEGER NOT NULL,"
+            " label TEXT NOT NULL,"
+            " text TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " PRIMARY KEY (file_hash, page))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS files_last_used ON files (last_used)")
+        self._conn.commit()
+
+    def total_pages(self, file_hash):
+        """Page count of a file seen before, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT total_pages FROM files WHERE file_hash = ?", (file_hash,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_pages(self, file_hash, pages):
+        """Return {page: (label, text)} for the 0-based pages present in the cache"""
+        found = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(pages), 500):
+                batch = list(pages[start:start + 500])
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT page, label, text FROM pages WHERE file_hash = ? AND page IN ({placeholders})",
+                    [file_hash] + batch
+                ).fetchall()
+                for page, label, text in rows:
+                    found[page] = (label, text)
+            if found:
+                self._conn.execute(
+                    "UPDATE files SET last_used = ? WHERE file_hash = ?", (time.time(), file_hash)
+                )
+                self._conn.commit()
+        return found
+
+    def put_pages(self, file_hash, total_pages, pages):
+        """Store {page: (label, text)} for a file and evict old files if over the cap"""
+        rows = [
+            (file_hash, page, label, text, len(text.encode("utf-8")))
+            for page, (label, text) in pages.items()
+        ]
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (file_hash, total_pages, last_used) VALUES (?, ?, ?)",
+                (file_hash, total_pages, time.time())
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pages (file_hash, page, label, text, size) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._evict(keep=file_hash)
+            self._conn.commit()
+
+    def _evict(self, keep):
+        """Drop least recently used files until the cache fits its cap (caller holds _lock)"""
+        size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        while size > self.max_bytes:
+            row = self._conn.execute(
+                "SELECT file_hash FROM files WHERE file_hash != ? ORDER BY last_used LIMIT 1", (keep,)
+            ).fetchone()
+            if row is None:
+                break
+            size -= self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM pages WHERE file_hash = ?", row
+            ).fetchone()[0]
+            self._conn.execute("DELETE FROM pages WHERE file_hash = ?", row)
+            self._conn.execute("DELETE FROM files WHERE file_hash = ?", row)
+
+    def stats(self):
+        """Files, pages and bytes held, across every process sharing the database"""
+        with self._lock:
+            files = self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+            pages, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages"
+            ).fetchone()
+        return {
+            "files": files,
+            "pages": pages,
+            "size_bytes": size,
+            "max_size_bytes": self.max_bytes,
+        }
@@ -0,0 +1,137 @@
+"""
+Retrieval prefetch for Learn with AI
+Keeps the query embedding and candidate chunks of questions still being typed,
+so the submitted question can skip retrieval when it matches one of them
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from difflib import SequenceMatcher
+
+import numpy as np
+
+from answer_cache import normalize_question
+
+
+def _cosine(a, b):
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    norm = np.linalg.norm(a) * np.linalg.norm(b)
+    return float(a @ b / norm) if norm else 0.0
+
+
+class PrefetchCache:
+    """
+    Per-session, short-lived: each session keeps its last few prefetched
+    questions for ttl_seconds, and only sessions seen recently are kept.
+    Entries are tied to the corpus version they were retrieved from.
+
+    Similar text is not enough for a different question to reuse a
+    retrieval ("stages of mitosis" / "stages of meiosis"): its own
+    embedding must also be within min_similarity of the prefetched one.
+    """
+
+    def __init__(self, ttl_seconds, entries_per_session, max_sessions, match_ratio, min_similarity):
+        self.ttl_seconds = ttl_seconds
+        self.entries_per_session = entries_per_session
+        self.max_sessions = max_sessions
+        self.match_ratio = match_ratio
+        self.min_similarity = min_similarity
+        self.prefetches = 0
+        self.hits = 0
+        self.near_hits = 0
+        self.near_rejected = 0
+        self.misses = 0
+        # session_id -> OrderedDict(normalized question -> (corpus_version, vector, scored_docs, expires_at))
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, session_id, corpus_version, question, near=True):
+        """
+        (vector, scored_docs, exact) prefetched for this question, or None.
+
+        With near, a different but similar enough question (by match_ratio)
+        also matches; its vector is then not the question's own.
+        """
+        key = normalize_question(question)
+        now = time.time()
+        with self._lock:
+            entries = self._sessions.get(session_id)
+            if not entries:
+                return None
+            for stale in [k for k, entry in entries.items() if entry[3] <= now or entry[0] != corpus_version]:
+                del entries[stale]
+
+            entry = entries.get(key)
+            if entry:
+                return entry[1], entry[2], True
+            if not near:
+                return None
+
+            best, best_ratio = None, self.match_ratio
+            for other, candidate in entries.items():
+                matcher = SequenceMatcher(None, key, other)
+                # quick_ratio bounds ratio from above and is much cheaper
+                if matcher.quick_ratio() >= best_ratio and matcher.ratio() >= best_ratio:
+                    best, best_ratio = candidate, matcher.ratio()
+            return (best[1], best[2], False) if best else None
+
+    def get(self, session_id, corpus_version, question, embed):
+        """
+        (vector, scored_docs, exact) for a submitted question, or None; counted.
+
+        vector is always the question's own embedding. A near match embeds
+        the question with embed(question) and is only used if that vector is
+        close enough to the prefetched one; otherwise scored_docs is None and
+        the caller searches with vector.
+        """
+        found = self.lookup(session_id, corpus_version, question)
+        if found and not found[2]:
+            vector = embed(question)
+            if _cosine(vector, found[0]) >= self.min_similarity:
+                found = (vector, found[1], False)
+            else:
+                with self._lock:
+                    self.near_rejected += 1
+                return vector, None, False
+        with self._lock:
+            if found is None:
+                self.misses += 1
+            elif found[2]:
+                self.hits += 1
+            else:
+                self.near_hits += 1
+        return found
+
+    def put(self, session_id, corpus_version, question, vector, scored_docs):
+        with self._lock:
+            self.prefetches += 1
+            entries = self._sessions.get(session_id)
+            if entries is None:
+                entries = self._sessions[session_id] = OrderedDict()
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+
+            key = normalize_question(question)
+            entries.pop(key, None)
+            entries[key] = (corpus_version, vector, scored_docs, time.time() + self.ttl_seconds)
+            while len(entries) > self.entries_per_session:
+                entries.popitem(last=False)
+
+    def forget(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "prefetches": self.prefetches,
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "near_rejected": self.near_rejected,
+                "misses": self.misses,
+                "sessions": len(self._sessions),
+            }
@@ -0,0 +1,238 @@
+"""
+Admission control for Learn with AI
+Token buckets per session and per process, and bounded concurrency for
+expensive work, so overload is answered with a quick 429 instead of a long queue
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class RateLimited(Exception):
+    """The request is over a limit; retry_after is the suggested wait in whole seconds"""
+
+    def __init__(self, message, retry_after, reason):
+        super().__init__(message)
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+        self.reason = reason
+
+
+class TokenBucket:
+    """capacity tokens, refilled continuously over period seconds"""
+
+    def __init__(self, capacity, period):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        # now may predate a bucket created after the caller read the clock
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, cost, now):
+        """Seconds until cost tokens are available (0 if they are now)"""
+        self._refill(now)
+        return max(0.0, (cost - self.tokens) / self.rate)
+
+    def take(self, cost):
+        self.tokens -= cost
+
+
+class RateLimiter:
+    """
+    Requests per minute and per hour, for each session and for the whole process.
+
+    A request is admitted only if every bucket it draws from has the tokens,
+    so a rejected request costs nothing. Limits are per worker process.
+    """
+
+    def __init__(self, per_minute, per_hour, global_per_minute, global_per_hour, max_sessions=10000):
+        self.per_minute = per_minute
+        self.per_hour = per_hour
+        self.max_sessions = max_sessions
+        self._global = [TokenBucket(global_per_minute, 60), TokenBucket(global_per_hour, 3600)]
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.rejected = {"session": 0, "global": 0}
+
+    def check(self, session_id, cost=1):
+        """Take cost tokens for session_id or raise RateLimited"""
+        now = time.monotonic()
+        with self._lock:
+            buckets = self._sessions.get(session_id)
+            if buckets is None:
+                buckets = [TokenBucket(self.per_minute, 60), TokenBucket(self.per_hour, 3600)]
+                self._sessions[session_id] = buckets
+                # Oldest idle sessions go first; a fresh bucket is full anyway
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+
+            # A request larger than a bucket could never pass; charge it a full bucket instead
+            session_wait = max(b.wait_time(min(cost, b.capacity), now) for b in buckets)
+            global_wait = max(b.wait_time(min(cost, b.capacity), now) for b in self._global)
+            if session_wait or global_wait:
+                scope = "session" if session_wait >= global_wait else "global"
+                self.rejected[scope] += 1
+                raise RateLimited(
+                    "Too many requests for this session" if scope == "session" else "Server is busy",
+                    max(session_wait, global_wait),
+                    scope
+                )
+            for bucket in buckets + self._global:
+                bucket.take(min(cost, bucket.capacity))
+            self.admitted += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "admitted": self.admitted,
+                "rejected": dict(self.rejected),
+                "tracked_sessions": len(self._sessions),
+            }
+
+
+class ConcurrencyLimiter:
+    """
+    At most limit holders at once and at most max_waiting callers queued
+    behind them; anyone beyond that, or waiting longer than timeout, is
+    rejected with a Retry-After estimated from recent hold times.
+    """
+
+    def __init__(self, name, limit, max_waiting, timeout):
+        self.name = name
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._average_hold = 1.0
+        self._condition = threading.Condition()
+
+    def _rejection(self):
+        self.rejected += 1
+        return RateLimited(
+            f"Too many {self.name} requests in progress",
+            self._average_hold * (self.waiting + 1) / max(1, self.limit),
+            self.name
+        )
+
+    def acquire(self, timeout=None):
+        """Take a slot (returns a release callable) or raise RateLimited"""
+        timeout = self.timeout if timeout is None else timeout
+        with self._condition:
+            if self.in_flight >= self.limit:
+                if self.waiting >= self.max_waiting:
+                    raise self._rejection()
+                self.waiting += 1
+                try:
+                    deadline = time.monotonic() + timeout
+                    while self.in_flight >= self.limit:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise self._rejection()
+                        self._condition.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.in_flight += 1
+            self.admitted += 1
+        return self._releaser()
+
+    def _releaser(self):
+        started = time.monotonic()
+        released = threading.Event()
+
+        def release():
+            if released.is_set():
+                return
+            released.set()
+            with self._condition:
+                # Smoothed so Retry-After follows the current generation latency
+                self._average_hold = 0.9 * self._average_hold + 0.1 * (time.monotonic() - started)
+            self._free_slot()
+
+        return release
+
+    def _free_slot(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def check(self):
+        """Raise RateLimited now if acquire() would be turned away without waiting"""
+        with self._condition:
+            if self.in_flight >= self.limit and self.waiting >= self.max_waiting:
+                raise self._rejection()
+
+    def stats(self):
+        with self._condition:
+            return {
+                "limit": self.limit,
+                "in_flight": self.in_flight,
+                "queue_depth": self.waiting,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+            }
+
+
+class AsyncConcurrencyLimiter(ConcurrencyLimiter):
+    """
+    ConcurrencyLimiter for callers on one asyncio event loop: acquire() is a
+    coroutine and a queued caller holds no thread while it waits. A freed
+    slot passes straight to the longest waiting caller.
+    """
+
+    def __init__(self, name, limit, max_waiting, timeout):
+        super().__init__(name, limit, max_waiting, timeout)
+        self._waiters = deque()
+
+    async def acquire(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        if self.in_flight < self.limit:
+            with self._condition:
+                self.in_flight += 1
+                self.admitted += 1
+            return self._releaser()
+        if self.waiting >= self.max_waiting:
+            raise self._rejection()
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.waiting += 1
+        try:
+            await asyncio.wait([waiter], timeout=timeout)
+        except BaseException:
+            # Cancelled while queued: give back a slot that was already handed over
+            if waiter.done() and not waiter.cancelled():
+                self._free_slot()
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            self.waiting -= 1
+        if not waiter.done():
+            waiter.cancel()
+            self._waiters.remove(waiter)
+            raise self._rejection()
+        with self._condition:
+            self.admitted += 1
+        return self._releaser()
+
+    def _free_slot(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # in_flight is unchanged: the slot changes hands
+                return
+        with self._condition:
+            self.in_flight -= 1
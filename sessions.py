@@ -0,0 +1,447 @@
+"""
+Session store for Learn with AI
+Keeps session metadata in a pluggable backend (in-process or SQLite shared by
+worker processes) and a memory-bounded LRU of open vector store handles per process
+"""
+
+import copy
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+
+def dir_size(path):
+    """Total size in bytes of the files under a directory"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _encode(data):
+    """Session dict -> JSON text (datetimes as ISO strings)"""
+    return json.dumps({
+        key: {"__datetime__": value.isoformat()} if isinstance(value, datetime) else value
+        for key, value in data.items()
+    })
+
+
+def _decode(text):
+    data = json.loads(text)
+    for key, value in data.items():
+        if isinstance(value, dict) and "__datetime__" in value:
+            data[key] = datetime.fromisoformat(value["__datetime__"])
+    return data
+
+
+class MemoryBackend:
+    """Sessions and job states held in this process only"""
+
+    shared = False  # Other worker processes have sessions this one cannot see
+
+    def __init__(self):
+        self._sessions = {}
+        self._jobs = {}
+        self._lock = threading.RLock()
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            yield
+
+    def load(self, session_id):
+        with self._lock:
+            data = self._sessions.get(session_id)
+            return copy.deepcopy(data) if data is not None else None
+
+    def save(self, session_id, data):
+        with self._lock:
+            self._sessions[session_id] = copy.deepcopy(data)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def exists(self, session_id):
+        return session_id in self._sessions
+
+    def count(self):
+        return len(self._sessions)
+
+    def last_activity(self):
+        """{session_id: last_activity} for every session"""
+        with self._lock:
+            return {sid: data["last_activity"] for sid, data in self._sessions.items()}
+
+    def save_job(self, job_id, session_id, state):
+        with self._lock:
+            previous = self._jobs.get(job_id, {})
+            self._jobs[job_id] = {
+                "session_id": session_id,
+                "state": dict(state),
+                "cancel": previous.get("cancel", False),
+            }
+
+    def load_job(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return copy.deepcopy(job) if job else None
+
+    def jobs_for_session(self, session_id):
+        with self._lock:
+            return [
+                (job_id, copy.deepcopy(job)) for job_id, job in self._jobs.items()
+                if job["session_id"] == session_id
+            ]
+
+    def request_cancel(self, job_id):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id]["cancel"] = True
+
+    def delete_jobs(self, job_ids):
+        with self._lock:
+            for job_id in job_ids:
+                self._jobs.pop(job_id, None)
+
+
+class SQLiteBackend:
+    """
+    Sessions and job states in one SQLite database (WAL mode), so every
+    worker process on the host sees the same sessions.
+    """
+
+    shared = True
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " id TEXT PRIMARY KEY, data TEXT NOT NULL, last_activity TEXT NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, session_id TEXT NOT NULL, state TEXT NOT NULL,"
+            " cancel INTEGER NOT NULL DEFAULT 0)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_session ON jobs (session_id)")
+
+    def _conn(self):
+        # One connection per thread; autocommit unless inside transaction()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.depth = 0
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Serialize read-modify-write across threads and processes"""
+        conn = self._conn()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.depth = 1
+        try:
+            yield
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+        finally:
+            self._local.depth = 0
+
+    def load(self, session_id):
+        row = self._conn().execute(
+            "SELECT data FROM sessions WHERE id = ?", (session_id,)
+        ).fetchone()
+        return _decode(row[0]) if row else None
+
+    def save(self, session_id, data):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO sessions (id, data, last_activity) VALUES (?, ?, ?)",
+            (session_id, _encode(data), data["last_activity"].isoformat())
+        )
+
+    def delete(self, session_id):
+        self._conn().execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def exists(self, session_id):
+        return self._conn().execute(
+            "SELECT 1 FROM sessions WHERE id = ?", (session_id,)
+        ).fetchone() is not None
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def last_activity(self):
+        rows = self._conn().execute("SELECT id, last_activity FROM sessions").fetchall()
+        return {sid: datetime.fromisoformat(value) for sid, value in rows}
+
+    def save_job(self, job_id, session_id, state):
+        self._conn().execute(
+            "INSERT INTO jobs (id, session_id, state) VALUES (?, ?, ?)"
+            " ON CONFLICT(id) DO UPDATE SET state = excluded.state",
+            (job_id, session_id, json.dumps(state))
+        )
+
+    def load_job(self, job_id):
+        row = self._conn().execute(
+            "SELECT session_id, state, cancel FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if not row:
+            return None
+        return {"session_id": row[0], "state": json.loads(row[1]), "cancel": bool(row[2])}
+
+    def jobs_for_session(self, session_id):
+        rows = self._conn().execute(
+            "SELECT id, state, cancel FROM jobs WHERE session_id = ?", (session_id,)
+        ).fetchall()
+        return [
+            (job_id, {"session_id": session_id, "state": json.loads(state), "cancel": bool(cancel)})
+            for job_id, state, cancel in rows
+        ]
+
+    def request_cancel(self, job_id):
+        self._conn().execute("UPDATE jobs SET cancel = 1 WHERE id = ?", (job_id,))
+
+    def delete_jobs(self, job_ids):
+        self._conn().executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in job_ids])
+
+
+def create_backend(config):
+    """Build the session backend named by SESSION_CONFIG['backend']"""
+    if config["backend"] == "sqlite":
+        return SQLiteBackend(config["sqlite_path"])
+    if config["backend"] == "memory":
+        return MemoryBackend()
+    raise ValueError(f"Unknown session backend: {config['backend']}")
+
+
+class SessionStore:
+    """
+    Dict-like store of per-session metadata.
+
+    session_data[session_id] returns a snapshot; changes are written back
+    with update() or inside edit(). Vector stores are not part of the
+    session data. Each process opens them on demand from the session's
+    persist_dir with open_index, and closes them with close_index when the
+    open handles exceed the memory budget or count. Size is estimated from
+    the index's on-disk footprint.
+
+    Every change to an index bumps the session's index_generation. A handle
+    opened at an older generation was built before another worker changed
+    the index, so get_db reopens it from disk.
+    """
+
+    def __init__(self, backend, open_index, close_index, max_sessions, timeout_hours,
+                 memory_budget_mb, max_open_indexes):
+        self.backend = backend
+        self.open_index = open_index
+        self.close_index = close_index
+        self.max_sessions = max_sessions
+        self.timeout = timedelta(hours=timeout_hours)
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.max_open_indexes = max_open_indexes
+        self.index_evictions = 0
+        self.index_reloads = 0
+        self._indexes = OrderedDict()  # session_id -> (db, estimated bytes, index_generation)
+        self._index_bytes = 0
+        self._lock = threading.RLock()
+        self._sweeper = None
+
+    def __contains__(self, session_id):
+        return self.backend.exists(session_id)
+
+    def __getitem__(self, session_id):
+        data = self.backend.load(session_id)
+        if data is None:
+            raise KeyError(session_id)
+        return data
+
+    def __len__(self):
+        return self.backend.count()
+
+    @contextmanager
+    def edit(self, session_id):
+        """Read-modify-write a session atomically; yields None if it is gone"""
+        with self.backend.transaction():
+            data = self.backend.load(session_id)
+            yield data
+            if data is not None:
+                self.backend.save(session_id, data)
+
+    def update(self, session_id, **fields):
+        """Set fields on a session if it still exists"""
+        with self.edit(session_id) as data:
+            if data is not None:
+                data.update(fields)
+        return data is not None
+
+    def create(self, session_id, data):
+        """Add a session, dropping the least recently active one if full"""
+        if self.backend.count() >= self.max_sessions:
+            self.cleanup_expired()
+        with self.backend.transaction():
+            activity = self.backend.last_activity()
+            while len(activity) >= self.max_sessions:
+                idle = min(activity, key=activity.get)
+                self.delete(idle)
+                del activity[idle]
+            self.backend.save(session_id, data)
+
+    def delete(self, session_id):
+        """Forget a session and close its vector store"""
+        self.backend.delete(session_id)
+        with self._lock:
+            self._close(session_id)
+
+    def __delitem__(self, session_id):
+        self.delete(session_id)
+
+    def cleanup_expired(self):
+        """Drop sessions idle for longer than the session timeout"""
+        cutoff = datetime.now() - self.timeout
+        expired = [
+            session_id for session_id, last_activity in self.backend.last_activity().items()
+            if last_activity < cutoff
+        ]
+        for session_id in expired:
+            self.delete(session_id)
+
+        # Another worker may have removed sessions whose indexes we still hold
+        with self._lock:
+            for session_id in list(self._indexes):
+                if not self.backend.exists(session_id):
+                    self._close(session_id)
+        return expired
+
+    def has_index(self, session_id):
+        data = self.backend.load(session_id)
+        return bool(data and data.get("index_ready"))
+
+    def get_db(self, session_id):
+        """Return the session's vector store, opening it from disk if needed"""
+        data = self.backend.load(session_id)
+        if not data or not data.get("index_ready"):
+            return None
+        generation = data.get("index_generation", 0)
+
+        with self._lock:
+            entry = self._indexes.get(session_id)
+            if entry and entry[2] >= generation:
+                self._indexes.move_to_end(session_id)
+                return entry[0]
+            if entry:
+                # Another worker changed the index since this handle was opened.
+                # Closed before reopening, so Chroma builds a fresh client
+                # instead of reusing the cached one.
+                self._close(session_id)
+        persist_dir = data["persist_dir"]
+
+        # Open outside the lock; reloading can touch a lot of disk
+        db = self.open_index(persist_dir)
+        with self._lock:
+            entry = self._indexes.get(session_id)
+            if entry and entry[2] >= generation:
+                # Another request reopened it first; both handles share one client
+                return entry[0]
+            if entry:
+                self._close(session_id)
+            self.index_reloads += 1
+            self._track(session_id, db, persist_dir, generation)
+        return db
+
+    def set_db(self, session_id, db, prepare=None):
+        """
+        Swap in a freshly built vector store for a session, or record that
+        the open one was changed in place. Other workers reopen theirs.
+
+        prepare(data), if given, updates the session in the same transaction.
+        """
+        with self.edit(session_id) as data:
+            if data is None:
+                return False
+            if prepare:
+                prepare(data)
+            data["index_ready"] = True
+            data["index_generation"] = generation = data.get("index_generation", 0) + 1
+            persist_dir = data["persist_dir"]
+
+        with self._lock:
+            # The previous handle points at the same persist_dir, so it is
+            # replaced rather than closed
+            previous = self._indexes.pop(session_id, None)
+            if previous:
+                self._index_bytes -= previous[1]
+            self._track(session_id, db, persist_dir, generation)
+        return True
+
+    def _track(self, session_id, db, persist_dir, generation):
+        """Register an open handle and evict idle ones over budget (caller holds _lock)"""
+        size = dir_size(persist_dir)
+        self._indexes[session_id] = (db, size, generation)
+        self._index_bytes += size
+        while len(self._indexes) > 1 and (
+            self._index_bytes > self.memory_budget
+            or len(self._indexes) > self.max_open_indexes
+        ):
+            oldest = next(iter(self._indexes))
+            self._close(oldest)
+            self.index_evictions += 1
+
+    def _close(self, session_id):
+        entry = self._indexes.pop(session_id, None)
+        if entry:
+            self._index_bytes -= entry[1]
+            self.close_index(entry[0])
+
+    def start_sweeper(self, interval_minutes):
+        """Run cleanup_expired every interval_minutes on a daemon thread"""
+        if self._sweeper:
+            return
+        stop = threading.Event()
+
+        def sweep():
+            while not stop.wait(interval_minutes * 60):
+                try:
+                    self.cleanup_expired()
+                except Exception:
+                    pass
+
+        self._sweeper = threading.Thread(target=sweep, name="session-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": self.backend.count(),
+                "open_indexes": len(self._indexes),
+                "open_index_bytes": self._index_bytes,
+                "memory_budget_bytes": self.memory_budget,
+                "index_evictions": self.index_evictions,
+                "index_reloads": self.index_reloads,
+            }
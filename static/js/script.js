@@ -9,7 +9,8 @@ const state = {
     documents: [],
     chatHistory: [],
     dbInitialized: false,
-    isLoading: false
+    isLoading: false,
+    ingestJobId: null
 };
 
 /* ===========================
@@ -60,6 +61,8 @@ function setupEventListeners() {
     if (uploadArea) {
         uploadArea.addEventListener('click', () => fileInput.click());
     }
+
+    setupPrefetch();
 }
 
 function setupDragAndDrop() {
@@ -198,26 +201,73 @@ function handleFileSelect(event) {
 async function uploadFiles(files) {
     if (files.length === 0) return;
 
-    const formData = new FormData();
-    files.forEach(file => formData.append('files', file));
+    let uploaded = 0;
+    for (const file of files) {
+        try {
+            await uploadFileChunked(file);
+            uploaded++;
+        } catch (error) {
+            console.error(`Error uploading ${file.name}:`, error);
+            showToast(`${file.name} - ${error.message || 'Upload failed'}`, 'error');
+        }
+    }
 
-    try {
-        const response = await fetch('/api/documents/upload', {
-            method: 'POST',
-            body: formData
-        });
+    if (uploaded > 0) {
+        showToast(`${uploaded} file(s) uploaded`, 'success');
+        listDocuments();
+    }
+}
 
-        const data = await response.json();
-        if (data.success) {
-            showToast(`${data.uploaded_files} file(s) uploaded`, 'success');
-            listDocuments();
-        } else {
-            showToast(data.error || 'Upload failed', 'error');
+// Hashing needs the whole file in memory, so only small files are checked up front
+const UPLOAD_HASH_LIMIT = 64 * 1024 * 1024;
+const UPLOAD_CHUNK_RETRIES = 5;
+
+async function fileSha256(file) {
+    if (!window.crypto || !crypto.subtle || file.size > UPLOAD_HASH_LIMIT) return null;
+    const digest = await crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+    return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+}
+
+async function uploadFileChunked(file) {
+    // Content the server already holds is linked without sending it again
+    const begin = await fetch('/api/documents/uploads', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ filename: file.name, size: file.size, sha256: await fileSha256(file) })
+    });
+    const started = await begin.json();
+    if (!started.success) throw new Error(started.error);
+    if (started.status !== 'uploading') return started;
+
+    const url = `/api/documents/uploads/${started.upload_id}`;
+    let offset = started.offset;
+    let failures = 0;
+    let result = started;
+
+    while (offset < file.size || result.status === 'uploading') {
+        try {
+            const response = await fetch(`${url}?offset=${offset}`, {
+                method: 'PUT',
+                headers: { 'Content-Type': 'application/octet-stream' },
+                body: file.slice(offset, offset + started.chunk_size)
+            });
+            result = await response.json();
+            if (response.status === 409) {
+                offset = result.offset;  // Resume where the server's copy ends
+                continue;
+            }
+            if (!result.success) throw new Error(result.error);
+            offset = result.offset;
+            failures = 0;
+        } catch (error) {
+            if (++failures > UPLOAD_CHUNK_RETRIES) throw error;
+            // Wait, then ask the server how much it has before resending
+            await new Promise(resolve => setTimeout(resolve, 1000 * failures));
+            const status = await fetch(url).then(r => r.json()).catch(() => null);
+            if (status && status.success) offset = status.offset;
         }
-    } catch (error) {
-        console.error('Error uploading files:', error);
-        showToast('Error uploading files', 'error');
     }
+    return result;
 }
 
 async function addWikiLink() {
@@ -309,7 +359,7 @@ function renderDocumentsList() {
                 <div class="document-name">${doc.name}</div>
                 <div class="document-type">${doc.type.toUpperCase()}</div>
             </div>
-            <button class="document-remove" onclick="removeDocument('${doc.name}')" title="Remove">
+            <button class="document-remove" onclick="removeDocument('${doc.path}')" title="Remove">
                 <i class="fas fa-trash"></i>
             </button>
         </div>
@@ -327,10 +377,27 @@ function getFileIcon(filename) {
     return icons[ext] || '<i class="fas fa-file"></i>';
 }
 
-async function removeDocument(docName) {
-    state.documents = state.documents.filter(doc => doc.name !== docName);
-    renderDocumentsList();
-    showToast('Document removed', 'info');
+async function removeDocument(path) {
+    try {
+        const response = await fetch('/api/documents/remove', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ path })
+        });
+
+        const data = await response.json();
+        if (data.success) {
+            showToast('Document removed', 'info');
+            listDocuments();
+        } else {
+            showToast(data.error || 'Error removing document', 'error');
+        }
+    } catch (error) {
+        console.error('Error removing document:', error);
+        showToast('Error removing document', 'error');
+    }
 }
 
 async function ingestDocuments() {
@@ -344,6 +411,7 @@ async function ingestDocuments() {
 
     ingestBtn.style.display = 'none';
     ingestStatus.style.display = 'flex';
+    document.getElementById('ingestProgress').textContent = 'Queued for processing...';
     state.isLoading = true;
 
     try {
@@ -355,15 +423,28 @@ async function ingestDocuments() {
         });
 
         const data = await response.json();
-        if (data.success) {
-            state.dbInitialized = true;
+        if (!data.success) {
+            showToast(data.error || 'Error processing documents', 'error');
+            ingestBtn.style.display = 'block';
             ingestStatus.style.display = 'none';
+            return;
+        }
+
+        // Nothing new to embed when job_id is null: the index is already up to date
+        state.ingestJobId = data.job_id;
+        const job = data.job_id ? await pollIngestJob(data.job_id) : data;
+
+        ingestStatus.style.display = 'none';
+        if (job.status === 'completed') {
+            state.dbInitialized = true;
             showToast('Documents processed successfully! Ready to chat.', 'success');
             switchTab('chat');
+        } else if (job.status === 'cancelled') {
+            showToast('Document processing cancelled', 'info');
+            ingestBtn.style.display = 'block';
         } else {
-            showToast(data.error || 'Error processing documents', 'error');
+            showToast(job.error || 'Error processing documents', 'error');
             ingestBtn.style.display = 'block';
-            ingestStatus.style.display = 'none';
         }
     } catch (error) {
         console.error('Error ingesting documents:', error);
@@ -371,10 +452,61 @@ async function ingestDocuments() {
         ingestBtn.style.display = 'block';
         ingestStatus.style.display = 'none';
     } finally {
+        state.ingestJobId = null;
         state.isLoading = false;
     }
 }
 
+async function pollIngestJob(jobId) {
+    const finished = ['completed', 'failed', 'cancelled'];
+
+    while (true) {
+        const response = await fetch(`/api/documents/ingest/${jobId}`);
+        const job = await response.json();
+        if (!job.success) {
+            return { status: 'failed', error: job.error };
+        }
+
+        renderIngestProgress(job);
+        if (finished.includes(job.status)) {
+            return job;
+        }
+
+        await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+}
+
+function renderIngestProgress(job) {
+    const p = job.progress;
+    let text = 'Queued for processing...';
+
+    if (job.status === 'running') {
+        if (p.chunks_total > 0) {
+            text = `Embedding chunks: ${p.chunks_embedded} / ${p.chunks_total}`;
+        } else if (p.chunks_split > 0) {
+            text = `Split into ${p.chunks_split} chunks`;
+        } else {
+            text = `Loading files: ${p.files_loaded} / ${p.files_total}`;
+        }
+    }
+
+    document.getElementById('ingestProgress').textContent = text;
+}
+
+async function cancelIngest() {
+    if (!state.ingestJobId) return;
+
+    try {
+        await fetch(`/api/documents/ingest/${state.ingestJobId}/cancel`, {
+            method: 'POST'
+        });
+        document.getElementById('ingestProgress').textContent = 'Cancelling...';
+    } catch (error) {
+        console.error('Error cancelling ingestion:', error);
+        showToast('Error cancelling ingestion', 'error');
+    }
+}
+
 /* ===========================
    Chat Functions
    =========================== */
@@ -386,6 +518,56 @@ function handleChatKeypress(event) {
     }
 }
 
+function setupPrefetch() {
+    // Only rendered when the server has real-time suggestions enabled
+    const chatInput = document.getElementById('chatInput');
+    const delay = Number(chatInput.dataset.prefetchMs);
+    if (!delay) return;
+
+    const minChars = Number(chatInput.dataset.prefetchMinChars);
+    let timer = null;
+    let lastPrefetched = '';
+    chatInput.addEventListener('input', () => {
+        clearTimeout(timer);
+        // Retrieve once typing pauses, so sending the question can skip the search
+        timer = setTimeout(() => {
+            const question = chatInput.value.trim();
+            if (!state.dbInitialized || question.length < minChars || question === lastPrefetched) return;
+            lastPrefetched = question;
+            prefetchQuestion(question);
+        }, delay);
+    });
+}
+
+async function prefetchQuestion(question) {
+    try {
+        const response = await fetch('/api/chat/prefetch', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ question })
+        });
+
+        const data = await response.json();
+        // Skip if the question was edited or sent in the meantime
+        if (data.success && document.getElementById('chatInput').value.trim() === question) {
+            renderSuggestions(data.suggestions);
+        }
+    } catch (error) {
+        console.error('Error prefetching:', error);
+    }
+}
+
+function renderSuggestions(suggestions) {
+    document.getElementById('chatSuggestions').innerHTML = suggestions.map(item => `
+        <div class="chat-suggestion">
+            <span class="chat-suggestion-source">${escapeHtml(item.source)}${item.page ? ` · p. ${item.page}` : ''}</span>
+            ${escapeHtml(item.text)}
+        </div>
+    `).join('');
+}
+
 async function sendMessage() {
     const chatInput = document.getElementById('chatInput');
     const question = chatInput.value.trim();
@@ -403,6 +585,7 @@ async function sendMessage() {
     // Add user message to chat
     addChatMessage(question, 'user');
     chatInput.value = '';
+    renderSuggestions([]);
 
     const sendBtn = document.getElementById('sendBtn');
     sendBtn.disabled = true;
@@ -412,7 +595,7 @@ async function sendMessage() {
     document.getElementById('statusText').textContent = 'Thinking...';
 
     try {
-        const response = await fetch('/api/chat/ask', {
+        const response = await fetch('/api/chat/ask?stream=1', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -420,13 +603,34 @@ async function sendMessage() {
             body: JSON.stringify({ question })
         });
 
-        const data = await response.json();
-        if (data.success) {
-            addChatMessage(data.response, 'assistant');
-            saveToHistory(question, data.response);
-            document.getElementById('statusText').textContent = `${data.tone} tone • ${data.level} level • ${data.sources} sources`;
-        } else {
+        // Validation errors come back as plain JSON, not as an event stream
+        const contentType = response.headers.get('Content-Type') || '';
+        if (!contentType.startsWith('text/event-stream')) {
+            const data = await response.json();
             addChatMessage(`Error: ${data.error}`, 'assistant');
+            return;
+        }
+
+        const bubble = addChatMessage('', 'assistant');
+        let answer = '';
+        let failed = false;
+
+        await readEventStream(response, (event, data) => {
+            if (event === 'meta') {
+                document.getElementById('statusText').textContent = `${data.tone} tone • ${data.level} level • ${data.sources} sources`;
+            } else if (event === 'token') {
+                answer += data.text;
+                bubble.innerHTML = escapeHtml(answer);
+                const chatMessages = document.getElementById('chatMessages');
+                chatMessages.scrollTop = chatMessages.scrollHeight;
+            } else if (event === 'error') {
+                failed = true;
+                bubble.innerHTML = escapeHtml(`Error: ${data.error}`);
+            }
+        });
+
+        if (!failed) {
+            saveToHistory(question, answer);
         }
     } catch (error) {
         console.error('Error sending message:', error);
@@ -437,6 +641,38 @@ async function sendMessage() {
     }
 }
 
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const raw = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            let data = '';
+            raw.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) {
+                    event = line.slice(7);
+                } else if (line.startsWith('data: ')) {
+                    data += line.slice(6);
+                }
+            });
+            if (data) {
+                onEvent(event, JSON.parse(data));
+            }
+        }
+    }
+}
+
 function addChatMessage(message, sender) {
     const chatMessages = document.getElementById('chatMessages');
 
@@ -452,6 +688,8 @@ function addChatMessage(message, sender) {
 
     chatMessages.appendChild(messageDiv);
     chatMessages.scrollTop = chatMessages.scrollHeight;
+
+    return messageDiv.querySelector('.chat-bubble');
 }
 
 function escapeHtml(text) {
@@ -0,0 +1,47 @@
+"""
+Offline stand-ins shared by the tests
+
+- HashingEmbeddings: bag-of-words vectors, so texts sharing words are close
+- EchoChatModel: answers with its prompt (context included), or fails on request
+"""
+
+import hashlib
+import re
+
+import numpy as np
+from langchain_core.language_models.chat_models import SimpleChatModel
+
+DIM = 256
+
+
+class HashingEmbeddings:
+    """Texts sharing words get similar unit vectors"""
+
+    def _vector(self, text):
+        vector = np.zeros(DIM, dtype=np.float32)
+        for word in re.findall(r"[a-z]+", text.lower()):
+            vector[int.from_bytes(hashlib.md5(word.encode()).digest()[:4], "little") % DIM] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+class EchoChatModel(SimpleChatModel):
+    """Answers with the prompt itself, so an answer shows which chunks were retrieved"""
+
+    fail_on: str = "explode"  # prompts containing this raise instead
+
+    @property
+    def _llm_type(self):
+        return "echo"
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs):
+        content = messages[-1].content
+        if self.fail_on in content:
+            raise RuntimeError("model failed")
+        return content
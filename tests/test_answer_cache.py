@@ -0,0 +1,75 @@
+"""
+AnswerCache keys answers by corpus version, tone and level: an answer is
+only ever reused for the same documents and settings, exactly or
+semantically
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from answer_cache import AnswerCache, normalize_question
+
+
+def unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_key_normalizes_question_only():
+    key = AnswerCache.make_key("v1", "default", "beginner", "  What is  ATP?? ")
+    assert key == ("v1", "default", "beginner", normalize_question("what is atp"))
+
+
+def test_exact_hit_only_for_same_corpus_tone_and_level():
+    cache = AnswerCache(1, 60)
+    cache.put(AnswerCache.make_key("v1", "default", "beginner", "What is ATP?"), "energy", {"sources": 2})
+
+    assert cache.get(AnswerCache.make_key("v1", "default", "beginner", "what is atp")) == ("energy", {"sources": 2})
+    for other in (("v2", "default", "beginner"), ("v1", "socratic", "beginner"), ("v1", "default", "advanced")):
+        assert cache.get(AnswerCache.make_key(*other, "What is ATP?")) is None
+
+
+def test_semantic_hit_stays_within_corpus():
+    cache = AnswerCache(1, 60, semantic=True, similarity_threshold=0.95)
+    cache.put(AnswerCache.make_key("v1", "default", "beginner", "What is ATP?"), "energy", vector=unit(1, 0, 0))
+    close = unit(1, 0.05, 0)
+
+    assert cache.get(AnswerCache.make_key("v1", "default", "beginner", "Explain ATP"), close)[0] == "energy"
+    assert cache.get(AnswerCache.make_key("v2", "default", "beginner", "Explain ATP"), close) is None
+    assert cache.get(AnswerCache.make_key("v1", "default", "beginner", "Explain DNA"), unit(0, 1, 0)) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["semantic_hits"], stats["misses"]) == (1, 1, 2)
+
+
+def test_semantic_hit_prefers_closest_and_skips_removed():
+    cache = AnswerCache(1, 60, semantic=True, similarity_threshold=0.9)
+    near = AnswerCache.make_key("v1", "default", "beginner", "near")
+    nearer = AnswerCache.make_key("v1", "default", "beginner", "nearer")
+    cache.put(near, "near answer", vector=unit(1, 0.3, 0))
+    cache.put(nearer, "nearer answer", vector=unit(1, 0.1, 0))
+    query = AnswerCache.make_key("v1", "default", "beginner", "query")
+
+    assert cache.get(query, unit(1, 0, 0))[0] == "nearer answer"
+    cache.put(nearer, "x" * (2 * 1024 * 1024))  # too large: not stored, old entry kept
+    assert cache.get(query, unit(1, 0, 0))[0] == "nearer answer"
+
+
+def test_expired_and_evicted_entries_are_gone():
+    cache = AnswerCache(200 / (1024 * 1024), 0.05)
+    first = AnswerCache.make_key("v1", "default", "beginner", "first")
+    cache.put(first, "a" * 100)
+    time.sleep(0.1)
+    assert cache.get(first) is None
+    assert cache.stats()["expirations"] == 1
+
+    cache = AnswerCache(200 / (1024 * 1024), 60)
+    keys = [AnswerCache.make_key("v1", "default", "beginner", f"q{n}") for n in range(3)]
+    for key in keys:
+        cache.put(key, "a" * 90)
+    assert cache.get(keys[0]) is None and cache.get(keys[2]) is not None
+    assert cache.stats()["size_bytes"] <= 200
@@ -0,0 +1,180 @@
+"""
+Answering through the Flask app, in process: batches, the answer cache,
+prefetched retrievals and generation slots
+
+The index is the flat backend over hashing embeddings and the LLM echoes
+its prompt, so answers show which chunks were retrieved.
+"""
+
+import io
+import json
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import EchoChatModel, HashingEmbeddings
+
+NOTES = {
+    "cells.txt": "The mitochondrion is the powerhouse of the cell and makes energy. ",
+    "stars.txt": "A supernova is the explosion of a massive star at the end of its life. ",
+    "division.txt": "The stages of mitosis are prophase metaphase anaphase and telophase. ",
+}
+
+
+@pytest.fixture(scope="module")
+def app_module(tmp_path_factory):
+    # Uploads, indexes and caches are written under the working directory
+    previous = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("app"))
+    os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+    import config
+    config.VECTOR_DB_CONFIG["backend"] = "flat"
+    config.VECTOR_DB_CONFIG["similarity_threshold"] = 0.0  # hashing scores are on another scale
+    config.STARTUP_CONFIG["warmup_on_start"] = False
+    config.CACHE_CONFIG["enable_query_cache"] = True
+    config.CACHE_CONFIG["enable_embedding_cache"] = False
+    config.FEATURES["real_time_suggestions"] = True
+
+    import chains
+    import vectordatabase
+    vectordatabase._embeddings = vectordatabase.TimedEmbeddings(HashingEmbeddings())
+    chains.set_llm(EchoChatModel())
+
+    import app
+    yield app
+    os.chdir(previous)
+
+
+def events(response):
+    """[(event, data)] of a Server-Sent Events body"""
+    parsed = []
+    for block in response.get_data(as_text=True).strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        parsed.append((lines["event"], json.loads(lines["data"])))
+    return parsed
+
+
+def ingest(client, *names):
+    files = [(io.BytesIO((NOTES[name] * 10).encode()), name) for name in names]
+    assert client.post("/api/documents/upload", data={"files": files},
+                       content_type="multipart/form-data").json["success"]
+    job = client.post("/api/documents/ingest", json={}).json
+    deadline = time.time() + 60
+    while job["status"] not in ("completed", "failed", "cancelled"):
+        assert time.time() < deadline, job
+        time.sleep(0.02)
+        job = client.get(f"/api/documents/ingest/{job['job_id']}").json
+    assert job["status"] == "completed", job
+
+
+@pytest.fixture
+def client(app_module, monkeypatch):
+    """A browser whose session has cells.txt and stars.txt indexed; caches start empty"""
+    monkeypatch.setattr(app_module, "answer_cache", app_module.AnswerCache(1, 3600))
+    monkeypatch.setattr(app_module, "prefetch_cache", app_module.PrefetchCache(60, 8, 100, 0.9, 0.95))
+    client = app_module.app.test_client()
+    assert client.post("/api/session/create").json["success"]
+    ingest(client, "cells.txt", "stars.txt")
+    return client
+
+
+def ask(client, question, stream=False):
+    return client.post("/api/chat/ask" + ("?stream=1" if stream else ""), json={"question": question})
+
+
+def test_batch_answers_each_question_and_reports_failures(client):
+    questions = ["What is a mitochondrion?", "Please explode now", "What is a supernova?"]
+    first = events(client.post("/api/chat/batch", json={"questions": questions}))
+
+    assert first[0] == ("meta", {"tone": "default", "level": "beginner", "questions": 3, "cached": 0})
+    answers = {data["index"]: data for event, data in first if event == "answer"}
+    errors = {data["index"]: data for event, data in first if event == "error"}
+    assert set(answers) == {0, 2} and set(errors) == {1}
+    assert "powerhouse" in answers[0]["response"] and "massive star" in answers[2]["response"]
+    assert first[-1] == ("done", {"success": True, "answered": 2, "failed": 1})
+
+    # Answered questions now come from the cache; the failed one is generated again
+    second = events(client.post("/api/chat/batch", json={"questions": questions}))
+    assert second[0][1]["cached"] == 2
+    cached = {data["index"]: data["cached"] for event, data in second if event == "answer"}
+    assert cached == {0: True, 2: True}
+    assert second[-1] == ("done", {"success": True, "answered": 2, "failed": 1})
+
+
+def test_batch_rejects_invalid_questions(client, app_module, monkeypatch):
+    monkeypatch.setitem(app_module.BATCH_CONFIG, "max_questions", 2)
+    for body in ({"questions": []}, {"questions": "one"}, {"questions": ["a", " "]}, {"questions": ["a", "b", "c"]}):
+        response = client.post("/api/chat/batch", json=body)
+        assert response.status_code == 400 and not response.json["success"]
+
+
+def test_batch_costs_one_request_per_question(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "rate_limiter", app_module.RateLimiter(3, 100, 100, 1000))
+    assert client.post("/api/chat/batch", json={"questions": ["a?", "b?"]}).status_code == 200
+    over = client.post("/api/chat/batch", json={"questions": ["a?", "b?"]})
+    assert over.status_code == 429 and int(over.headers["Retry-After"]) >= 1
+
+    # The rejected batch was not charged: the one request left still passes
+    assert ask(client, "What is a mitochondrion?").status_code == 200
+    assert ask(client, "What is a mitochondrion?").status_code == 429
+
+
+def test_cached_answer_is_keyed_by_corpus_and_streamed_like_a_live_one(client):
+    live = ask(client, "What is a mitochondrion?", stream=True)
+    assert "cached" not in events(live)[0][1]
+
+    cached = ask(client, "what is a MITOCHONDRION", stream=True)
+    assert events(cached)[0][1]["cached"] is True
+    for header in ("Cache-Control", "X-Accel-Buffering"):
+        assert cached.headers[header] == live.headers[header]
+    assert [event for event, _ in events(cached)] == ["meta", "token", "done"]
+
+    # New documents: the cached answer was built from the old corpus
+    ingest(client, "division.txt")
+    assert "cached" not in ask(client, "What is a mitochondrion?").json
+
+
+def test_near_match_prefetch_is_verified_and_never_cached(client, app_module):
+    assert client.post("/api/chat/prefetch", json={"question": "What are the stages of mitosis"}).json["success"]
+    before = app_module.prefetch_cache.stats()
+
+    # Close text, different meaning: searched again (each time), and its own answer may be cached
+    assert ask(client, "What are the stages of meiosis").json["success"]
+    assert ask(client, "What are the stages of meiosis").json.get("cached") is True
+
+    # Close text and embedding: the prefetched retrieval is reused each time, the answer is not cached
+    assert ask(client, "What are the stages of the mitosis").json["success"]
+    assert "cached" not in ask(client, "What are the stages of the mitosis").json
+
+    stats = app_module.prefetch_cache.stats()
+    assert stats["near_rejected"] - before["near_rejected"] == 2
+    assert stats["near_hits"] - before["near_hits"] == 2
+
+
+def test_busy_generation_slots_answer_429_and_are_released(client, app_module, monkeypatch):
+    slots = app_module.ConcurrencyLimiter("generation", limit=1, max_waiting=0, timeout=0.1)
+    monkeypatch.setattr(app_module, "generation_slots", slots)
+
+    held = slots.acquire()
+    busy = ask(client, "What is a supernova?")
+    assert busy.status_code == 429 and int(busy.headers["Retry-After"]) >= 1
+    assert client.post("/api/chat/batch", json={"questions": ["What is a supernova?"]}).status_code == 429
+    held()
+
+    assert ask(client, "What is a supernova?").status_code == 200
+    assert events(ask(client, "Why do stars explode?", stream=True))[-1][0] == "error"
+    assert slots.stats()["in_flight"] == 0
+
+
+def test_stream_closed_early_releases_its_slot(client, app_module, monkeypatch):
+    slots = app_module.ConcurrencyLimiter("generation", limit=1, max_waiting=0, timeout=0.1)
+    monkeypatch.setattr(app_module, "generation_slots", slots)
+
+    response = client.post("/api/chat/ask?stream=1", json={"question": "What is a supernova?"}, buffered=False)
+    assert next(iter(response.response)).startswith(b"event: meta")
+    response.close()
+    assert slots.stats()["in_flight"] == 0
@@ -0,0 +1,106 @@
+"""
+FlatVectorStore searches must return each chunk with its own text and
+metadata while other threads delete rows
+"""
+
+import os
+import sys
+import threading
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flat_index import FlatVectorStore
+
+DIM = 16
+
+
+class OneHotEmbeddings:
+    """Text "chunk-<n>" embeds as a vector pointing mostly along axis n % DIM"""
+
+    def _vector(self, text):
+        vector = np.full(DIM, 0.01, dtype=np.float32)
+        vector[int(text.split("-")[1]) % DIM] = 1.0
+        return vector.tolist()
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+def test_results_match_their_rows_during_deletes(tmp_path):
+    store = FlatVectorStore(OneHotEmbeddings(), str(tmp_path))
+    texts = [f"chunk-{n}" for n in range(2000)]
+    store.add_texts(texts, metadatas=[{"source": text} for text in texts], ids=texts)
+    query = OneHotEmbeddings().embed_query("chunk-3")
+    errors = []
+
+    def search():
+        try:
+            for _ in range(200):
+                for doc, _ in store.similarity_search_by_vector_with_relevance_scores(query, k=8):
+                    assert doc.id == doc.page_content == doc.metadata["source"]
+                for results in store.similarity_search_by_vectors_with_relevance_scores([query, query], k=8):
+                    for doc, _ in results:
+                        assert doc.id == doc.page_content == doc.metadata["source"]
+        except Exception as e:  # noqa: BLE001 - reported below
+            errors.append(e)
+
+    searchers = [threading.Thread(target=search) for _ in range(4)]
+    for thread in searchers:
+        thread.start()
+    for start in range(0, 1900, 50):
+        store.delete(where={"source": {"$in": texts[start:start + 50]}})
+    for thread in searchers:
+        thread.join()
+
+    assert not errors
+    assert len(store) == 100
+
+
+def test_reopened_index_matches_saved(tmp_path):
+    store = FlatVectorStore(OneHotEmbeddings(), str(tmp_path), dtype="int8", rerank_candidates=16)
+    texts = [f"chunk-{n}" for n in range(100)]
+    store.add_texts(texts, ids=texts)
+    store.delete(ids=texts[:10])
+
+    reopened = FlatVectorStore(OneHotEmbeddings(), str(tmp_path), dtype="int8", rerank_candidates=16)
+    results = reopened.similarity_search_by_vector_with_relevance_scores(OneHotEmbeddings().embed_query("chunk-20"), k=4)
+    assert len(reopened) == 90
+    assert all(int(doc.id.split("-")[1]) % DIM == 4 for doc, _ in results)
+
+
+def test_open_during_saves_never_mixes_versions(tmp_path):
+    writer = FlatVectorStore(OneHotEmbeddings(), str(tmp_path))
+    writer.add_texts(["chunk-0"], ids=["chunk-0"])
+    writer.save()
+    done = threading.Event()
+    errors = []
+
+    def reopen():
+        try:
+            while not done.is_set():
+                reader = FlatVectorStore(OneHotEmbeddings(), str(tmp_path))
+                assert len(reader) == len(reader._rows())
+                for doc, _ in reader.similarity_search_by_vector_with_relevance_scores(
+                        OneHotEmbeddings().embed_query("chunk-1"), k=len(reader)):
+                    assert doc.id == doc.page_content
+        except Exception as e:  # noqa: BLE001 - reported below
+            errors.append(e)
+
+    readers = [threading.Thread(target=reopen) for _ in range(2)]
+    for thread in readers:
+        thread.start()
+    for n in range(1, 150):
+        writer.add_texts([f"chunk-{n}"], ids=[f"chunk-{n}"])
+        writer.save()
+    done.set()
+    for thread in readers:
+        thread.join()
+
+    assert not errors
+    # The manifest and the current version's vectors and documents
+    assert len(os.listdir(tmp_path)) == 3
@@ -0,0 +1,89 @@
+"""
+The janitor must never delete files or indexes of a session it cannot see:
+with in-process session storage, that session may live in another worker
+"""
+
+import os
+import sys
+import time
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from janitor import DiskJanitor, QuotaExceeded
+from sessions import MemoryBackend, SessionStore
+from uploads import UploadStore
+
+OLD = time.time() - 3600
+
+
+def make_store():
+    return SessionStore(MemoryBackend(), lambda path: None, lambda db: None, max_sessions=10,
+                        timeout_hours=1, memory_budget_mb=64, max_open_indexes=4)
+
+
+def write_session_files(root, session_id):
+    """An uploaded file and an index directory of session_id, old enough to sweep"""
+    upload = root / f"{session_id}_1700000000_note.txt"
+    upload.write_text("notes")
+    index = root / f"db_{session_id}"
+    index.mkdir()
+    (index / "vectors.npy").write_bytes(b"\0" * 128)
+    for path in (upload, index / "vectors.npy", index):
+        os.utime(path, (OLD, OLD))
+    return upload, index
+
+
+def make_janitor(root, store, **kwargs):
+    uploads = UploadStore(str(root), max_file_size=1 << 20, chunk_size=1 << 16)
+    return DiskJanitor(str(root), store, uploads, grace_minutes=10, **kwargs)
+
+
+def test_unknown_session_kept_without_delete_orphans(tmp_path):
+    upload, index = write_session_files(tmp_path, "123")
+    janitor = make_janitor(tmp_path, make_store(), delete_orphans=False)
+
+    reclaimed = janitor.sweep()
+
+    assert upload.exists() and index.exists()
+    assert reclaimed["session_files"] == reclaimed["indexes"] == 0
+    assert janitor.stats()["usage_bytes"] == janitor.measure()
+
+
+def test_unknown_session_deleted_with_delete_orphans(tmp_path):
+    upload, index = write_session_files(tmp_path, "123")
+    janitor = make_janitor(tmp_path, make_store(), delete_orphans=True)
+
+    reclaimed = janitor.sweep()
+
+    assert not upload.exists() and not index.exists()
+    assert reclaimed["session_files"] == 5 and reclaimed["indexes"] == 128
+
+
+def test_live_session_and_recent_files_kept(tmp_path):
+    upload, index = write_session_files(tmp_path, "123")
+    store = make_store()
+    store.create("123", {
+        "documents": [{"type": "file", "path": str(upload)}],
+        "persist_dir": str(index),
+        "last_activity": datetime.now(),
+    })
+    fresh = tmp_path / "456_1700000000_new.txt"
+    fresh.write_text("still being written")
+    janitor = make_janitor(tmp_path, store, delete_orphans=True)
+
+    janitor.sweep()
+
+    assert upload.exists() and index.exists() and fresh.exists()
+
+
+def test_session_quota(tmp_path):
+    write_session_files(tmp_path, "123")
+    janitor = make_janitor(tmp_path, make_store(), session_quota_mb=200 / (1024 * 1024))
+
+    janitor.check_quota("123", 50)
+    with pytest.raises(QuotaExceeded) as raised:
+        janitor.check_quota("123", 100)
+    assert raised.value.quota == "session"
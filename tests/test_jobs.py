@@ -0,0 +1,82 @@
+"""
+Ingestion jobs shared between workers: another worker's unfinished job is
+live while its owner keeps publishing it, and failed soon after it stops
+"""
+
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jobs
+from config import INGESTION_CONFIG
+from sessions import SQLiteBackend
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    backend = SQLiteBackend(str(tmp_path / "sessions.sqlite3"))
+    monkeypatch.setattr(jobs, "_state_backend", backend)
+    return backend
+
+
+def record(status, updated_seconds_ago, created_minutes_ago=0):
+    now = datetime.now()
+    return {
+        "session_id": "1",
+        "cancel": False,
+        "state": {
+            "job_id": "remote",
+            "status": status,
+            "progress": {},
+            "error": None,
+            "created_at": (now - timedelta(minutes=created_minutes_ago)).isoformat(),
+            "finished_at": None,
+            "updated_at": (now - timedelta(seconds=updated_seconds_ago)).isoformat(),
+        },
+    }
+
+
+def test_long_running_job_with_recent_heartbeat_is_live():
+    job = jobs.RemoteJob("remote", record(jobs.RUNNING, updated_seconds_ago=1, created_minutes_ago=90))
+    assert job.status == jobs.RUNNING
+
+
+def test_silent_job_fails_after_stale_seconds():
+    silent = INGESTION_CONFIG["job_stale_seconds"] + 5
+    job = jobs.RemoteJob("remote", record(jobs.RUNNING, updated_seconds_ago=silent))
+    assert job.status == jobs.FAILED
+    assert job.to_dict()["error"] == "Ingestion worker stopped responding"
+    # Well inside the retention window, which used to decide it
+    assert silent < INGESTION_CONFIG["job_retention_minutes"] * 60
+
+
+def test_finished_job_never_goes_stale():
+    job = jobs.RemoteJob("remote", record(jobs.COMPLETED, updated_seconds_ago=3600))
+    assert job.status == jobs.COMPLETED
+
+
+def test_heartbeat_refreshes_a_job_without_progress(backend, monkeypatch):
+    monkeypatch.setitem(INGESTION_CONFIG, "job_heartbeat_seconds", 0.05)
+    # A heartbeat started by an earlier test may be mid-way through a long sleep
+    monkeypatch.setattr(jobs, "_heartbeat", None)
+    release = threading.Event()
+    job = jobs.submit_job("1", lambda job: release.wait(10), lambda result: None)
+    try:
+        time.sleep(0.2)
+        first = backend.load_job(job.id)["state"]["updated_at"]
+        time.sleep(0.3)
+        second = backend.load_job(job.id)["state"]["updated_at"]
+        assert second > first
+        assert backend.load_job(job.id)["state"]["status"] == jobs.RUNNING
+    finally:
+        release.set()
+    deadline = time.time() + 5
+    while job.status != jobs.COMPLETED and time.time() < deadline:
+        time.sleep(0.01)
+    assert backend.load_job(job.id)["state"]["status"] == jobs.COMPLETED
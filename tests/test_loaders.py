@@ -0,0 +1,47 @@
+"""
+stream_json must accept exactly what json.loads accepts, wherever the read
+boundaries fall
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loaders import stream_json
+
+
+def records(tmp_path, text, read_size):
+    path = tmp_path / "data.json"
+    path.write_text(text, encoding="utf-8")
+    return [doc.page_content for doc in stream_json(str(path), read_size=read_size)]
+
+
+def expected(text):
+    return [value if isinstance(value, str) else json.dumps(value, ensure_ascii=False) for value in json.loads(text)]
+
+
+NUMBERS = ["12.5", "-0.25", "1e5", "1E+21", "3.5e-7", "-2E-10", "0", "-7", "123456.789e+3"]
+
+
+@pytest.mark.parametrize("number", NUMBERS)
+def test_number_across_every_boundary(tmp_path, number):
+    text = f'["aaaa", {number}, 3, {{"x": {number}}}, [{number}]]'
+    for read_size in range(1, len(text) + 2):
+        assert records(tmp_path, text, read_size) == expected(text), read_size
+
+
+def test_float_cut_at_default_read_size(tmp_path):
+    # The buffer ends at "12." of 12.5
+    text = '["' + "a" * 65531 + '", 12.5, 3]'
+    assert records(tmp_path, text, 65536) == expected(text)
+
+
+@pytest.mark.parametrize("text", ['[1, 2', '[1,, 2]', '[1, 2,]', '[1 2]', '[1.]', '[1e]', '[1] x', '["a"]      x'])
+def test_invalid_json_is_rejected(tmp_path, text):
+    for read_size in (1, 2, 3, 64):
+        with pytest.raises(ValueError):
+            records(tmp_path, text, read_size)
@@ -0,0 +1,174 @@
+"""
+One session served by several worker processes sharing the SQLite session
+backend, as gunicorn workers behind a load balancer would be
+
+Each test starts real app processes on local ports. Embeddings are a
+bag-of-words hashing fake and the LLM answers with its prompt, so an answer
+shows which chunks were retrieved. Changes made to the index through one
+worker must be visible through the others, whose open handles predate them.
+"""
+
+import http.cookiejar
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import EchoChatModel, HashingEmbeddings
+
+WORKERS = 2
+
+
+def serve(port, sqlite_path, index_backend):
+    # Uploads, indexes and caches go next to the session database
+    os.chdir(os.path.dirname(sqlite_path))
+    os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+    import config
+    config.SESSION_CONFIG["backend"] = "sqlite"
+    config.SESSION_CONFIG["sqlite_path"] = sqlite_path
+    config.VECTOR_DB_CONFIG["backend"] = index_backend
+    config.VECTOR_DB_CONFIG["similarity_threshold"] = None  # hashing scores are on another scale
+    config.STARTUP_CONFIG["warmup_on_start"] = False
+
+    import chains
+    import vectordatabase
+    vectordatabase._embeddings = HashingEmbeddings()
+    chains.set_llm(EchoChatModel())
+
+    from werkzeug.serving import make_server
+    from app import app
+    make_server("127.0.0.1", port, app, threaded=True).serve_forever()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(params=["flat", "chroma"])
+def workers(request, tmp_path):
+    """Ports of WORKERS app processes sharing one session database"""
+    ctx = multiprocessing.get_context("spawn")
+    ports = [free_port() for _ in range(WORKERS)]
+    processes = [
+        ctx.Process(target=serve, args=(port, str(tmp_path / "sessions.sqlite3"), request.param), daemon=True)
+        for port in ports
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for port, process in zip(ports, processes):
+            deadline = time.time() + 120
+            while True:
+                try:
+                    urllib.request.urlopen(f"http://127.0.0.1:{port}/api/cache/stats", timeout=1)
+                    break
+                except Exception:
+                    if not process.is_alive() or time.time() > deadline:
+                        raise RuntimeError(f"worker on port {port} did not start")
+                    time.sleep(0.2)
+        yield ports
+    finally:
+        for process in processes:
+            process.terminate()
+            process.join(10)
+
+
+class Client:
+    """One browser: a cookie jar, each request sent to the worker given"""
+
+    def __init__(self, ports):
+        self.ports = ports
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+
+    def call(self, worker, method, path, body=None, files=None):
+        data, headers = None, {}
+        if body is not None:
+            data, headers = json.dumps(body).encode(), {"Content-Type": "application/json"}
+        elif files is not None:
+            boundary = uuid.uuid4().hex
+            parts = []
+            for file_path in files:
+                with open(file_path, "rb") as f:
+                    parts.append(
+                        f'--{boundary}\r\nContent-Disposition: form-data; name="files"; '
+                        f'filename="{os.path.basename(file_path)}"\r\n\r\n'.encode() + f.read() + b"\r\n"
+                    )
+            data = b"".join(parts) + f"--{boundary}--\r\n".encode()
+            headers = {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+        request = urllib.request.Request(f"http://127.0.0.1:{self.ports[worker]}{path}", data=data,
+                                         headers=headers, method=method)
+        try:
+            with self.opener.open(request, timeout=60) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return json.loads(e.read())
+
+    def ingest(self, worker, paths):
+        assert self.call(worker, "POST", "/api/documents/upload", files=paths)["success"]
+        job = self.call(worker, "POST", "/api/documents/ingest", body={})
+        deadline = time.time() + 120
+        while job.get("job_id") and job["status"] not in ("completed", "failed", "cancelled"):
+            assert time.time() < deadline, job
+            time.sleep(0.1)
+            job = self.call(worker, "GET", f"/api/documents/ingest/{job['job_id']}")
+        assert job.get("status") == "completed", job
+
+    def ask(self, worker, question):
+        answer = self.call(worker, "POST", "/api/chat/ask", body={"question": question})
+        assert answer["success"], answer
+        return answer["response"]
+
+
+def write_notes(tmp_path):
+    """Two files whose chunks are recognised by a word only they contain (the answer echoes the question)"""
+    paths = {}
+    for name, word in (("cells.txt", "mitochondrion"), ("stars.txt", "supernova")):
+        paths[name] = str(tmp_path / name)
+        with open(paths[name], "w") as f:
+            f.write(f"The {word} is the topic of this {name[:-4]}note. " * 20)
+    return paths
+
+
+def test_session_settings_and_documents_seen_by_every_worker(workers, tmp_path):
+    client = Client(workers)
+    assert client.call(0, "POST", "/api/session/create")["success"]
+    assert client.call(1, "POST", "/api/settings/update", {"tone": "informal", "level": "advanced"})["success"]
+    assert client.call(0, "POST", "/api/documents/upload", files=[write_notes(tmp_path)["cells.txt"]])["success"]
+    for worker in range(WORKERS):
+        info = client.call(worker, "GET", "/api/session/info")
+        assert (info["tone"], info["level"], info["documents_count"]) == ("informal", "advanced", 1), info
+        assert client.call(worker, "GET", "/api/documents/list")["total"] == 1
+
+
+def test_index_changes_seen_by_every_worker(workers, tmp_path):
+    paths = write_notes(tmp_path)
+    client = Client(workers)
+    assert client.call(0, "POST", "/api/session/create")["success"]
+    client.ingest(0, [paths["cells.txt"]])
+    for worker in range(1, WORKERS):
+        assert "cellsnote" in client.ask(worker, "What is the mitochondrion?")
+
+    # Incremental ingestion on worker 0; the others hold handles opened before it
+    client.ingest(0, [paths["stars.txt"]])
+    for worker in range(1, WORKERS):
+        assert "starsnote" in client.ask(worker, "What is a supernova?"), f"worker {worker} missed new chunks"
+
+    documents = client.call(0, "GET", "/api/documents/list")["documents"]
+    cells = next(doc["path"] for doc in documents if doc["name"] == "cells.txt")
+    assert client.call(0, "POST", "/api/documents/remove", body={"path": cells})["success"]
+    for worker in range(1, WORKERS):
+        assert "cellsnote" not in client.ask(worker, "What is the mitochondrion?"), \
+            f"worker {worker} still retrieves removed chunks"
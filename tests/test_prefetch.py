@@ -0,0 +1,81 @@
+"""
+A submitted question reuses a retrieval prefetched for another question only
+if their texts are close and their embeddings are too; "stages of mitosis"
+must never be answered from "stages of meiosis"
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prefetch import PrefetchCache
+
+WORDS = ["stages", "of", "mitosis", "meiosis", "capital", "austria", "australia", "the", "what", "are"]
+
+
+def embed(text):
+    """Bag of words over WORDS: a changed word moves the vector a long way"""
+    vector = np.array([text.lower().split().count(word) for word in WORDS], dtype=np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class CountingEmbed:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, text):
+        self.calls.append(text)
+        return embed(text)
+
+
+def make_cache():
+    return PrefetchCache(60, 8, 100, match_ratio=0.9, min_similarity=0.95)
+
+
+def prefetch(cache, question, version=1):
+    cache.put("s", version, question, embed(question), [f"docs for {question}"])
+
+
+def test_exact_hit_needs_no_embedding():
+    cache = make_cache()
+    prefetch(cache, "What are the stages of mitosis")
+    embed_calls = CountingEmbed()
+
+    vector, scored_docs, exact = cache.get("s", 1, "what are the stages of mitosis?", embed_calls)
+    assert exact and scored_docs == ["docs for What are the stages of mitosis"]
+    assert embed_calls.calls == []
+
+
+def test_similar_text_different_meaning_is_rejected():
+    cache = make_cache()
+    prefetch(cache, "What are the stages of mitosis")
+    prefetch(cache, "the capital of austria")
+
+    for question in ("What are the stages of meiosis", "the capital of australia"):
+        vector, scored_docs, exact = cache.get("s", 1, question, embed)
+        # The caller searches with the question's own vector
+        assert scored_docs is None and not exact
+        assert vector == embed(question)
+    stats = cache.stats()
+    assert (stats["near_hits"], stats["near_rejected"]) == (0, 2)
+
+
+def test_near_match_with_close_embedding_is_reused_but_not_exact():
+    cache = make_cache()
+    prefetch(cache, "What are the stages of mitosis")
+
+    vector, scored_docs, exact = cache.get("s", 1, "What are the stages of mitosis the", embed)
+    assert scored_docs == ["docs for What are the stages of mitosis"]
+    assert not exact
+    assert vector == embed("What are the stages of mitosis the")
+    assert cache.stats()["near_hits"] == 1
+
+
+def test_other_corpus_version_misses():
+    cache = make_cache()
+    prefetch(cache, "What are the stages of mitosis", version=1)
+    assert cache.get("s", 2, "What are the stages of mitosis", embed) is None
+    assert cache.stats()["misses"] == 1
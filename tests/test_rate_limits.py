@@ -0,0 +1,148 @@
+"""
+Admission control: token buckets reject without charging, and generation
+slots are never over-committed or leaked, whether callers finish, time out
+or are cancelled while queued
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limits import AsyncConcurrencyLimiter, ConcurrencyLimiter, RateLimited, RateLimiter
+
+
+def test_session_budget_is_per_session():
+    limiter = RateLimiter(per_minute=3, per_hour=100, global_per_minute=100, global_per_hour=1000)
+    for _ in range(3):
+        limiter.check("a")
+    with pytest.raises(RateLimited) as raised:
+        limiter.check("a")
+    assert raised.value.reason == "session" and raised.value.retry_after >= 1
+    limiter.check("b")
+
+
+def test_rejected_request_costs_nothing():
+    limiter = RateLimiter(per_minute=5, per_hour=100, global_per_minute=100, global_per_hour=1000)
+    limiter.check("a", cost=4)
+    with pytest.raises(RateLimited):
+        limiter.check("a", cost=2)
+    # The rejected batch took no tokens, so one more still fits
+    limiter.check("a", cost=1)
+    assert limiter.stats()["rejected"] == {"session": 1, "global": 0}
+
+
+def test_batch_larger_than_bucket_is_charged_a_full_bucket():
+    limiter = RateLimiter(per_minute=5, per_hour=100, global_per_minute=100, global_per_hour=1000)
+    limiter.check("a", cost=50)
+    with pytest.raises(RateLimited):
+        limiter.check("a")
+
+
+def test_global_budget_spans_sessions():
+    limiter = RateLimiter(per_minute=10, per_hour=100, global_per_minute=2, global_per_hour=1000)
+    limiter.check("a")
+    limiter.check("b")
+    with pytest.raises(RateLimited) as raised:
+        limiter.check("c")
+    assert raised.value.reason == "global"
+
+
+def test_slots_never_exceed_limit():
+    slots = ConcurrencyLimiter("generation", limit=2, max_waiting=16, timeout=5)
+    peak = []
+    lock = threading.Lock()
+
+    def work():
+        release = slots.acquire()
+        try:
+            with lock:
+                peak.append(slots.stats()["in_flight"])
+            time.sleep(0.01)
+        finally:
+            release()
+
+    threads = [threading.Thread(target=work) for _ in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) <= 2
+    assert slots.stats()["in_flight"] == 0 and slots.stats()["admitted"] == 12
+
+
+def test_full_queue_and_timeout_are_rejected():
+    slots = ConcurrencyLimiter("generation", limit=1, max_waiting=0, timeout=5)
+    release = slots.acquire()
+    with pytest.raises(RateLimited):
+        slots.check()
+    with pytest.raises(RateLimited):
+        slots.acquire()
+
+    slots = ConcurrencyLimiter("generation", limit=1, max_waiting=1, timeout=0.05)
+    release = slots.acquire()
+    with pytest.raises(RateLimited):
+        slots.acquire()
+    assert slots.stats()["queue_depth"] == 0
+    release()
+    slots.acquire()()
+
+
+def test_release_is_idempotent():
+    slots = ConcurrencyLimiter("generation", limit=1, max_waiting=0, timeout=1)
+    release = slots.acquire()
+    other = None
+    release()
+    other = slots.acquire()
+    release()  # a second call must not free the slot `other` holds
+    with pytest.raises(RateLimited):
+        slots.acquire()
+    other()
+    assert slots.stats()["in_flight"] == 0
+
+
+def test_async_cancelled_waiter_does_not_leak_a_slot():
+    async def scenario():
+        slots = AsyncConcurrencyLimiter("generation", limit=1, max_waiting=4, timeout=5)
+        release = await slots.acquire()
+        waiter = asyncio.ensure_future(slots.acquire())
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        release()
+        assert slots.stats()["in_flight"] == 0
+
+        # Handed over in arrival order
+        release = await slots.acquire()
+        order = []
+
+        async def queued(name):
+            (await slots.acquire())()
+            order.append(name)
+
+        tasks = [asyncio.ensure_future(queued(name)) for name in "abc"]
+        await asyncio.sleep(0.01)
+        release()
+        await asyncio.gather(*tasks)
+        assert order == ["a", "b", "c"]
+        assert slots.stats()["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_async_wait_times_out():
+    async def scenario():
+        slots = AsyncConcurrencyLimiter("generation", limit=1, max_waiting=4, timeout=0.05)
+        release = await slots.acquire()
+        with pytest.raises(RateLimited):
+            await slots.acquire()
+        release()
+        assert slots.stats() == dict(slots.stats(), in_flight=0, queue_depth=0)
+
+    asyncio.run(scenario())
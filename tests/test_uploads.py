@@ -0,0 +1,147 @@
+"""
+Chunked uploads: a chunk is accepted only at the stored offset, exactly
+once even when retried through several worker processes, and a finished
+file is checked against its declared sha256 and deduplicated by content
+"""
+
+import hashlib
+import io
+import multiprocessing
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from uploads import OffsetMismatch, UploadError, UploadNotFound, UploadStore, UploadTooLarge
+
+CONTENT = bytes(range(256)) * 40  # 10240 bytes
+
+
+def make_store(root):
+    return UploadStore(str(root), max_file_size=1 << 20, chunk_size=4096)
+
+
+def upload(store, root, name, content=CONTENT, sha256=None, session_id="1"):
+    state = store.begin(session_id, name, str(root / name), len(content), sha256=sha256)
+    for offset in range(0, len(content), 4096):
+        state = store.append(state["upload_id"], session_id, offset, io.BytesIO(content[offset:offset + 4096]))
+    return state
+
+
+def test_chunks_must_arrive_at_the_stored_offset(tmp_path):
+    store = make_store(tmp_path)
+    state = store.begin("1", "a.bin", str(tmp_path / "a.bin"), len(CONTENT))
+    store.append(state["upload_id"], "1", 0, io.BytesIO(CONTENT[:4096]))
+
+    # A retried first chunk and a skipped one both get the offset to resume from
+    for offset in (0, 8192):
+        with pytest.raises(OffsetMismatch) as raised:
+            store.append(state["upload_id"], "1", offset, io.BytesIO(CONTENT[offset:offset + 4096]))
+        assert raised.value.offset == 4096
+    assert store.status(state["upload_id"], "1")["offset"] == 4096
+
+
+def test_oversized_chunk_is_rolled_back(tmp_path):
+    store = make_store(tmp_path)
+    state = store.begin("1", "a.bin", str(tmp_path / "a.bin"), len(CONTENT))
+    with pytest.raises(UploadTooLarge):
+        store.append(state["upload_id"], "1", 0, io.BytesIO(CONTENT[:5000]))
+    assert store.status(state["upload_id"], "1")["offset"] == 0
+    # The next process to append rehashes from disk; the result is still correct
+    assert upload_rest(store, state, 0)["sha256"] == hashlib.sha256(CONTENT).hexdigest()
+
+
+def upload_rest(store, state, offset):
+    for start in range(offset, len(CONTENT), 4096):
+        state = store.append(state["upload_id"], "1", start, io.BytesIO(CONTENT[start:start + 4096]))
+    return state
+
+
+def test_upload_is_hashed_resumed_in_another_process_and_finished(tmp_path):
+    store = make_store(tmp_path)
+    state = store.begin("1", "a.bin", str(tmp_path / "a.bin"), len(CONTENT))
+    store.append(state["upload_id"], "1", 0, io.BytesIO(CONTENT[:4096]))
+
+    # Another worker has no running hash for it
+    other = make_store(tmp_path)
+    done = upload_rest(other, state, 4096)
+    assert done["sha256"] == hashlib.sha256(CONTENT).hexdigest()
+    assert done["deduplicated"] is False
+    assert (tmp_path / "a.bin").read_bytes() == CONTENT
+    assert not (tmp_path / "a.bin.part").exists()
+    assert other.stats()["incomplete_uploads"] == 0
+    assert not other._hashers
+    # The first process's running hash goes with its next cleanup
+    store.cleanup_expired()
+    assert not store._hashers
+
+
+def test_declared_sha256_mismatch_discards_the_upload(tmp_path):
+    store = make_store(tmp_path)
+    with pytest.raises(UploadError, match="sha256"):
+        upload(store, tmp_path, "a.bin", sha256="0" * 64)
+    assert not (tmp_path / "a.bin").exists() and not (tmp_path / "a.bin.part").exists()
+    assert store.stats()["incomplete_uploads"] == 0
+
+
+def test_known_content_is_linked_not_copied(tmp_path):
+    store = make_store(tmp_path)
+    upload(store, tmp_path, "a.bin")
+    second = upload(store, tmp_path, "b.bin")
+
+    assert second["deduplicated"] is True
+    assert os.path.samefile(tmp_path / "a.bin", tmp_path / "b.bin")
+    assert store.has_content(second["sha256"])
+    assert store.link(second["sha256"], str(tmp_path / "c.bin"))
+    assert store.stats()["linked_files"] == 2 and store.stats()["bytes_saved"] == 2 * len(CONTENT)
+
+    # Once no file links to it, the blob is reclaimed
+    for name in ("a.bin", "b.bin", "c.bin"):
+        os.remove(tmp_path / name)
+    assert store.remove_orphaned_blobs() == len(CONTENT)
+    assert not store.has_content(second["sha256"])
+
+
+def test_uploads_belong_to_their_session(tmp_path):
+    store = make_store(tmp_path)
+    state = store.begin("1", "a.bin", str(tmp_path / "a.bin"), len(CONTENT))
+    with pytest.raises(UploadNotFound):
+        store.append(state["upload_id"], "2", 0, io.BytesIO(CONTENT[:4096]))
+    with pytest.raises(UploadNotFound):
+        store.status("../1", "1")
+    store.abort(state["upload_id"], "1")
+    with pytest.raises(UploadNotFound):
+        store.status(state["upload_id"], "1")
+    assert not (tmp_path / "a.bin.part").exists()
+
+
+def append_first_chunk(root, upload_id, start, results):
+    store = make_store(root)
+    start.wait()
+    try:
+        store.append(upload_id, "1", 0, io.BytesIO(CONTENT[:4096]))
+        results.put("written")
+    except OffsetMismatch as e:
+        results.put(e.offset)
+
+
+def test_same_chunk_from_several_processes_is_written_once(tmp_path):
+    store = make_store(tmp_path)
+    state = store.begin("1", "a.bin", str(tmp_path / "a.bin"), len(CONTENT))
+    ctx = multiprocessing.get_context("spawn")
+    start, results = ctx.Event(), ctx.Queue()
+    processes = [
+        ctx.Process(target=append_first_chunk, args=(tmp_path, state["upload_id"], start, results))
+        for _ in range(4)
+    ]
+    for process in processes:
+        process.start()
+    start.set()
+    outcomes = sorted((results.get(timeout=60) for _ in processes), key=str)
+    for process in processes:
+        process.join(10)
+
+    assert outcomes == [4096, 4096, 4096, "written"]
+    assert os.path.getsize(tmp_path / "a.bin.part") == 4096
@@ -0,0 +1,362 @@
+"""
+Upload storage for Learn with AI
+Writes uploaded files in one pass while hashing them, supports chunked uploads
+resumable by offset, and links files whose content the server already holds
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: chunks are only serialized within one process
+    fcntl = None
+
+COPY_BLOCK = 1024 * 1024
+
+
+class UploadError(Exception):
+    """An upload request the client has to correct; status is the HTTP status to answer with"""
+    status = 400
+
+
+class UploadNotFound(UploadError):
+    status = 404
+
+
+class UploadTooLarge(UploadError):
+    status = 413
+
+
+class OffsetMismatch(UploadError):
+    """The chunk does not start where the stored data ends; the client resumes from offset"""
+    status = 409
+
+    def __init__(self, offset):
+        super().__init__(f"Expected offset {offset}")
+        self.offset = offset
+
+
+class UploadStore:
+    """
+    Files live at their per-session path under root, so removing a document
+    only removes that session's name for it. Every distinct content also has
+    a hard link at blobs/<sha256>; a new file with known content is replaced
+    by another link to that blob instead of a second copy on disk.
+
+    Chunked uploads keep their state in partial/<upload_id>.json and their
+    data in <final path>.part, so any worker process sharing the upload
+    folder can accept the next chunk. The size of the .part file is the
+    resume offset; a chunk is written under an exclusive lock on that file,
+    so a retry reaching another worker cannot append it twice.
+    """
+
+    def __init__(self, root, max_file_size, chunk_size, incomplete_hours=24):
+        self.root = root
+        self.blob_dir = os.path.join(root, "blobs")
+        self.partial_dir = os.path.join(root, "partial")
+        self.max_file_size = max_file_size
+        self.chunk_size = chunk_size
+        self.incomplete_seconds = incomplete_hours * 3600
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.partial_dir, exist_ok=True)
+
+        # upload_id -> (offset, running sha256) for uploads last written by this process
+        self._hashers = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._last_cleanup = 0.0
+        self.linked = 0
+        self.bytes_saved = 0
+
+    # ----- whole files -----
+
+    def save_stream(self, stream, dest):
+        """Copy a readable stream to dest, hashing in the same pass; returns (sha256, deduplicated)"""
+        digest = hashlib.sha256()
+        tmp_path = dest + ".part"
+        with open(tmp_path, "wb") as f:
+            for block in iter(lambda: stream.read(COPY_BLOCK), b""):
+                digest.update(block)
+                f.write(block)
+        os.replace(tmp_path, dest)
+        sha256 = digest.hexdigest()
+        return sha256, self._adopt(dest, sha256)
+
+    def has_content(self, sha256):
+        return os.path.exists(self._blob_path(sha256))
+
+    def link(self, sha256, dest):
+        """Give dest the content of a stored blob without copying it; False if the blob is gone"""
+        try:
+            self._link_or_copy(self._blob_path(sha256), dest)
+        except FileNotFoundError:
+            return False
+        with self._lock:
+            self.linked += 1
+            self.bytes_saved += os.path.getsize(dest)
+        return True
+
+    def _blob_path(self, sha256):
+        if len(sha256) != 64 or any(c not in "0123456789abcdef" for c in sha256):
+            raise UploadError("Invalid sha256")
+        return os.path.join(self.blob_dir, sha256)
+
+    def _adopt(self, path, sha256):
+        """Register a complete file's content; if already held, swap path for a link. True if deduplicated"""
+        blob = self._blob_path(sha256)
+        try:
+            os.link(path, blob)
+            return False
+        except FileExistsError:
+            pass
+        except OSError:
+            # No hard links on this filesystem: keep the file and skip deduplication
+            return False
+
+        size = os.path.getsize(path)
+        tmp_path = path + ".link"
+        try:
+            self._link_or_copy(blob, tmp_path)
+        except FileNotFoundError:
+            return False
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.linked += 1
+            self.bytes_saved += size
+        return True
+
+    @staticmethod
+    def _link_or_copy(src, dest):
+        try:
+            os.link(src, dest)
+        except FileNotFoundError:
+            raise
+        except OSError:
+            shutil.copyfile(src, dest)
+
+    # ----- chunked uploads -----
+
+    def begin(self, session_id, name, dest, size, sha256=None, fields=None):
+        """
+        Start a chunked upload of size bytes to dest and return its state.
+        fields are kept with the state for the caller, e.g. the document's page ranges.
+        """
+        if size < 0:
+            raise UploadError("Invalid size")
+        if size > self.max_file_size:
+            raise UploadTooLarge(
+                f"File too large. Maximum size: {self.max_file_size / (1024 * 1024):.0f}MB"
+            )
+        if sha256:
+            sha256 = sha256.lower()
+            self._blob_path(sha256)  # validates
+        self._cleanup_expired()
+
+        state = {
+            "upload_id": uuid.uuid4().hex,
+            "session_id": session_id,
+            "name": name,
+            "path": dest,
+            "size": size,
+            "sha256": sha256,
+            "fields": fields or {},
+            "created_at": time.time(),
+        }
+        open(dest + ".part", "wb").close()
+        with open(self._state_path(state["upload_id"]), "w") as f:
+            json.dump(state, f)
+        return dict(state, offset=0)
+
+    def status(self, upload_id, session_id):
+        state = self._load_state(upload_id, session_id)
+        state["offset"] = os.path.getsize(state["path"] + ".part")
+        return state
+
+    def append(self, upload_id, session_id, offset, stream):
+        """
+        Write one chunk starting at offset. Returns the state; once the last
+        byte arrives the file is verified, moved to its final path and the
+        state gains "sha256" and "deduplicated".
+        """
+        state = self._load_state(upload_id, session_id)
+        part_path = state["path"] + ".part"
+
+        with self._upload_lock(upload_id), self._locked_part(part_path) as f:
+            # Another process may have finished or aborted the upload while we waited
+            self._load_state(upload_id, session_id)
+            current = os.fstat(f.fileno()).st_size
+            if offset != current:
+                raise OffsetMismatch(current)
+
+            digest = self._resume_hasher(upload_id, part_path, current)
+            written = 0
+            for block in iter(lambda: stream.read(COPY_BLOCK), b""):
+                written += len(block)
+                if written > self.chunk_size or current + written > state["size"]:
+                    f.truncate(current)
+                    self._hashers.pop(upload_id, None)
+                    raise UploadTooLarge("Chunk exceeds the chunk size or the declared file size")
+                digest.update(block)
+                f.write(block)
+            f.flush()
+            offset = current + written
+            self._hashers[upload_id] = (offset, digest)
+
+            state["offset"] = offset
+            if offset < state["size"]:
+                return state
+
+            sha256 = digest.hexdigest()
+            self._discard_state(upload_id)
+            if state["sha256"] and state["sha256"] != sha256:
+                os.remove(part_path)
+                raise UploadError("Uploaded content does not match the declared sha256")
+            os.replace(part_path, state["path"])
+            state["sha256"] = sha256
+            state["deduplicated"] = self._adopt(state["path"], sha256)
+            return state
+
+    def abort(self, upload_id, session_id):
+        state = self._load_state(upload_id, session_id)
+        with self._upload_lock(upload_id), self._locked_part(state["path"] + ".part"):
+            self._discard_state(upload_id)
+            try:
+                os.remove(state["path"] + ".part")
+            except FileNotFoundError:
+                pass
+
+    @contextmanager
+    def _locked_part(self, part_path):
+        """The .part file opened for appending, exclusively locked across processes"""
+        try:
+            f = open(part_path, "ab")
+        except FileNotFoundError:
+            raise UploadNotFound("Upload not found")
+        with f:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            yield f
+
+    def _resume_hasher(self, upload_id, part_path, offset):
+        """The running hash of the first offset bytes; rehashes the file if another process wrote them"""
+        cached = self._hashers.get(upload_id)
+        if cached and cached[0] == offset:
+            return cached[1]
+        digest = hashlib.sha256()
+        with open(part_path, "rb") as f:
+            for block in iter(lambda: f.read(COPY_BLOCK), b""):
+                digest.update(block)
+        return digest
+
+    def _upload_lock(self, upload_id):
+        with self._lock:
+            lock = self._locks.get(upload_id)
+            if lock is None:
+                lock = self._locks[upload_id] = threading.Lock()
+        return lock
+
+    def _state_path(self, upload_id):
+        if not upload_id.isalnum():
+            raise UploadNotFound("Upload not found")
+        return os.path.join(self.partial_dir, upload_id + ".json")
+
+    def _load_state(self, upload_id, session_id):
+        try:
+            with open(self._state_path(upload_id)) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            raise UploadNotFound("Upload not found")
+        if state["session_id"] != session_id:
+            raise UploadNotFound("Upload not found")
+        return state
+
+    def _discard_state(self, upload_id):
+        with self._lock:
+            self._locks.pop(upload_id, None)
+            self._hashers.pop(upload_id, None)
+        try:
+            os.remove(self._state_path(upload_id))
+        except FileNotFoundError:
+            pass
+
+    def _cleanup_expired(self):
+        """cleanup_expired(), at most hourly"""
+        now = time.time()
+        with self._lock:
+            if now - self._last_cleanup < 3600:
+                return
+            self._last_cleanup = now
+        self.cleanup_expired()
+
+    def cleanup_expired(self):
+        """Drop chunked uploads left unfinished for longer than incomplete_hours; returns bytes freed"""
+        now = time.time()
+        freed = 0
+        for name in os.listdir(self.partial_dir):
+            state_path = os.path.join(self.partial_dir, name)
+            try:
+                if now - os.path.getmtime(state_path) < self.incomplete_seconds:
+                    continue
+                with open(state_path) as f:
+                    state = json.load(f)
+                # The .part file's mtime tracks the last chunk written
+                part_path = state["path"] + ".part"
+                if os.path.exists(part_path) and now - os.path.getmtime(part_path) < self.incomplete_seconds:
+                    continue
+                self._discard_state(name[:-len(".json")])
+                if os.path.exists(part_path):
+                    freed += os.path.getsize(part_path)
+                    os.remove(part_path)
+            except (OSError, ValueError, KeyError, UploadError):
+                pass
+
+        # Uploads another process finished or aborted leave this one's running hash behind
+        with self._lock:
+            gone = [
+                upload_id for upload_id in set(self._hashers) | set(self._locks)
+                if not os.path.exists(self._state_path(upload_id))
+            ]
+            for upload_id in gone:
+                self._hashers.pop(upload_id, None)
+                self._locks.pop(upload_id, None)
+        return freed
+
+    def active_part_paths(self):
+        """Data files of chunked uploads still in progress"""
+        paths = set()
+        for name in os.listdir(self.partial_dir):
+            try:
+                with open(os.path.join(self.partial_dir, name)) as f:
+                    paths.add(os.path.abspath(json.load(f)["path"] + ".part"))
+            except (OSError, ValueError, KeyError):
+                pass
+        return paths
+
+    def remove_orphaned_blobs(self):
+        """Delete blobs no uploaded file links to any more; returns bytes freed"""
+        freed = 0
+        for entry in os.scandir(self.blob_dir):
+            try:
+                stat = entry.stat(follow_symlinks=False)
+                # The blob's own name is its only link left
+                if stat.st_nlink == 1:
+                    os.remove(entry.path)
+                    freed += stat.st_size
+            except OSError:
+                pass
+        return freed
+
+    def stats(self):
+        with self._lock:
+            return {
+                "linked_files": self.linked,
+                "bytes_saved": self.bytes_saved,
+                "incomplete_uploads": len(os.listdir(self.partial_dir)),
+            }
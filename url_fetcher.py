@@ -0,0 +1,230 @@
+"""
+Pooled, cached URL fetching for Learn with AI
+One HTTP session per process with per-host concurrency limits, and an on-disk
+cache that revalidates pages with ETag / Last-Modified instead of downloading them again
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from config import INGESTION_CONFIG, CACHE_CONFIG
+
+
+class UrlFetcher:
+    """
+    Fetches URLs through one pooled requests.Session.
+
+    At most per_host_limit requests run against the same host at once.
+    With cache_dir set, responses are stored on disk with their validators;
+    a later fetch of the same URL is served from disk while fresh
+    (Cache-Control max-age) and otherwise sent as a conditional request,
+    so an unchanged page costs a 304 rather than a full download.
+    """
+
+    def __init__(self, cache_dir=None, timeout=15, per_host_limit=4, pool_size=16,
+                 max_cache_mb=200, user_agent=None):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.timeout = timeout
+        self.per_host_limit = per_host_limit
+        self.cache_dir = cache_dir
+        self.max_cache_bytes = int(max_cache_mb * 1024 * 1024)
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._session.headers["User-Agent"] = (
+            user_agent or os.environ.get("USER_AGENT") or "learn-with-ai/1.0"
+        )
+
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self.fresh_hits = 0
+        self.revalidated = 0
+        self.downloads = 0
+        self.errors = 0
+        self._cache_size = 0
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._cache_size = sum(
+                os.path.getsize(os.path.join(cache_dir, name)) for name in os.listdir(cache_dir)
+            )
+
+    def fetch(self, url):
+        """Return (body bytes, text encoding) for url, raising on HTTP errors and timeouts"""
+        entry = self._load_entry(url)
+        if entry and entry["expires_at"] > time.time():
+            with self._lock:
+                self.fresh_hits += 1
+            return entry["body"], entry["encoding"]
+
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            with self._host_slot(url):
+                response = self._session.get(url, headers=headers, timeout=self.timeout)
+            if entry and response.status_code == 304:
+                with self._lock:
+                    self.revalidated += 1
+                self._store(url, entry["body"], entry["encoding"], response.headers, entry)
+                return entry["body"], entry["encoding"]
+            response.raise_for_status()
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+
+        body = response.content
+        content_type = response.headers.get("Content-Type", "")
+        # requests assumes ISO-8859-1 for text/* without a charset; detect it instead
+        encoding = response.encoding if "charset" in content_type.lower() else response.apparent_encoding
+        with self._lock:
+            self.downloads += 1
+        self._store(url, body, encoding, response.headers)
+        return body, encoding
+
+    def stats(self):
+        with self._lock:
+            return {
+                "fresh_hits": self.fresh_hits,
+                "revalidated": self.revalidated,
+                "downloads": self.downloads,
+                "errors": self.errors,
+                "cache_size_bytes": self._cache_size,
+            }
+
+    def _host_slot(self, url):
+        from urllib.parse import urlsplit
+
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            slot = self._hosts.get(host)
+            if slot is None:
+                slot = self._hosts[host] = threading.BoundedSemaphore(self.per_host_limit)
+        return slot
+
+    # ----- on-disk cache: <sha256>.json holds metadata, <sha256>.body the response -----
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return base + ".json", base + ".body"
+
+    def _load_entry(self, url):
+        if not self.cache_dir:
+            return None
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path) as f:
+                entry = json.load(f)
+            with open(body_path, "rb") as f:
+                entry["body"] = f.read()
+        except (OSError, ValueError):
+            return None
+        # Reads count as use for eviction
+        os.utime(meta_path)
+        return entry
+
+    def _store(self, url, body, encoding, headers, previous=None):
+        if not self.cache_dir:
+            return
+        cache_control = headers.get("Cache-Control", "").lower()
+        if "no-store" in cache_control:
+            return
+
+        etag = headers.get("ETag") or (previous or {}).get("etag")
+        last_modified = headers.get("Last-Modified") or (previous or {}).get("last_modified")
+        if not etag and not last_modified and "max-age" not in cache_control:
+            return  # Nothing to revalidate against
+
+        max_age = 0
+        if "no-cache" not in cache_control:
+            for directive in cache_control.split(","):
+                name, _, value = directive.strip().partition("=")
+                if name == "max-age" and value.isdigit():
+                    max_age = int(value)
+
+        meta_path, body_path = self._paths(url)
+        meta = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "encoding": encoding,
+            "expires_at": time.time() + max_age,
+        }
+        old_size = sum(os.path.getsize(p) for p in (meta_path, body_path) if os.path.exists(p))
+
+        # Write then rename so concurrent readers never see a partial file
+        if previous is None:
+            self._write_atomic(body_path, body)
+        self._write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+
+        new_size = sum(os.path.getsize(p) for p in (meta_path, body_path) if os.path.exists(p))
+        with self._lock:
+            self._cache_size += new_size - old_size
+            if self._cache_size > self.max_cache_bytes:
+                self._evict()
+
+    @staticmethod
+    def _write_atomic(path, data):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _evict(self):
+        """Drop least recently used pages until the cache fits its cap (caller holds _lock)"""
+        metas = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".json"):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    metas.append((os.path.getmtime(path), path))
+                except OSError:
+                    pass
+        for _, meta_path in sorted(metas):
+            if self._cache_size <= self.max_cache_bytes:
+                break
+            for path in (meta_path, meta_path[:-len(".json")] + ".body"):
+                try:
+                    size = os.path.getsize(path)
+                    os.remove(path)
+                    self._cache_size -= size
+                except OSError:
+                    pass
+
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+
+def get_fetcher():
+    """The process-wide fetcher configured from INGESTION_CONFIG and CACHE_CONFIG"""
+    global _fetcher
+    if _fetcher is None:
+        with _fetcher_lock:
+            if _fetcher is None:
+                _fetcher = UrlFetcher(
+                    cache_dir=CACHE_CONFIG["http_cache_path"] if CACHE_CONFIG["enable_http_cache"] else None,
+                    timeout=INGESTION_CONFIG["url_timeout_seconds"],
+                    per_host_limit=INGESTION_CONFIG["url_per_host_limit"],
+                    pool_size=INGESTION_CONFIG["wiki_threads"],
+                    max_cache_mb=CACHE_CONFIG["http_cache_max_size_mb"]
+                )
+    return _fetcher
+
+
+def fetcher_stats():
+    """Counters of the process-wide fetcher, or None before the first URL fetch"""
+    return _fetcher.stats() if _fetcher else None
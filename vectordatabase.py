@@ -1,99 +1,129 @@
-from langchain_community.vectorstores import Chroma
-
-from langchain_huggingface import HuggingFaceEmbeddings
-
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-
-from langchain_community.document_loaders import (
-    PyPDFLoader,
-    TextLoader,
-    CSVLoader,
-    JSONLoader,
-    WebBaseLoader   # BeautifulSoupWebLoader
-)
-
-# from bs4 import SoupStrainer
-
-
-
-# file should be uploaded to the server before calling these functions
-# 
-
-def load_pdf(file_path):
-    loader = PyPDFLoader(file_path)
-    docs = loader.load()
-
-    for doc in docs:
-        doc.metadata["source"] = file_path
-        doc.metadata["source_type"] = "pdf"
-
-    return docs 
-
-def load_text(file_path):
-    loader = TextLoader(file_path)
-    docs = loader.load()
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import partial
+from itertools import islice
+
+from langchain_core.embeddings import Embeddings
+
+from config import VECTOR_DB_CONFIG, CACHE_CONFIG, INGESTION_CONFIG
+from embedding_cache import EmbeddingCache, CachedEmbeddings
+from metrics import INGEST_STAGE_SECONDS, LOADER_PARSE_SECONDS, CHUNKS_INGESTED, BYTES_INGESTED
+
+
+class MultiProcessEmbeddings(Embeddings):
+    """Encodes documents on one persistent sentence-transformers process pool"""
+
+    def __init__(self, embeddings, batch_size):
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        # HuggingFaceEmbeddings(multi_process=True) would start and stop a pool per call
+        with self._lock:
+            if self._pool is None:
+                self._pool = self.embeddings._client.start_multi_process_pool()
+        return self._pool
+
+    def embed_documents(self, texts):
+        texts = [text.replace("\n", " ") for text in texts]
+        vectors = self.embeddings._client.encode(
+            texts,
+            pool=self._get_pool(),
+            batch_size=self.batch_size
+        )
+        return vectors.tolist()
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+
+class TimedEmbeddings(Embeddings):
+    """Accumulates embed_documents time per thread so ingestion can tell it apart from index writes"""
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self._local = threading.local()
+
+    def embed_documents(self, texts):
+        start = time.perf_counter()
+        try:
+            return self.embeddings.embed_documents(texts)
+        finally:
+            self._local.seconds = self.take_seconds() + time.perf_counter() - start
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+    def take_seconds(self):
+        """Embedding time on this thread since the last call"""
+        seconds = getattr(self._local, "seconds", 0.0)
+        self._local.seconds = 0.0
+        return seconds
+
+
+# Identical chunks are embedded once per model and chunking settings, across sessions
+embedding_cache = None
+if CACHE_CONFIG["enable_embedding_cache"]:
+    embedding_cache = EmbeddingCache(
+        CACHE_CONFIG["embedding_cache_path"],
+        CACHE_CONFIG["cache_max_size_mb"]
+    )
 
-    for doc in docs:
-        doc.metadata["source"] = file_path
-        doc.metadata["source_type"] = "text"
+# The sentence-transformers model is loaded on first use, not at import
+_embeddings = None
+_embeddings_lock = threading.Lock()
 
-    return docs
 
+def get_embeddings():
+    """Return the shared embedding model, loading it on first call"""
+    global _embeddings
+    if _embeddings is None:
+        with _embeddings_lock:
+            if _embeddings is None:
+                _embeddings = _load_embeddings()
+    return _embeddings
 
-def load_csv(file_path):
-    loader = CSVLoader(file_path)
-    docs = loader.load()
 
-    for doc in docs:
-        doc.metadata["source"] = file_path
-        doc.metadata["source_type"] = "csv"
+def warmup():
+    """Load the embedding model and vector store library ahead of the first request"""
+    get_embeddings().embed_query("warmup")
+    if VECTOR_DB_CONFIG["backend"] == "chroma":
+        from langchain_community.vectorstores import Chroma  # noqa: F401
 
-    return docs
 
+def _load_embeddings():
+    from langchain_huggingface import HuggingFaceEmbeddings
 
-def load_json(file_path):
-    import json
-    try:
-        # First, try to validate the JSON file
-        with open(file_path, 'r', encoding='utf-8') as f:
-            json.load(f)
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Invalid JSON file {file_path}: {str(e)}")
-    
-    # If valid, use JSONLoader with correct jq schema
-    # Use "." to load the entire JSON, or "[].field" for arrays
-    try:
-        loader = JSONLoader(file_path, jq_schema=".")
-        docs = loader.load()
-    except Exception as e:
-        # Fallback: try to load as array
-        try:
-            loader = JSONLoader(file_path, jq_schema=".[]")
-            docs = loader.load()
-        except Exception:
-            raise ValueError(f"Could not parse JSON file {file_path}: {str(e)}")
-
-    for doc in docs:
-        doc.metadata["source"] = file_path
-        doc.metadata["source_type"] = "json"
+    embeddings = HuggingFaceEmbeddings(
+        model_name=VECTOR_DB_CONFIG["embedding_model"],
+        encode_kwargs={"batch_size": VECTOR_DB_CONFIG["embedding_batch_size"]}
+    )
 
-    return docs
+    if VECTOR_DB_CONFIG["embedding_multi_process"]:
+        embeddings = MultiProcessEmbeddings(embeddings, VECTOR_DB_CONFIG["embedding_batch_size"])
 
+    if embedding_cache is not None:
+        embeddings = CachedEmbeddings(
+            embeddings,
+            embedding_cache,
+            namespace=(
+                f"{VECTOR_DB_CONFIG['embedding_model']}"
+                f"|{VECTOR_DB_CONFIG['chunk_size']}|{VECTOR_DB_CONFIG['chunk_overlap']}"
+            )
+        )
+    return TimedEmbeddings(embeddings)
 
-def load_wiki(wiki_url):
-    loader = WebBaseLoader(
-        wiki_url
-        # soup_strainer=SoupStrainer("p")
-    )
-    docs = loader.load()
 
-    for doc in docs:
-        doc.metadata["source"] = wiki_url
-        doc.metadata["source_type"] = "wiki"
+from langchain_text_splitters import RecursiveCharacterTextSplitter
 
-    return docs
+from loaders import (
+    load_pdf, load_text, load_csv, load_json, load_wiki, stream_csv, stream_json, timed_load
+)
 
 
 def ingest_documents(
@@ -102,8 +132,30 @@ def ingest_documents(
     csv_files=None,
     json_files=None,
     wiki_links=None,
-    persist_dir="learn_with_ai_db"
+    persist_dir="learn_with_ai_db",
+    progress=None,
+    pdf_pages=None,
+    commit=True
 ):
+    """
+    Load, split, embed and index documents into one vector DB.
+
+    Chunks are added to the collection already persisted at persist_dir, so
+    callers should pass only documents that are not indexed yet. Handles
+    already open on persist_dir do not see them: the flat backend builds a
+    new matrix, and Chroma tags them with a generation searches skip until
+    it is committed (see _begin_chroma_ingestion). pdf_pages
+    maps a PDF path to load_pdf arguments (pages, exclude) to index only
+    part of it; other PDFs are indexed whole.
+
+    With commit=False, Chroma chunks stay hidden from searches until
+    commit_ingestion(db, persist_dir), e.g. in the transaction that records
+    the new documents.
+
+    progress, if given, is called as progress(stage, done, total) with stage
+    one of "files_loaded", "chunks_split" or "chunks_embedded". It may raise
+    to abort ingestion; chunks already written by this call are removed.
+    """
     all_documents = []
 
     pdf_files = pdf_files or []
@@ -111,50 +163,395 @@ def ingest_documents(
     csv_files = csv_files or []
     json_files = json_files or []
     wiki_links = wiki_links or []
+    pdf_pages = pdf_pages or {}
 
-    for pdf in pdf_files:
-        try:
-            all_documents.extend(load_pdf(pdf))
-        except Exception as e:
-            raise ValueError(f"Error loading PDF {pdf}: {str(e)}")
+    report = progress or (lambda stage, done, total: None)
+    started = time.perf_counter()
 
-    for txt in text_files:
-        try:
-            all_documents.extend(load_text(txt))
-        except Exception as e:
-            raise ValueError(f"Error loading text file {txt}: {str(e)}")
-
-    for csv in csv_files:
-        try:
-            all_documents.extend(load_csv(csv))
-        except Exception as e:
-            raise ValueError(f"Error loading CSV file {csv}: {str(e)}")
-
-    for js in json_files:
-        try:
-            all_documents.extend(load_json(js))
-        except Exception as e:
-            raise ValueError(f"Error loading JSON file {js}: {str(e)}")
-
-    for link in wiki_links:
-        try:
-            all_documents.extend(load_wiki(link))
-        except Exception as e:
-            raise ValueError(f"Error loading wiki link {link}: {str(e)}")
+    # (loader, source, label) in a fixed order so the index is reproducible
+    file_tasks = (
+        [(partial(load_pdf, **pdf_pages[pdf]) if pdf in pdf_pages else load_pdf, pdf, "PDF")
+         for pdf in pdf_files]
+        + [(load_text, txt, "text file") for txt in text_files]
+    )
+    wiki_tasks = [(load_wiki, link, "wiki link") for link in wiki_links]
+    # CSV and JSON records are streamed straight into the splitter and index
+    stream_tasks = (
+        [(stream_csv, csv, "CSV file") for csv in csv_files]
+        + [(stream_json, js, "JSON file") for js in json_files]
+    )
+    files_total = len(file_tasks) + len(wiki_tasks) + len(stream_tasks)
+
+    for docs in _load_sources(file_tasks, wiki_tasks, report, files_total):
+        all_documents.extend(docs)
+    files_loaded = len(file_tasks) + len(wiki_tasks)
+
+    # Counted once the whole ingestion succeeds
+    source_bytes = [
+        (_loader_name(loader), os.path.getsize(source)) for loader, source, _ in file_tasks + stream_tasks
+    ]
+    if wiki_tasks:
+        source_bytes.append(("wiki", sum(
+            len(doc.page_content.encode("utf-8"))
+            for doc in all_documents
+            if doc.metadata.get("source_type") == "wiki"
+        )))
 
     # Split ALL documents together
+    # start_index lets overlapping chunks be stitched back together at question time
     splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200
+        chunk_size=VECTOR_DB_CONFIG["chunk_size"],
+        chunk_overlap=VECTOR_DB_CONFIG["chunk_overlap"],
+        add_start_index=True
     )
 
-    chunks = splitter.split_documents(all_documents)
+    with INGEST_STAGE_SECONDS.time(stage="split"):
+        chunks = splitter.split_documents(all_documents)
+    del all_documents
+    chunks_split = len(chunks)
+    report("chunks_split", chunks_split, chunks_split)
+
+    def iter_chunks():
+        nonlocal files_loaded, chunks_split
+        yield from chunks
+        for loader, source, label in stream_tasks:
+            # Parsing and splitting interleave with indexing; only time spent in them counts
+            parse_seconds = split_seconds = 0.0
+            try:
+                records = loader(source)
+                while True:
+                    start = time.perf_counter()
+                    record = next(records, None)
+                    parsed = time.perf_counter()
+                    parse_seconds += parsed - start
+                    if record is None:
+                        break
+                    pieces = splitter.split_documents([record])
+                    split_seconds += time.perf_counter() - parsed
+                    chunks_split += len(pieces)
+                    yield from pieces
+            except Exception as e:
+                raise ValueError(f"Error loading {label} {source}: {str(e)}")
+            LOADER_PARSE_SECONDS.observe(parse_seconds, loader=_loader_name(loader))
+            INGEST_STAGE_SECONDS.observe(split_seconds, stage="split")
+            files_loaded += 1
+            report("files_loaded", files_loaded, files_total)
+            report("chunks_split", chunks_split, chunks_split)
+
+    # Open (or create) the ONE vector DB, embedding in batches so progress can be reported
+    chroma = VECTOR_DB_CONFIG["backend"] != "flat"
+    db = open_index(persist_dir)
+    if chroma:
+        with INGEST_STAGE_SECONDS.time(stage="index_write"):
+            generation = _begin_chroma_ingestion(db, persist_dir)
+    # Models swapped in by benchmarks may not be wrapped; their time then counts as index_write
+    take_embed_seconds = getattr(get_embeddings(), "take_seconds", lambda: 0.0)
+
+    # Stream fixed-size batches into the index so only one batch of vectors
+    # (and of streamed records) is held in memory at a time
+    batch_size = VECTOR_DB_CONFIG["index_batch_size"]
+    pending = iter_chunks()
+    added_ids = []
+    report("chunks_embedded", 0, chunks_split)
+    try:
+        while True:
+            batch = list(islice(pending, batch_size))
+            if not batch:
+                break
+            if chroma:
+                for chunk in batch:
+                    chunk.metadata[GENERATION_KEY] = generation
+            take_embed_seconds()
+            start = time.perf_counter()
+            added_ids.extend(db.add_documents(batch))
+            elapsed = time.perf_counter() - start
+            embed_seconds = take_embed_seconds()
+            INGEST_STAGE_SECONDS.observe(embed_seconds, stage="embed")
+            INGEST_STAGE_SECONDS.observe(elapsed - embed_seconds, stage="index_write")
+            report("chunks_embedded", len(added_ids), chunks_split)
+    except BaseException:
+        # Don't leave a half-written index behind
+        if added_ids:
+            db.delete(ids=added_ids)
+        raise
+
+    with INGEST_STAGE_SECONDS.time(stage="index_write"):
+        if chroma:
+            db.pending_generation = generation
+            if commit:
+                commit_ingestion(db, persist_dir)
+        else:
+            # The flat backend keeps additions in memory until saved
+            db.save()
+
+    CHUNKS_INGESTED.inc(len(added_ids))
+    for loader_name, size in source_bytes:
+        BYTES_INGESTED.inc(size, loader=loader_name)
+    INGEST_STAGE_SECONDS.observe(time.perf_counter() - started, stage="total")
+    return db
+
+
+def commit_ingestion(db, persist_dir):
+    """Make the chunks of an ingest_documents(commit=False) call visible to searches"""
+    generation = getattr(db, "pending_generation", None)
+    if generation is not None:
+        _commit_generation(persist_dir, generation)
+        db.committed_generation = generation
+        db.pending_generation = None
+
+
+def open_index(persist_dir):
+    """Open a session's persisted vector DB with the backend from VECTOR_DB_CONFIG"""
+    if VECTOR_DB_CONFIG["backend"] == "flat":
+        from flat_index import FlatVectorStore
+
+        return FlatVectorStore(
+            get_embeddings(),
+            persist_dir,
+            dtype=VECTOR_DB_CONFIG["flat_dtype"],
+            rerank_candidates=VECTOR_DB_CONFIG["flat_rerank_candidates"]
+        )
+
+    # chromadb is slow to import; only pay for it once an index is needed
+    from langchain_community.vectorstores import Chroma
 
-    # Create ONE vector DB
-    db = Chroma.from_documents(
-        documents=chunks,
-        embedding=embeddings,
+    db = Chroma(
+        collection_name=_active_collection(persist_dir),
+        embedding_function=get_embeddings(),
         persist_directory=persist_dir
     )
-
+    # Searches through this handle see chunks up to this generation
+    db.committed_generation = _committed_generation(persist_dir)
     return db
+
+
+# Names the Chroma collection searches use; indexes built before it existed use langchain's default
+ACTIVE_COLLECTION_FILE = "active_collection"
+DEFAULT_COLLECTION = "langchain"
+
+# Chroma chunk metadata: the ingestion that added the chunk, numbered 1, 2, ... per index
+GENERATION_KEY = "ingest_generation"
+COMMITTED_GENERATION_FILE = "committed_generation"
+
+
+def _active_collection(persist_dir):
+    try:
+        with open(os.path.join(persist_dir, ACTIVE_COLLECTION_FILE), encoding="utf-8") as f:
+            return f.read().strip() or DEFAULT_COLLECTION
+    except FileNotFoundError:
+        return DEFAULT_COLLECTION
+
+
+def _committed_generation(persist_dir):
+    """The last Chroma ingestion completed at persist_dir, or None for an index that predates generations"""
+    try:
+        with open(os.path.join(persist_dir, COMMITTED_GENERATION_FILE), encoding="utf-8") as f:
+            return int(f.read())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _commit_generation(persist_dir, generation):
+    path = os.path.join(persist_dir, COMMITTED_GENERATION_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(str(generation))
+    os.replace(path + ".tmp", path)
+
+
+def _generation_filter(committed):
+    """Chroma where clause for the chunks of committed ingestions"""
+    if committed is None:
+        # Untagged chunks predate generations; $ne keeps them where $lte would not.
+        # Only the first ingestion (generation 1) can be in progress on such a handle.
+        return {GENERATION_KEY: {"$ne": 1}}
+    return {GENERATION_KEY: {"$lte": committed}}
+
+
+def _begin_chroma_ingestion(db, persist_dir):
+    """
+    The generation a new Chroma ingestion tags its chunks with.
+
+    Chunks are added to the live collection; searches skip them until the
+    generation is committed. Leftovers of an ingestion that never committed
+    (the process died) are deleted first, as are collections an older
+    version staged ingestions in. An index that predates generations has
+    its chunks tagged as generation 0, once.
+    """
+    active = db._collection.name
+    for collection in db._client.list_collections():
+        name = getattr(collection, "name", collection)
+        if name != active:
+            db._client.delete_collection(name)
+
+    committed = _committed_generation(persist_dir)
+    if committed is None:
+        batch_size = VECTOR_DB_CONFIG["index_batch_size"]
+        offset = 0
+        while True:
+            page = db._collection.get(include=["metadatas"], limit=batch_size, offset=offset)
+            if not page["ids"]:
+                break
+            untagged = [
+                (doc_id, dict(metadata or {}, **{GENERATION_KEY: 0}))
+                for doc_id, metadata in zip(page["ids"], page["metadatas"])
+                if not metadata or GENERATION_KEY not in metadata
+            ]
+            if untagged:
+                db._collection.update(
+                    ids=[doc_id for doc_id, _ in untagged],
+                    metadatas=[metadata for _, metadata in untagged]
+                )
+            offset += len(page["ids"])
+        committed = 0
+        _commit_generation(persist_dir, committed)
+    else:
+        db._collection.delete(where={GENERATION_KEY: {"$gt": committed}})
+    return committed + 1
+
+
+def close_index(db):
+    """
+    Drop chromadb's process-wide cached client for this index.
+
+    Its memory is reclaimed once no in-flight request or ingestion still holds
+    the handle; the next open_index builds a fresh client from disk.
+    """
+    try:
+        from chromadb.api.shared_system_client import SharedSystemClient
+        SharedSystemClient._identifier_to_system.pop(db._client._identifier, None)
+    except Exception:
+        pass
+
+
+def search_with_relevance(db, query, k, query_vector=None):
+    """
+    [(Document, cosine similarity)] for the k best chunks, comparable across backends.
+
+    Chroma's default l2 space reports squared distances; for the unit-length
+    vectors MiniLM produces that is 2 - 2 * cosine.
+    """
+    if query_vector is None:
+        query_vector = db.embeddings.embed_query(query)
+    if VECTOR_DB_CONFIG["backend"] == "chroma":
+        results = db.similarity_search_by_vector_with_relevance_scores(
+            query_vector, k=k, filter=_generation_filter(db.committed_generation)
+        )
+        return [(doc, 1.0 - distance / 2.0) for doc, distance in results]
+    return db.similarity_search_by_vector_with_relevance_scores(query_vector, k=k)
+
+
+def search_many_with_relevance(db, query_vectors, k):
+    """search_with_relevance for several query vectors in one index call"""
+    if not query_vectors:
+        return []
+    if VECTOR_DB_CONFIG["backend"] == "flat":
+        return db.similarity_search_by_vectors_with_relevance_scores(query_vectors, k=k)
+
+    from langchain_core.documents import Document
+
+    results = db._collection.query(
+        query_embeddings=query_vectors,
+        n_results=k,
+        where=_generation_filter(db.committed_generation),
+        include=["documents", "metadatas", "distances"]
+    )
+    return [
+        [
+            (Document(page_content=text, metadata=metadata or {}, id=doc_id), 1.0 - distance / 2.0)
+            for text, metadata, distance, doc_id in zip(texts, metadatas, distances, ids)
+        ]
+        for texts, metadatas, distances, ids in zip(
+            results["documents"], results["metadatas"], results["distances"], results["ids"]
+        )
+    ]
+
+
+def embed_queries(texts):
+    """Embed several questions in one batched model call, bypassing the chunk embedding cache"""
+    embeddings = get_embeddings()
+    while isinstance(embeddings, (TimedEmbeddings, CachedEmbeddings)):
+        embeddings = embeddings.embeddings
+    return embeddings.embed_documents(list(texts))
+
+
+def remove_sources(db, sources):
+    """Delete every chunk whose source is one of the given paths or links"""
+    if sources:
+        db.delete(where={"source": {"$in": list(sources)}})
+
+
+_loader_pool = None
+_wiki_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_loader_pools():
+    """Lazily start the shared process pool (files) and thread pool (wiki links)"""
+    global _loader_pool, _wiki_pool
+    with _pool_lock:
+        if _loader_pool is None:
+            # spawn: forking a threaded web server is unsafe
+            _loader_pool = ProcessPoolExecutor(
+                max_workers=INGESTION_CONFIG["loader_processes"] or os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            _wiki_pool = ThreadPoolExecutor(
+                max_workers=INGESTION_CONFIG["wiki_threads"],
+                thread_name_prefix="wiki"
+            )
+    return _loader_pool, _wiki_pool
+
+
+def _loader_name(loader):
+    """Metric label for a loader function, e.g. load_pdf -> pdf"""
+    return getattr(loader, "func", loader).__name__.split("_", 1)[1]
+
+
+def _load_sources(file_tasks, wiki_tasks, report, total):
+    """
+    Run loaders in parallel and return their documents in task order.
+
+    Files are parsed in worker processes since PDF parsing is CPU-bound;
+    wiki links are fetched on threads. A single file is parsed inline.
+    total is the number of sources in the whole ingestion, for progress.
+    """
+    tasks = file_tasks + wiki_tasks
+    report("files_loaded", 0, total)
+
+    if len(file_tasks) <= 1 and not wiki_tasks:
+        results = []
+        for loader, source, label in tasks:
+            try:
+                seconds, docs = timed_load(loader, source)
+            except Exception as e:
+                raise ValueError(f"Error loading {label} {source}: {str(e)}")
+            LOADER_PARSE_SECONDS.observe(seconds, loader=_loader_name(loader))
+            results.append(docs)
+            report("files_loaded", len(results), total)
+        return results
+
+    process_pool, thread_pool = _get_loader_pools()
+    futures = {}
+    for index, (loader, source, label) in enumerate(tasks):
+        pool = thread_pool if loader is load_wiki else process_pool
+        futures[pool.submit(timed_load, loader, source)] = index
+
+    results = [None] * len(tasks)
+    loaded = 0
+    try:
+        for future in as_completed(futures):
+            index = futures[future]
+            loader, source, label = tasks[index]
+            try:
+                seconds, results[index] = future.result()
+            except Exception as e:
+                raise ValueError(f"Error loading {label} {source}: {str(e)}")
+            LOADER_PARSE_SECONDS.observe(seconds, loader=_loader_name(loader))
+            loaded += 1
+            report("files_loaded", loaded, total)
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+
+    return results